@@ -0,0 +1,116 @@
+"""Baseline schema: batches, analysis results, milestones and equipment
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "biochar_batches",
+        sa.Column("id", sa.Uuid(), primary_key=True),
+        sa.Column("name", sa.String(50), nullable=False),
+        sa.Column("date_created", sa.Date(), nullable=False),
+        sa.Column("oven", sa.String(20)),
+        sa.Column("operator", sa.String(50)),
+        sa.Column("temperature", sa.Float()),
+        sa.Column("time_hours", sa.Float()),
+        sa.Column("pressure_bar", sa.Float()),
+        sa.Column("koh_ratio", sa.Float()),
+        sa.Column("water_percent", sa.Float()),
+        sa.Column("input_weight", sa.Float()),
+        sa.Column("output_weight", sa.Float()),
+        sa.Column("yield_percent", sa.Float()),
+        sa.Column("is_milestone", sa.Boolean()),
+        sa.Column("quality_notes", sa.Text()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True))
+    )
+    op.create_index("ix_biochar_batches_name", "biochar_batches", ["name"], unique=True)
+
+    op.create_table(
+        "graphene_batches",
+        sa.Column("id", sa.Uuid(), primary_key=True),
+        sa.Column("name", sa.String(50), nullable=False),
+        sa.Column("date_created", sa.Date(), nullable=False),
+        sa.Column("oven", sa.String(20)),
+        sa.Column("operator", sa.String(50)),
+        sa.Column("parent_biochar_ids", sa.JSON()),
+        sa.Column("is_pooled", sa.Boolean()),
+        sa.Column("temperature", sa.Float()),
+        sa.Column("time_hours", sa.Float()),
+        sa.Column("grinding_method", sa.String(50)),
+        sa.Column("gas_type", sa.String(20)),
+        sa.Column("koh_ratio", sa.Float()),
+        sa.Column("species", sa.Integer()),
+        sa.Column("appearance", sa.Text()),
+        sa.Column("shipped_to", sa.String(100)),
+        sa.Column("shipped_date", sa.Date()),
+        sa.Column("shipped_weight", sa.Float()),
+        sa.Column("shipment_notes", sa.Text()),
+        sa.Column("is_oven_c_era", sa.Boolean()),
+        sa.Column("quality_notes", sa.Text()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True))
+    )
+    op.create_index("ix_graphene_batches_name", "graphene_batches", ["name"], unique=True)
+
+    op.create_table(
+        "analysis_results",
+        sa.Column("id", sa.Uuid(), primary_key=True),
+        sa.Column("graphene_batch_id", sa.Uuid(), sa.ForeignKey("graphene_batches.id"), nullable=False),
+        sa.Column("date_analyzed", sa.Date(), nullable=False),
+        sa.Column("bet_surface_area", sa.Float()),
+        sa.Column("bet_langmuir", sa.Float()),
+        sa.Column("conductivity", sa.Float()),
+        sa.Column("conductivity_unit", sa.String(10)),
+        sa.Column("capacitance", sa.Float()),
+        sa.Column("pore_size", sa.Float()),
+        sa.Column("analysis_method", sa.String(50)),
+        sa.Column("instrument", sa.String(50)),
+        sa.Column("analyst", sa.String(50)),
+        sa.Column("sem_images", sa.JSON()),
+        sa.Column("tem_images", sa.JSON()),
+        sa.Column("reports", sa.JSON()),
+        sa.Column("comments", sa.Text()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now())
+    )
+
+    op.create_table(
+        "milestones",
+        sa.Column("id", sa.Uuid(), primary_key=True),
+        sa.Column("date_occurred", sa.Date(), nullable=False),
+        sa.Column("title", sa.String(100), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("impact_level", sa.String(20)),
+        sa.Column("affected_batch_ids", sa.JSON()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now())
+    )
+
+    op.create_table(
+        "equipment",
+        sa.Column("id", sa.Uuid(), primary_key=True),
+        sa.Column("name", sa.String(50), nullable=False, unique=True),
+        sa.Column("type", sa.String(50)),
+        sa.Column("capacity_grams", sa.Float()),
+        sa.Column("is_production_ready", sa.Boolean()),
+        sa.Column("installation_date", sa.Date()),
+        sa.Column("notes", sa.Text()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now())
+    )
+
+def downgrade():
+    op.drop_table("equipment")
+    op.drop_table("milestones")
+    op.drop_table("analysis_results")
+    op.drop_index("ix_graphene_batches_name", table_name="graphene_batches")
+    op.drop_table("graphene_batches")
+    op.drop_index("ix_biochar_batches_name", table_name="biochar_batches")
+    op.drop_table("biochar_batches")
@@ -0,0 +1,78 @@
+"""Import content hashes, imported files and per-batch analysis summaries
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("biochar_batches", sa.Column("content_hash", sa.String(64)))
+    op.add_column("graphene_batches", sa.Column("content_hash", sa.String(64)))
+    op.add_column("analysis_results", sa.Column("content_hash", sa.String(64)))
+    op.create_index("ix_analysis_results_content_hash", "analysis_results", ["content_hash"], unique=True)
+
+    op.create_table(
+        "imported_files",
+        sa.Column("id", sa.Uuid(), primary_key=True),
+        sa.Column("sha256", sa.String(64), nullable=False),
+        sa.Column("data_type", sa.String(20), nullable=False),
+        sa.Column("filename", sa.String(255)),
+        sa.Column("total_rows", sa.Integer()),
+        sa.Column("imported_count", sa.Integer()),
+        sa.Column("imported_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.UniqueConstraint("sha256", "data_type")
+    )
+
+    op.create_table(
+        "batch_analysis_summaries",
+        sa.Column(
+            "graphene_batch_id", sa.Uuid(),
+            sa.ForeignKey("graphene_batches.id", ondelete="CASCADE"), primary_key=True
+        ),
+        sa.Column("analysis_count", sa.Integer(), nullable=False),
+        sa.Column("bet_count", sa.Integer(), nullable=False),
+        sa.Column("bet_sum", sa.Float(), nullable=False),
+        sa.Column("max_bet", sa.Float()),
+        sa.Column("mean_bet", sa.Float()),
+        sa.Column("max_conductivity", sa.Float()),
+        sa.Column("latest_analysis_date", sa.Date()),
+        sa.Column("energy_grade", sa.String(20)),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now())
+    )
+    op.create_index("ix_batch_analysis_summaries_max_bet", "batch_analysis_summaries", ["max_bet"])
+
+    # Backfill summaries for existing analysis results (grades follow BET_TARGETS["supercapacitor"])
+    op.execute("""
+        INSERT INTO batch_analysis_summaries (
+            graphene_batch_id, analysis_count, bet_count, bet_sum, max_bet, mean_bet,
+            max_conductivity, latest_analysis_date, energy_grade
+        )
+        SELECT
+            graphene_batch_id, count(id), count(bet_surface_area), coalesce(sum(bet_surface_area), 0),
+            max(bet_surface_area), avg(bet_surface_area), max(conductivity), max(date_analyzed),
+            CASE
+                WHEN max(bet_surface_area) IS NULL OR max(bet_surface_area) = 0 THEN NULL
+                WHEN max(bet_surface_area) >= 2000 THEN 'Excellent'
+                WHEN max(bet_surface_area) >= 1500 THEN 'Good'
+                WHEN max(bet_surface_area) >= 1000 THEN 'Acceptable'
+                ELSE 'Poor'
+            END
+        FROM analysis_results
+        GROUP BY graphene_batch_id
+    """)
+
+def downgrade():
+    op.drop_index("ix_batch_analysis_summaries_max_bet", table_name="batch_analysis_summaries")
+    op.drop_table("batch_analysis_summaries")
+    op.drop_table("imported_files")
+    op.drop_index("ix_analysis_results_content_hash", table_name="analysis_results")
+    op.drop_column("analysis_results", "content_hash")
+    op.drop_column("graphene_batches", "content_hash")
+    op.drop_column("biochar_batches", "content_hash")
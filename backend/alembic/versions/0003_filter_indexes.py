@@ -0,0 +1,53 @@
+"""Composite and partial indexes for the list, dashboard and analysis filters
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+# name, table, columns, partial index predicate (PostgreSQL, SQLite)
+INDEXES = [
+    ("ix_biochar_batches_date_created_id", "biochar_batches", ["date_created", "id"], None),
+    ("ix_biochar_batches_oven_date_created", "biochar_batches", ["oven", "date_created"], None),
+    ("ix_biochar_batches_operator", "biochar_batches", ["operator"], None),
+    ("ix_biochar_batches_temperature_id", "biochar_batches", ["temperature", "id"], None),
+    ("ix_biochar_batches_yield_percent_id", "biochar_batches", ["yield_percent", "id"], None),
+    ("ix_graphene_batches_date_created_id", "graphene_batches", ["date_created", "id"], None),
+    ("ix_graphene_batches_oven_date_created", "graphene_batches", ["oven", "date_created"], None),
+    ("ix_graphene_batches_species_date_created", "graphene_batches", ["species", "date_created"], None),
+    ("ix_graphene_batches_temperature_id", "graphene_batches", ["temperature", "id"], None),
+    (
+        "ix_graphene_batches_shipped_date_id", "graphene_batches", ["shipped_date", "id"],
+        ("shipped_to IS NOT NULL", "shipped_to IS NOT NULL")
+    ),
+    (
+        "ix_graphene_batches_oven_c_era_date_created_id", "graphene_batches", ["date_created", "id"],
+        ("is_oven_c_era", "is_oven_c_era = 1")
+    ),
+    (
+        "ix_graphene_batches_oven_c_era_unshipped", "graphene_batches", ["date_created"],
+        ("is_oven_c_era AND shipped_to IS NULL", "is_oven_c_era = 1 AND shipped_to IS NULL")
+    ),
+    (
+        "ix_analysis_results_graphene_batch_id_date_analyzed", "analysis_results",
+        ["graphene_batch_id", "date_analyzed"], None
+    ),
+]
+
+def upgrade():
+    for name, table, columns, where in INDEXES:
+        options = {}
+        if where:
+            options = {"postgresql_where": sa.text(where[0]), "sqlite_where": sa.text(where[1])}
+        op.create_index(name, table, columns, **options)
+
+def downgrade():
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
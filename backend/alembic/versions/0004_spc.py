@@ -0,0 +1,66 @@
+"""Statistical process control streams and alerts
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "spc_states",
+        sa.Column("id", sa.Uuid(), primary_key=True),
+        sa.Column("oven", sa.String(20), nullable=False),
+        sa.Column("species", sa.Integer(), nullable=False),
+        sa.Column("metric", sa.String(30), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("mean", sa.Float(), nullable=False),
+        sa.Column("m2", sa.Float(), nullable=False),
+        sa.Column("ewma", sa.Float()),
+        sa.Column("ewma_steps", sa.Integer(), nullable=False),
+        sa.Column("cusum_high", sa.Float(), nullable=False),
+        sa.Column("cusum_low", sa.Float(), nullable=False),
+        sa.Column("recent_z", sa.JSON()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.UniqueConstraint("oven", "species", "metric")
+    )
+
+    op.create_table(
+        "spc_alerts",
+        sa.Column("id", sa.Uuid(), primary_key=True),
+        sa.Column(
+            "analysis_result_id", sa.Uuid(),
+            sa.ForeignKey("analysis_results.id", ondelete="CASCADE")
+        ),
+        sa.Column(
+            "graphene_batch_id", sa.Uuid(),
+            sa.ForeignKey("graphene_batches.id", ondelete="CASCADE")
+        ),
+        sa.Column("oven", sa.String(20), nullable=False),
+        sa.Column("species", sa.Integer(), nullable=False),
+        sa.Column("metric", sa.String(30), nullable=False),
+        sa.Column("rule", sa.String(20), nullable=False),
+        sa.Column("message", sa.Text()),
+        sa.Column("value", sa.Float()),
+        sa.Column("center", sa.Float()),
+        sa.Column("sigma", sa.Float()),
+        sa.Column("date_analyzed", sa.Date()),
+        sa.Column("acknowledged", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now())
+    )
+    op.create_index("ix_spc_alerts_analysis_result_id", "spc_alerts", ["analysis_result_id"])
+    op.create_index("ix_spc_alerts_acknowledged_created_at", "spc_alerts", ["acknowledged", "created_at"])
+
+    # Existing history is replayed into the streams with: python -m app.services.spc
+
+def downgrade():
+    op.drop_index("ix_spc_alerts_acknowledged_created_at", table_name="spc_alerts")
+    op.drop_index("ix_spc_alerts_analysis_result_id", table_name="spc_alerts")
+    op.drop_table("spc_alerts")
+    op.drop_table("spc_states")
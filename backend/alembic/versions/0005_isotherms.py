@@ -0,0 +1,53 @@
+"""Raw isotherm storage with fit results
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "isotherms",
+        sa.Column("id", sa.Uuid(), primary_key=True),
+        sa.Column(
+            "graphene_batch_id", sa.Uuid(),
+            sa.ForeignKey("graphene_batches.id", ondelete="CASCADE")
+        ),
+        sa.Column(
+            "analysis_result_id", sa.Uuid(),
+            sa.ForeignKey("analysis_results.id", ondelete="SET NULL")
+        ),
+        sa.Column("sample_name", sa.String(100)),
+        sa.Column("source_filename", sa.String(255)),
+        sa.Column("adsorbate", sa.String(20)),
+        sa.Column("point_count", sa.Integer(), nullable=False),
+        sa.Column("relative_pressure", sa.LargeBinary(), nullable=False),
+        sa.Column("quantity_adsorbed", sa.LargeBinary(), nullable=False),
+        sa.Column("desorption_pressure", sa.LargeBinary()),
+        sa.Column("desorption_quantity", sa.LargeBinary()),
+        sa.Column("bet_area", sa.Float()),
+        sa.Column("bet_c", sa.Float()),
+        sa.Column("bet_r_squared", sa.Float()),
+        sa.Column("langmuir_area", sa.Float()),
+        sa.Column("tplot_external_area", sa.Float()),
+        sa.Column("tplot_micropore_volume", sa.Float()),
+        sa.Column("total_pore_volume", sa.Float()),
+        sa.Column("mean_pore_diameter", sa.Float()),
+        sa.Column("pore_size_distribution", sa.JSON()),
+        sa.Column("fitted_at", sa.DateTime(timezone=True)),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now())
+    )
+    op.create_index("ix_isotherms_graphene_batch_id", "isotherms", ["graphene_batch_id"])
+    op.create_index("ix_isotherms_analysis_result_id", "isotherms", ["analysis_result_id"])
+
+def downgrade():
+    op.drop_index("ix_isotherms_analysis_result_id", table_name="isotherms")
+    op.drop_index("ix_isotherms_graphene_batch_id", table_name="isotherms")
+    op.drop_table("isotherms")
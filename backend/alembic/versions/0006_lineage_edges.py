@@ -0,0 +1,66 @@
+"""Lineage edge table, backfilled from the JSON batch ID lists
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+import uuid
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    edges = op.create_table(
+        "lineage_edges",
+        sa.Column("parent_id", sa.Uuid(), primary_key=True),
+        sa.Column("child_id", sa.Uuid(), primary_key=True),
+        sa.Column("relation", sa.String(20), primary_key=True),
+        sa.Column("parent_type", sa.String(20), nullable=False),
+        sa.Column("child_type", sa.String(20), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now())
+    )
+    op.create_index("ix_lineage_edges_child_id", "lineage_edges", ["child_id"])
+
+    # Backfill in Python: the JSON entries are UUID strings or, from older clients, lot names
+    bind = op.get_bind()
+    biochar = sa.table("biochar_batches", sa.column("id", sa.Uuid()), sa.column("name", sa.String))
+    graphene = sa.table("graphene_batches", sa.column("id", sa.Uuid()), sa.column("parent_biochar_ids", sa.JSON))
+    milestones = sa.table("milestones", sa.column("id", sa.Uuid()), sa.column("affected_batch_ids", sa.JSON))
+
+    biochar_names = dict(bind.execute(sa.select(biochar.c.name, biochar.c.id)).all())
+    biochar_ids = set(biochar_names.values())
+    graphene_ids = set(bind.execute(sa.select(graphene.c.id)).scalars())
+
+    rows = set()
+    for batch_id, refs in bind.execute(sa.select(graphene.c.id, graphene.c.parent_biochar_ids)):
+        for ref in refs or []:
+            parent_id = _as_uuid(ref)
+            parent_id = parent_id if parent_id in biochar_ids else biochar_names.get(str(ref))
+            if parent_id:
+                rows.add((parent_id, "biochar", batch_id, "graphene", "derived_from"))
+    for milestone_id, refs in bind.execute(sa.select(milestones.c.id, milestones.c.affected_batch_ids)):
+        for ref in refs or []:
+            batch_id = _as_uuid(ref)
+            if batch_id in biochar_ids:
+                rows.add((milestone_id, "milestone", batch_id, "biochar", "affects"))
+            elif batch_id in graphene_ids:
+                rows.add((milestone_id, "milestone", batch_id, "graphene", "affects"))
+
+    columns = ("parent_id", "parent_type", "child_id", "child_type", "relation")
+    rows = [dict(zip(columns, row)) for row in rows]
+    for start in range(0, len(rows), 1000):
+        op.bulk_insert(edges, rows[start:start + 1000])
+
+def downgrade():
+    op.drop_index("ix_lineage_edges_child_id", table_name="lineage_edges")
+    op.drop_table("lineage_edges")
+
+def _as_uuid(value):
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
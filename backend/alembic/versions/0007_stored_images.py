@@ -0,0 +1,27 @@
+"""Content-addressed image store
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "stored_images",
+        sa.Column("sha256", sa.String(64), primary_key=True),
+        sa.Column("size_bytes", sa.Integer(), nullable=False),
+        sa.Column("content_type", sa.String(100)),
+        sa.Column("original_filename", sa.String(255)),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now())
+    )
+
+def downgrade():
+    op.drop_table("stored_images")
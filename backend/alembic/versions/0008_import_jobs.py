@@ -0,0 +1,40 @@
+"""Import job state shared by all API workers
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "import_jobs",
+        sa.Column("id", sa.Uuid(), primary_key=True),
+        sa.Column("filename", sa.String(255)),
+        sa.Column("data_type", sa.String(20), nullable=False),
+        sa.Column("on_conflict", sa.String(10), nullable=False),
+        sa.Column("file_sha256", sa.String(64)),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("rows_parsed", sa.Integer(), nullable=False),
+        sa.Column("rows_inserted", sa.Integer(), nullable=False),
+        sa.Column("error_count", sa.Integer(), nullable=False),
+        sa.Column("errors", sa.JSON()),
+        sa.Column("warnings", sa.JSON()),
+        sa.Column("details", sa.JSON()),
+        sa.Column("rows_per_second", sa.Float()),
+        sa.Column("message", sa.Text()),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("started_at", sa.DateTime(timezone=True)),
+        sa.Column("finished_at", sa.DateTime(timezone=True))
+    )
+    op.create_index("ix_import_jobs_created_at", "import_jobs", ["created_at"])
+
+def downgrade():
+    op.drop_index("ix_import_jobs_created_at", table_name="import_jobs")
+    op.drop_table("import_jobs")
@@ -0,0 +1,24 @@
+"""Index the normalised graphene batch name used to resolve sample names
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+# Must render exactly as app.models.normalised_name_sql for queries to use it
+NORMALISED_NAME = (
+    "replace(replace(replace(replace(replace(lower(name), ' ', ''), '-', ''), '_', ''), '.', ''), '/', '')"
+)
+
+def upgrade():
+    op.create_index("ix_graphene_batches_normalised_name", "graphene_batches", [sa.text(NORMALISED_NAME)])
+
+def downgrade():
+    op.drop_index("ix_graphene_batches_normalised_name", table_name="graphene_batches")
@@ -0,0 +1,24 @@
+"""Lineage version row, bumped with every edge write
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    version = op.create_table(
+        "lineage_version",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("version", sa.BigInteger(), nullable=False)
+    )
+    op.bulk_insert(version, [{"id": 1, "version": 0}])
+
+def downgrade():
+    op.drop_table("lineage_version")
@@ -0,0 +1,221 @@
+"""Synthetic production-scale data for benchmarks and query plan checks.
+
+Generates biochar lots, graphene batches made from one to three of them
+(pooled when more than one), about two analyses per batch, shipments to
+customers and process milestones, then builds the derived tables the API
+reads (analysis summaries, SPC streams, lineage edges). The same seed and
+size always produce the same rows, IDs included, so benchmark runs on
+different commits see identical data.
+
+Rows are generated and inserted in chunks, so memory stays flat from 10k
+to 1M analyses. Works on SQLite and PostgreSQL; the database must not
+already hold graphene batches:
+
+    DATABASE_URL=sqlite:///bench.db python -m app.data_generator --analyses 100000
+"""
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+from app.models import AnalysisResult, BiocharBatch, Equipment, GrapheneBatch, Milestone
+from app.services.batch_summary import refresh_batch_summaries
+from app.services.lineage import rebuild_lineage
+from app.services.spc import rebuild_spc_states
+from datetime import date, timedelta
+from typing import Dict, List
+import argparse
+import bisect
+import math
+import random
+import sys
+import time
+import uuid
+
+# Rows per insert
+CHUNK_SIZE = 5000
+
+START_DATE = date(2023, 1, 1)
+END_DATE = date(2025, 9, 30)
+OVEN_C_DATE = date(2025, 4, 1)
+
+CUSTOMERS = ["Curia", "Partner A", "Albany", "Clariant", "Northvolt Labs"]
+OPERATORS = ["Lab Team", "Dr. Torsten Busch", "Operator A", "Operator B"]
+ANALYSTS = ["Clariant Analytical Sciences", "In-house lab", "Curia QC"]
+GRINDING_METHODS = ["mill (1 min)", "mill (2.5 min)", "mill (3x30 sec)"]
+SHIPPED_FRACTION = 0.08
+
+EQUIPMENT = [
+    {"name": "AV1", "type": "rotating_oven", "capacity_grams": 100, "is_production_ready": False},
+    {"name": "AV5", "type": "rotating_oven", "capacity_grams": 100, "is_production_ready": False},
+    {"name": "C", "type": "rotating_oven", "capacity_grams": 500, "is_production_ready": True,
+     "installation_date": OVEN_C_DATE}
+]
+
+def generate(db: Session, analyses: int, seed: int = 42, prefix: str = "SYN") -> Dict[str, int]:
+    """Insert a dataset with about `analyses` analysis results; commits and returns row counts"""
+    rng = random.Random(seed)
+    graphene_count = max(1, analyses // 2)
+    biochar_count = max(1, graphene_count // 2)
+    span = (END_DATE - START_DATE).days
+
+    def new_id() -> uuid.UUID:
+        return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+    def created_on(index: int, count: int) -> date:
+        # Production ramps up over time: later days hold more batches
+        return START_DATE + timedelta(days=int(span * math.sqrt((index + 0.5) / count)))
+
+    existing = {name for (name,) in db.execute(select(Equipment.name))}
+    equipment = [row for row in EQUIPMENT if row["name"] not in existing]
+    if equipment:
+        db.execute(insert(Equipment), [{"id": new_id(), **row} for row in equipment])
+
+    # Lots are created in date order, so a batch's parents are the lots made just before it
+    biochar_ids: List[uuid.UUID] = []
+    for offset in range(0, biochar_count, CHUNK_SIZE):
+        rows = []
+        for i in range(offset, min(offset + CHUNK_SIZE, biochar_count)):
+            created = created_on(i, biochar_count)
+            oven = "C" if created >= OVEN_C_DATE else rng.choice(["AV1", "AV5"])
+            input_weight = 400.0 if oven == "C" else 80.0
+            yield_percent = round(min(max(rng.gauss(27, 3), 15), 40), 1)
+            rows.append({
+                "id": new_id(),
+                "name": f"{prefix}-MB{i:07d}",
+                "date_created": created,
+                "oven": oven,
+                "operator": rng.choice(OPERATORS),
+                "temperature": rng.choice([160.0, 180.0, 200.0]),
+                "time_hours": rng.choice([12.0, 24.0]),
+                "pressure_bar": round(rng.uniform(8, 16), 1),
+                "water_percent": round(rng.uniform(1, 6), 1),
+                "input_weight": input_weight,
+                "output_weight": round(input_weight * yield_percent / 100, 1),
+                "yield_percent": yield_percent
+            })
+        db.execute(insert(BiocharBatch), rows)
+        biochar_ids.extend(row["id"] for row in rows)
+
+    graphene_ids: List[uuid.UUID] = []
+    graphene_dates: List[date] = []
+    analysis_total = 0
+    for offset in range(0, graphene_count, CHUNK_SIZE):
+        batches, results = [], []
+        for i in range(offset, min(offset + CHUNK_SIZE, graphene_count)):
+            created = created_on(i, graphene_count)
+            oven_c = created >= OVEN_C_DATE
+            newest_lot = min(biochar_count - 1, i * biochar_count // graphene_count)
+            parents = sorted({
+                biochar_ids[max(0, newest_lot - rng.randint(0, 20))] for _ in range(rng.choice([1, 1, 1, 2, 3]))
+            })
+            species = rng.choice([1, 2])
+            temperature = rng.choice([700.0, 750.0, 800.0, 850.0])
+            koh_ratio = rng.choice([1.3, 1.5, 2.0])
+            shipped = rng.random() < SHIPPED_FRACTION
+            batch = {
+                "id": new_id(),
+                "name": f"{prefix}-MRa{i:07d}",
+                "date_created": created,
+                "oven": "C" if oven_c else rng.choice(["AV1", "AV5"]),
+                "operator": rng.choice(OPERATORS),
+                "parent_biochar_ids": [str(parent) for parent in parents],
+                "is_pooled": len(parents) > 1,
+                "temperature": temperature,
+                "time_hours": rng.choice([1.0, 1.5, 2.0]),
+                "grinding_method": rng.choice(GRINDING_METHODS),
+                "gas_type": rng.choice(["N2", "N2", "Ar"]),
+                "koh_ratio": koh_ratio,
+                "species": species,
+                "appearance": rng.choice(["black/grey brittle", "black powder", "grey flakes"]),
+                "is_oven_c_era": oven_c,
+                "shipped_to": rng.choice(CUSTOMERS) if shipped else None,
+                "shipped_date": created + timedelta(days=rng.randint(3, 30)) if shipped else None,
+                "shipped_weight": round(rng.uniform(10, 800), 1) if shipped else None
+            }
+            batches.append(batch)
+
+            # BET rises with temperature and KOH ratio, species 1 and Oven C run better
+            expected_bet = (
+                900 + (temperature - 700) * 4 + (koh_ratio - 1.3) * 600
+                + (150 if species == 1 else 0) + (200 if oven_c else 0)
+            )
+            remaining = analyses - analysis_total - len(results)
+            for n in range(min(rng.choice([1, 2, 3]), max(remaining, 0))):
+                bet = round(max(rng.gauss(expected_bet, 150), 200), 1)
+                results.append({
+                    "id": new_id(),
+                    "graphene_batch_id": batch["id"],
+                    "date_analyzed": created + timedelta(days=rng.randint(1, 20) + n),
+                    "bet_surface_area": bet,
+                    "bet_langmuir": round(bet * rng.uniform(1.02, 1.1), 1),
+                    "conductivity": round(max(rng.gauss(12 + bet / 500, 1.5), 0.5), 2),
+                    "conductivity_unit": "S/m",
+                    "capacitance": round(bet * rng.uniform(0.08, 0.12), 1) if rng.random() < 0.3 else None,
+                    "pore_size": round(rng.uniform(1.5, 4.0), 2) if rng.random() < 0.5 else None,
+                    "analysis_method": "BET",
+                    "instrument": rng.choice(["Micromeritics 3Flex", "Quantachrome NOVA"]),
+                    "analyst": rng.choice(ANALYSTS)
+                })
+        for model, rows in ((GrapheneBatch, batches), (AnalysisResult, results)):
+            for start in range(0, len(rows), CHUNK_SIZE):
+                db.execute(insert(model), rows[start:start + CHUNK_SIZE])
+        graphene_ids.extend(batch["id"] for batch in batches)
+        graphene_dates.extend(batch["date_created"] for batch in batches)
+        analysis_total += len(results)
+
+    # The Oven C introduction plus one process change per ~2000 batches, each affecting the batches around it
+    milestone_dates = [OVEN_C_DATE] + sorted(
+        START_DATE + timedelta(days=rng.randint(0, span)) for _ in range(max(2, graphene_count // 2000))
+    )
+    milestones = []
+    for n, occurred in enumerate(milestone_dates):
+        first = bisect.bisect_left(graphene_dates, occurred)
+        affected = graphene_ids[first:first + rng.randint(5, 50)]
+        milestones.append({
+            "id": new_id(),
+            "date_occurred": occurred,
+            "title": "Oven C Introduction" if n == 0 else f"Process change {n}",
+            "description": "Introduction of new large-scale rotating oven for production-ready batches" if n == 0
+            else rng.choice(["KOH ratio protocol updated", "New grinding schedule", "Gas flow recalibrated"]),
+            "impact_level": "major" if n == 0 else rng.choice(["minor", "protocol_change"]),
+            "affected_batch_ids": [str(batch_id) for batch_id in affected]
+        })
+    db.execute(insert(Milestone), milestones)
+
+    refresh_batch_summaries(db)
+    db.commit()
+    spc_streams = rebuild_spc_states(db)
+    lineage_edges = rebuild_lineage(db)
+    return {
+        "biochar_batches": biochar_count,
+        "graphene_batches": graphene_count,
+        "analysis_results": analysis_total,
+        "shipments": db.scalar(select(func.count()).where(GrapheneBatch.shipped_to.isnot(None))),
+        "milestones": len(milestones),
+        "lineage_edges": lineage_edges,
+        "spc_streams": spc_streams
+    }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--analyses", type=int, default=100000, help="analysis results to generate (10k to 1M)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--prefix", default="SYN", help="prefix of generated batch names")
+    args = parser.parse_args(argv)
+
+    from app.database import SessionLocal, upgrade_schema
+
+    upgrade_schema()
+    db = SessionLocal()
+    try:
+        if db.scalar(select(func.count()).select_from(GrapheneBatch)):
+            print("❌ The database already holds graphene batches; generate into an empty database")
+            return 1
+        started = time.perf_counter()
+        counts = generate(db, args.analyses, args.seed, args.prefix)
+    finally:
+        db.close()
+    print(f"✅ Generated in {time.perf_counter() - started:.1f}s: "
+          + ", ".join(f"{count} {name.replace('_', ' ')}" for name, count in counts.items()))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,13 @@
-from app.database import engine, Base, SessionLocal
+from app.database import SessionLocal, upgrade_schema
 from app.models import *
+from app.services.batch_summary import refresh_batch_summaries
+from app.services.lineage import rebuild_lineage
+from app.services.spc import rebuild_spc_states
 from datetime import date
 import uuid
 
-# Create all tables
-Base.metadata.create_all(bind=engine)
+# Create the schema through the migrations, so the database is under Alembic (works on SQLite too)
+upgrade_schema()
 
 # Create session
 db = SessionLocal()
@@ -154,7 +157,11 @@ try:
         if analysis.graphene_batch_id:  # Only add if batch exists
             db.add(analysis)
 
+    db.flush()
+    refresh_batch_summaries(db)
     db.commit()
+    rebuild_spc_states(db)
+    rebuild_lineage(db)
     print("✅ Database initialized with sample data")
     print("📊 Added:")
     print("   - 3 graphene batches (MRa445, MRa440, TB1175B)")  
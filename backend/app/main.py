@@ -1,50 +1,102 @@
+"""HGraph2 API.
+
+The schema is managed by Alembic (alembic upgrade head, once per deploy),
+not created here, so starting a worker opens no database connection and
+imports no data libraries: pandas, NumPy, openpyxl and Pillow load on the
+first request that needs them. Run with
+
+    uvicorn app.main:app                     # or: uvicorn --factory app.main:create_app
+"""
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
-from app.routes import batches, analysis, dashboard, import_data
-from app.database import engine, Base
-import uvicorn
+from app.routes import batches, analysis, dashboard, import_data, quality, isotherms, lineage, export, reports, images
+from app.database import engine, read_engine, pool_status
+from app.services import metrics
+from app.utils.storage import UPLOAD_DIR
+from anyio import to_thread
 import os
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
-app = FastAPI(
-    title="HGraph2 Data & Analysis API",
-    description="Hemp-derived graphene experimental data management and analysis",
-    version="1.0.0"
-)
-
-# CORS middleware for frontend
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000", "http://localhost:5173"],  # React dev servers
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Static file serving for uploads
-if os.path.exists("../uploads"):
-    app.mount("/uploads", StaticFiles(directory="../uploads"), name="uploads")
-
-# Include API routers
-app.include_router(batches.router, prefix="/api/v1/batches", tags=["batches"])
-app.include_router(analysis.router, prefix="/api/v1/analysis", tags=["analysis"])
-app.include_router(dashboard.router, prefix="/api/v1/dashboard", tags=["dashboard"])
-app.include_router(import_data.router, prefix="/api/v1/import", tags=["import"])
-
-@app.get("/")
-async def root():
-    return {
-        "message": "HGraph2 Data & Analysis API", 
-        "version": "1.0.0",
-        "status": "active"
-    }
-
-@app.get("/health")
-async def health_check():
-    return {"status": "healthy", "database": "connected"}
+# Threads available to sync route handlers (anyio's default is 40)
+THREADPOOL_WORKERS = int(os.getenv("THREADPOOL_WORKERS", "0"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Handlers that query the database or parse files are plain def, so FastAPI
+    # runs them on this thread pool and they never block the event loop
+    if THREADPOOL_WORKERS:
+        to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_WORKERS
+    yield
+    # Close pooled connections rather than leaving them to the database to time out
+    engine.dispose()
+    if read_engine is not engine:
+        read_engine.dispose()
+
+def create_app() -> FastAPI:
+    """Build the API application"""
+    app = FastAPI(
+        title="HGraph2 Data & Analysis API",
+        description="Hemp-derived graphene experimental data management and analysis",
+        version="1.0.0",
+        lifespan=lifespan
+    )
+
+    # Per-route latency and SQL statement metrics (/metrics); ?profile=1 when PROFILING_ENABLED
+    if metrics.METRICS_ENABLED:
+        app.add_middleware(metrics.MetricsMiddleware)
+
+    # CORS middleware for frontend
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:3000", "http://localhost:5173"],  # React dev servers
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "ETag", "Server-Timing"],
+    )
+
+    # Image paths stored by older versions (uploads/sem_images/...); newer images are served by /api/v1/images
+    for legacy_dir in ("sem_images", "tem_images"):
+        if os.path.isdir(os.path.join(UPLOAD_DIR, legacy_dir)):
+            app.mount(f"/uploads/{legacy_dir}", StaticFiles(directory=os.path.join(UPLOAD_DIR, legacy_dir)),
+                      name=f"uploads-{legacy_dir}")
+
+    # Include API routers
+    app.include_router(batches.router, prefix="/api/v1/batches", tags=["batches"])
+    app.include_router(analysis.router, prefix="/api/v1/analysis", tags=["analysis"])
+    app.include_router(dashboard.router, prefix="/api/v1/dashboard", tags=["dashboard"])
+    app.include_router(import_data.router, prefix="/api/v1/import", tags=["import"])
+    app.include_router(quality.router, prefix="/api/v1/quality", tags=["quality"])
+    app.include_router(isotherms.router, prefix="/api/v1/isotherms", tags=["isotherms"])
+    app.include_router(lineage.router, prefix="/api/v1/lineage", tags=["lineage"])
+    app.include_router(export.router, prefix="/api/v1/export", tags=["export"])
+    app.include_router(reports.router, prefix="/api/v1/reports", tags=["reports"])
+    app.include_router(images.router, prefix="/api/v1/images", tags=["images"])
+
+    @app.get("/")
+    async def root():
+        return {
+            "message": "HGraph2 Data & Analysis API",
+            "version": "1.0.0",
+            "status": "active"
+        }
+
+    @app.get("/health")
+    async def health_check():
+        return {"status": "healthy", "database": "connected", "database_pool": pool_status()}
+
+    @app.get("/metrics", include_in_schema=False)
+    def get_metrics():
+        """Prometheus scrape endpoint"""
+        return PlainTextResponse(metrics.render_metrics(), media_type="text/plain; version=0.0.4")
+
+    return app
+
+app = create_app()
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    import uvicorn
+
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
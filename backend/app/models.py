@@ -1,12 +1,42 @@
-from sqlalchemy import Column, String, Float, Integer, Boolean, DateTime, Text, JSON, Date, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Float, Integer, BigInteger, Boolean, DateTime, Text, JSON, Date, ForeignKey, UniqueConstraint, Index, LargeBinary, text
+from sqlalchemy import TypeDecorator, Uuid, literal_column
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
 from app.database import Base
 
+class UUID(TypeDecorator):
+    """Native UUID on PostgreSQL, CHAR(32) on SQLite; binds UUIDs or their string form"""
+    impl = Uuid
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return uuid.UUID(value) if isinstance(value, str) else value
+
+# Characters that vary between lab sheets without changing the batch ("MRa 445", "TB1175-B")
+BATCH_NAME_SEPARATORS = (' ', '-', '_', '.', '/')
+
+def normalised_name_sql(column):
+    """lower(name) with BATCH_NAME_SEPARATORS removed.
+
+    The separators are rendered as literals, not bound parameters, so a
+    query using this expression matches ix_graphene_batches_normalised_name.
+    """
+    expression = func.lower(column)
+    for separator in BATCH_NAME_SEPARATORS:
+        expression = func.replace(expression, literal_column(f"'{separator}'"), literal_column("''"))
+    return expression
+
 class BiocharBatch(Base):
     __tablename__ = "biochar_batches"
+    __table_args__ = (
+        # Default listing order / keyset pagination, and the list filters
+        Index("ix_biochar_batches_date_created_id", "date_created", "id"),
+        Index("ix_biochar_batches_oven_date_created", "oven", "date_created"),
+        Index("ix_biochar_batches_operator", "operator"),
+        Index("ix_biochar_batches_temperature_id", "temperature", "id"),
+        Index("ix_biochar_batches_yield_percent_id", "yield_percent", "id"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String(50), unique=True, nullable=False, index=True)
@@ -30,12 +60,38 @@ class BiocharBatch(Base):
     is_milestone = Column(Boolean, default=False)
     quality_notes = Column(Text)
     
+    # Hash of the imported row values, used to skip unchanged re-imports
+    content_hash = Column(String(64))
+    
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
 class GrapheneBatch(Base):
     __tablename__ = "graphene_batches"
+    __table_args__ = (
+        # Default listing order / keyset pagination, and the list filters
+        Index("ix_graphene_batches_date_created_id", "date_created", "id"),
+        Index("ix_graphene_batches_oven_date_created", "oven", "date_created"),
+        Index("ix_graphene_batches_species_date_created", "species", "date_created"),
+        Index("ix_graphene_batches_temperature_id", "temperature", "id"),
+        # Partial indexes for shipped batches and the Oven C era
+        Index(
+            "ix_graphene_batches_shipped_date_id", "shipped_date", "id",
+            postgresql_where=text("shipped_to IS NOT NULL"),
+            sqlite_where=text("shipped_to IS NOT NULL")
+        ),
+        Index(
+            "ix_graphene_batches_oven_c_era_date_created_id", "date_created", "id",
+            postgresql_where=text("is_oven_c_era"),
+            sqlite_where=text("is_oven_c_era = 1")
+        ),
+        Index(
+            "ix_graphene_batches_oven_c_era_unshipped", "date_created",
+            postgresql_where=text("is_oven_c_era AND shipped_to IS NULL"),
+            sqlite_where=text("is_oven_c_era = 1 AND shipped_to IS NULL")
+        ),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String(50), unique=True, nullable=False, index=True)
@@ -68,6 +124,9 @@ class GrapheneBatch(Base):
     is_oven_c_era = Column(Boolean, default=False)  # post April 2025
     quality_notes = Column(Text)
     
+    # Hash of the imported row values, used to skip unchanged re-imports
+    content_hash = Column(String(64))
+    
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -75,8 +134,15 @@ class GrapheneBatch(Base):
     # Relationships
     analysis_results = relationship("AnalysisResult", back_populates="graphene_batch")
 
+# Sample name -> batch resolution on import (services.batch_names)
+Index("ix_graphene_batches_normalised_name", normalised_name_sql(GrapheneBatch.name))
+
 class AnalysisResult(Base):
     __tablename__ = "analysis_results"
+    __table_args__ = (
+        # Foreign key lookups, newest analysis first
+        Index("ix_analysis_results_graphene_batch_id_date_analyzed", "graphene_batch_id", "date_analyzed"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     graphene_batch_id = Column(UUID(as_uuid=True), ForeignKey("graphene_batches.id"), nullable=False)
@@ -103,11 +169,186 @@ class AnalysisResult(Base):
     reports = Column(JSON)               # PDF reports, etc.
     
     comments = Column(Text)
+    
+    # Hash of the imported row values; unique so re-imports cannot duplicate results
+    content_hash = Column(String(64), unique=True, index=True)
+    
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
     graphene_batch = relationship("GrapheneBatch", back_populates="analysis_results")
 
+class BatchAnalysisSummary(Base):
+    """Per-batch rollup of analysis results, maintained on every analysis write"""
+    __tablename__ = "batch_analysis_summaries"
+    
+    graphene_batch_id = Column(UUID(as_uuid=True), ForeignKey("graphene_batches.id", ondelete="CASCADE"), primary_key=True)
+    analysis_count = Column(Integer, nullable=False, default=0)
+    
+    # BET rollup; count and sum are kept so the mean can be updated incrementally
+    bet_count = Column(Integer, nullable=False, default=0)
+    bet_sum = Column(Float, nullable=False, default=0)
+    max_bet = Column(Float, index=True)
+    mean_bet = Column(Float)
+    
+    max_conductivity = Column(Float)
+    latest_analysis_date = Column(Date)
+    energy_grade = Column(String(20))    # grade of max_bet, see BET_TARGETS
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class ImportedFile(Base):
+    __tablename__ = "imported_files"
+    __table_args__ = (UniqueConstraint("sha256", "data_type"),)
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    sha256 = Column(String(64), nullable=False)
+    data_type = Column(String(20), nullable=False)  # "biochar", "graphene", "analysis"
+    filename = Column(String(255))
+    total_rows = Column(Integer)
+    imported_count = Column(Integer)
+    imported_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ImportJob(Base):
+    """Background import job; its state lives here so any API worker can report progress"""
+    __tablename__ = "import_jobs"
+    __table_args__ = (Index("ix_import_jobs_created_at", "created_at"),)
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    filename = Column(String(255))
+    data_type = Column(String(20), nullable=False)
+    on_conflict = Column(String(10), nullable=False)
+    file_sha256 = Column(String(64))
+    status = Column(String(20), nullable=False)   # "queued", "running", "completed", "failed"
+    rows_parsed = Column(Integer, nullable=False, default=0)
+    rows_inserted = Column(Integer, nullable=False, default=0)
+    error_count = Column(Integer, nullable=False, default=0)
+    errors = Column(JSON)
+    warnings = Column(JSON)
+    details = Column(JSON)
+    rows_per_second = Column(Float)
+    message = Column(Text)
+    
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+
+class Isotherm(Base):
+    """Raw N2 adsorption isotherm with its fitted surface area and porosity results"""
+    __tablename__ = "isotherms"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    graphene_batch_id = Column(UUID(as_uuid=True), ForeignKey("graphene_batches.id", ondelete="CASCADE"), index=True)
+    analysis_result_id = Column(UUID(as_uuid=True), ForeignKey("analysis_results.id", ondelete="SET NULL"), index=True)
+    sample_name = Column(String(100))
+    source_filename = Column(String(255))
+    adsorbate = Column(String(20), default="N2")
+    
+    # Points as little-endian float32 arrays (see services/isotherms.py)
+    point_count = Column(Integer, nullable=False)
+    relative_pressure = Column(LargeBinary, nullable=False)   # P/P0
+    quantity_adsorbed = Column(LargeBinary, nullable=False)   # cm³/g STP
+    desorption_pressure = Column(LargeBinary)
+    desorption_quantity = Column(LargeBinary)
+    
+    # Fit results
+    bet_area = Column(Float)                 # m²/g
+    bet_c = Column(Float)
+    bet_r_squared = Column(Float)
+    langmuir_area = Column(Float)            # m²/g
+    tplot_external_area = Column(Float)      # m²/g
+    tplot_micropore_volume = Column(Float)   # cm³/g
+    total_pore_volume = Column(Float)        # cm³/g
+    mean_pore_diameter = Column(Float)       # nm
+    pore_size_distribution = Column(JSON)    # {"diameter_nm": [...], "dv_dlogd": [...]}
+    fitted_at = Column(DateTime(timezone=True))
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class SpcState(Base):
+    """Running control statistics for one metric of one oven/species stream"""
+    __tablename__ = "spc_states"
+    __table_args__ = (UniqueConstraint("oven", "species", "metric"),)
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    oven = Column(String(20), nullable=False)      # "unknown" when the batch has no oven
+    species = Column(Integer, nullable=False)      # 0 when the batch has no species
+    metric = Column(String(30), nullable=False)    # AnalysisResult column, e.g. "bet_surface_area"
+    
+    # Welford running mean / sum of squared deviations
+    count = Column(Integer, nullable=False, default=0)
+    mean = Column(Float, nullable=False, default=0)
+    m2 = Column(Float, nullable=False, default=0)
+    
+    # EWMA and two-sided tabular CUSUM (in standard deviations)
+    ewma = Column(Float)
+    ewma_steps = Column(Integer, nullable=False, default=0)
+    cusum_high = Column(Float, nullable=False, default=0)
+    cusum_low = Column(Float, nullable=False, default=0)
+    
+    # z-scores of the latest points, enough for the Western Electric run rules
+    recent_z = Column(JSON)
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class SpcAlert(Base):
+    __tablename__ = "spc_alerts"
+    __table_args__ = (
+        Index("ix_spc_alerts_acknowledged_created_at", "acknowledged", "created_at"),
+    )
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    analysis_result_id = Column(UUID(as_uuid=True), ForeignKey("analysis_results.id", ondelete="CASCADE"), index=True)
+    graphene_batch_id = Column(UUID(as_uuid=True), ForeignKey("graphene_batches.id", ondelete="CASCADE"))
+    oven = Column(String(20), nullable=False)
+    species = Column(Integer, nullable=False)
+    metric = Column(String(30), nullable=False)
+    
+    rule = Column(String(20), nullable=False)      # "WE1".."WE4", "EWMA", "CUSUM_HIGH", "CUSUM_LOW"
+    message = Column(Text)
+    value = Column(Float)
+    center = Column(Float)                         # running mean before this point
+    sigma = Column(Float)                          # running standard deviation before this point
+    date_analyzed = Column(Date)
+    
+    acknowledged = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class LineageEdge(Base):
+    """Normalised parent -> child link between batches (and milestones), mirrored from the JSON id lists"""
+    __tablename__ = "lineage_edges"
+    __table_args__ = (
+        # Upward walks; downward walks use the primary key
+        Index("ix_lineage_edges_child_id", "child_id"),
+    )
+    
+    parent_id = Column(UUID(as_uuid=True), primary_key=True)
+    child_id = Column(UUID(as_uuid=True), primary_key=True)
+    relation = Column(String(20), primary_key=True)   # "derived_from" (biochar -> graphene), "affects" (milestone -> batch)
+    parent_type = Column(String(20), nullable=False)  # "biochar", "graphene", "milestone"
+    child_type = Column(String(20), nullable=False)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class LineageVersion(Base):
+    """Single row counting lineage edge writes; bumped in the same transaction as the edges"""
+    __tablename__ = "lineage_version"
+    
+    id = Column(Integer, primary_key=True)            # always 1
+    version = Column(BigInteger, nullable=False, default=0)
+
+class StoredImage(Base):
+    """Content-addressed SEM/TEM image file, shared by every analysis that attaches the same bytes"""
+    __tablename__ = "stored_images"
+    
+    sha256 = Column(String(64), primary_key=True)
+    size_bytes = Column(Integer, nullable=False)
+    content_type = Column(String(100))
+    original_filename = Column(String(255))   # name it was first uploaded as
+    ref_count = Column(Integer, nullable=False, default=0)   # analysis image lists referencing it
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
 class Milestone(Base):
     __tablename__ = "milestones"
     
@@ -0,0 +1,145 @@
+"""Query plan check for the API read routes.
+
+Seeds the database at production-like scale (only when it is empty), runs
+the list, detail, analysis and dashboard requests the UI makes, captures
+every SELECT they issue and EXPLAINs it. Any statement that falls back to a
+sequential scan of a seeded table is reported and the exit status is 1, so
+a missing or unusable index fails CI.
+
+Run against a scratch database, with the schema at alembic head:
+
+    DATABASE_URL=postgresql://.../hgraph2_plan_check python -m app.query_plan_check --seed 20000
+"""
+from sqlalchemy import event, func, select
+from app.data_generator import generate
+from app.database import SessionLocal, engine
+from app.models import BiocharBatch, GrapheneBatch
+from typing import Any, Dict, List, Tuple
+import argparse
+import json
+import sys
+
+# Tables big enough in production that a full scan is a regression
+SEEDED_TABLES = ("biochar_batches", "graphene_batches", "analysis_results", "batch_analysis_summaries")
+
+# Routes that read every row by design
+FULL_SCAN_ROUTES = {"/api/v1/dashboard/batch-performance"}
+
+def seed(db, graphene_count: int):
+    """Generate graphene_count graphene batches with their lots, analyses, shipments and lineage"""
+    generate(db, analyses=graphene_count * 2, prefix="PLAN")
+
+def probe_requests(db) -> List[str]:
+    """The read requests the UI makes, with IDs taken from the seeded data"""
+    batch_id = db.scalar(select(GrapheneBatch.id).order_by(GrapheneBatch.date_created.desc()).limit(1))
+    biochar_id = db.scalar(select(BiocharBatch.id).limit(1))
+    return [
+        "/api/v1/batches/biochar",
+        "/api/v1/batches/biochar?oven=C",
+        "/api/v1/batches/biochar?operator=Lab%20Team",
+        "/api/v1/batches/biochar?sort=temperature&order=asc",
+        "/api/v1/batches/biochar?sort=yield_percent",
+        "/api/v1/batches/biochar?sort=name&order=asc",
+        f"/api/v1/batches/biochar/{biochar_id}",
+        "/api/v1/batches/graphene",
+        "/api/v1/batches/graphene?oven=C",
+        "/api/v1/batches/graphene?species=1",
+        "/api/v1/batches/graphene?oven_c_era=true",
+        "/api/v1/batches/graphene?shipped_only=true",
+        "/api/v1/batches/graphene?shipped_only=true&sort=shipped_date",
+        "/api/v1/batches/graphene?sort=best_bet",
+        "/api/v1/batches/graphene?sort=temperature&order=asc",
+        "/api/v1/batches/graphene?sort=name&order=asc",
+        f"/api/v1/batches/graphene/{batch_id}",
+        f"/api/v1/analysis/batch/{batch_id}",
+        "/api/v1/dashboard/summary",
+        "/api/v1/dashboard/batch-performance",
+    ]
+
+def capture_selects(client, path: str) -> List[Tuple[str, Any]]:
+    """Issue a GET and return the SELECT statements it ran with their parameters"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = client.get(path)
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    if response.status_code != 200:
+        raise RuntimeError(f"GET {path} returned {response.status_code}: {response.text[:200]}")
+    return statements
+
+def full_scans(connection, statement: str, parameters) -> List[str]:
+    """Names of seeded tables the statement's plan scans sequentially"""
+    if connection.dialect.name == "postgresql":
+        plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return [
+            node["Relation Name"] for node in _plan_nodes(plan[0]["Plan"])
+            if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in SEEDED_TABLES
+        ]
+    if connection.dialect.name == "sqlite":
+        scanned = []
+        for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters):
+            words = row[-1].split()
+            # "SCAN t" is a full table scan; "SCAN t USING INDEX ..." walks an index in order
+            if words[0] == "SCAN" and "USING" not in words and words[1] in SEEDED_TABLES:
+                scanned.append(words[1])
+        return scanned
+    raise ValueError(f"EXPLAIN is not supported for {connection.dialect.name}")
+
+def _plan_nodes(node: Dict[str, Any]):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child)
+
+def analyze(connection):
+    """Refresh planner statistics after seeding"""
+    if connection.dialect.name == "postgresql":
+        for table in SEEDED_TABLES:
+            connection.exec_driver_sql(f"ANALYZE {table}")
+    else:
+        connection.exec_driver_sql("ANALYZE")
+    connection.commit()
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=20000, help="graphene batches to seed into an empty database")
+    args = parser.parse_args(argv)
+
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    db = SessionLocal()
+    try:
+        if not db.scalar(select(func.count()).select_from(GrapheneBatch)):
+            print(f"Seeding {args.seed} graphene batches...")
+            seed(db, args.seed)
+        with engine.connect() as connection:
+            analyze(connection)
+        paths = probe_requests(db)
+    finally:
+        db.close()
+
+    client = TestClient(app)
+    offenders = []
+    with engine.connect() as connection:
+        for path in paths:
+            route = path.split("?")[0]
+            for statement, parameters in capture_selects(client, path):
+                tables = full_scans(connection, statement, parameters)
+                if tables and route not in FULL_SCAN_ROUTES:
+                    offenders.append((path, tables, statement))
+            print(f"{'✅' if not any(o[0] == path for o in offenders) else '❌'} {path}")
+
+    for path, tables, statement in offenders:
+        print(f"\nSequential scan of {', '.join(sorted(set(tables)))} in GET {path}:\n{statement}")
+    return 1 if offenders else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
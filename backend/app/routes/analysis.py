@@ -1,17 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.database import get_db
-from app.models import AnalysisResult, GrapheneBatch, BET_TARGETS
+from typing import Any, Callable, List, Optional
+from app.database import get_db, get_read_db
+from app.models import AnalysisResult, GrapheneBatch
 from app.schemas import AnalysisResultCreate, AnalysisResultResponse
-import shutil
-import os
-from uuid import uuid4
+from app.services import cache, correlations, image_derivatives, image_store
+from app.services.batch_summary import apply_analysis_result, calculate_energy_grade
+from app.services.spc import record_measurements
+from app.utils.http_cache import conditional_response
+from fastapi.concurrency import run_in_threadpool
+from datetime import date
+import asyncio
 
 router = APIRouter()
 
 @router.post("/", response_model=AnalysisResultResponse)
-async def create_analysis_result(
+def create_analysis_result(
     analysis: AnalysisResultCreate, 
     db: Session = Depends(get_db)
 ):
@@ -24,16 +28,20 @@ async def create_analysis_result(
     
     db_analysis = AnalysisResult(**analysis.dict())
     db.add(db_analysis)
+    db.flush()
+    apply_analysis_result(db, db_analysis)
+    record_measurements(db, [db_analysis])
     db.commit()
+    cache.bump("analysis")
     db.refresh(db_analysis)
     
     # Add energy storage grade calculation
-    db_analysis.energy_storage_grade = _calculate_energy_grade(db_analysis.bet_surface_area)
+    db_analysis.energy_storage_grade = calculate_energy_grade(db_analysis.bet_surface_area)
     
     return db_analysis
 
 @router.get("/batch/{batch_id}", response_model=List[AnalysisResultResponse])
-async def get_batch_analysis(batch_id: str, db: Session = Depends(get_db)):
+def get_batch_analysis(batch_id: str, db: Session = Depends(get_db)):
     """Get all analysis results for a specific graphene batch"""
     results = db.query(AnalysisResult).filter(
         AnalysisResult.graphene_batch_id == batch_id
@@ -41,7 +49,7 @@ async def get_batch_analysis(batch_id: str, db: Session = Depends(get_db)):
     
     # Add energy storage grades
     for result in results:
-        result.energy_storage_grade = _calculate_energy_grade(result.bet_surface_area)
+        result.energy_storage_grade = calculate_energy_grade(result.bet_surface_area)
     
     return results
 
@@ -52,64 +60,122 @@ async def upload_analysis_images(
     tem_files: List[UploadFile] = File([]),
     db: Session = Depends(get_db)
 ):
-    """Upload SEM/TEM images for an analysis result"""
+    """Upload SEM/TEM images for an analysis result
     
-    analysis = db.query(AnalysisResult).filter(AnalysisResult.id == analysis_id).first()
-    if not analysis:
-        raise HTTPException(status_code=404, detail="Analysis result not found")
+    Files are streamed to the content-addressed image store concurrently;
+    an image identical to one already stored is kept only once.
+    """
+    analysis = await run_in_threadpool(_get_analysis, db, analysis_id)
     
-    sem_paths = []
-    tem_paths = []
+    try:
+        sem_images, tem_images = await asyncio.gather(
+            image_store.save_uploads(sem_files), image_store.save_uploads(tem_files)
+        )
+    except image_store.ImageTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # Save SEM images
-    for file in sem_files:
-        if file.filename:
-            file_id = str(uuid4())
-            file_path = f"uploads/sem_images/{file_id}_{file.filename}"
-            os.makedirs("uploads/sem_images", exist_ok=True)
-            
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-            sem_paths.append(file_path)
-    
-    # Save TEM images
-    for file in tem_files:
-        if file.filename:
-            file_id = str(uuid4())
-            file_path = f"uploads/tem_images/{file_id}_{file.filename}"
-            os.makedirs("uploads/tem_images", exist_ok=True)
-            
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-            tem_paths.append(file_path)
-    
-    # Update analysis with file paths
-    if sem_paths:
-        analysis.sem_images = (analysis.sem_images or []) + sem_paths
-    if tem_paths:
-        analysis.tem_images = (analysis.tem_images or []) + tem_paths
-    
-    db.commit()
+    def attach():
+        counts = {
+            "sem_count": image_store.attach_images(db, analysis, "sem_images", sem_images),
+            "tem_count": image_store.attach_images(db, analysis, "tem_images", tem_images)
+        }
+        db.commit()
+        return counts
     
+    counts = await run_in_threadpool(attach)
+    # Thumbnails and tile pyramids are rendered in the background
+    image_derivatives.schedule_derivatives(image["sha256"] for image in [*sem_images, *tem_images])
     return {
         "message": "Images uploaded successfully",
-        "sem_count": len(sem_paths),
-        "tem_count": len(tem_paths)
+        **counts,
+        "images": [
+            {**image, "url": image_store.image_url(image["sha256"])} for image in [*sem_images, *tem_images]
+        ]
     }
 
-def _calculate_energy_grade(bet_value: Optional[float]) -> Optional[str]:
-    """Calculate energy storage application grade based on BET surface area"""
-    if not bet_value:
-        return None
+@router.delete("/{analysis_id}/images/{sha256}")
+def delete_analysis_image(analysis_id: str, sha256: str, db: Session = Depends(get_db)):
+    """Detach an image from an analysis result (the file is removed once nothing references it)"""
+    analysis = _get_analysis(db, analysis_id)
+    removed = image_store.detach_image(db, analysis, sha256)
+    if not removed:
+        raise HTTPException(status_code=404, detail="Image not attached to this analysis result")
+    db.commit()
+    return {"message": "Image removed", "removed_count": removed}
+
+def _get_analysis(db: Session, analysis_id: str) -> AnalysisResult:
+    analysis = db.query(AnalysisResult).filter(AnalysisResult.id == analysis_id).first()
+    if not analysis:
+        raise HTTPException(status_code=404, detail="Analysis result not found")
+    return analysis
+
+# Process-parameter analytics; cached until batches or analyses change, read from the replica if configured
+DEFAULT_CORRELATION_VARIABLES = ["temperature", "koh_ratio", "time_hours", "species", "bet", "conductivity"]
+
+@router.get("/correlations")
+def get_correlations(
+    request: Request,
+    response: Response,
+    variables: List[str] = Query(DEFAULT_CORRELATION_VARIABLES),
+    method: str = "pearson",
+    oven_c_era: Optional[bool] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: Session = Depends(get_read_db)
+):
+    """Correlation matrix of process parameters and BET/conductivity across graphene batches"""
+    def compute():
+        arrays = correlations.load_process_arrays(db, oven_c_era, date_from, date_to)
+        return correlations.correlation_matrix(arrays, variables, method)
+    
+    return _cached_analytics(request, response, compute)
+
+@router.get("/correlations/groups")
+def get_correlation_groups(
+    request: Request,
+    response: Response,
+    by: str = "oven",
+    metrics: List[str] = Query(["bet", "conductivity"]),
+    oven_c_era: Optional[bool] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: Session = Depends(get_read_db)
+):
+    """Per-group count, mean, std, min and max of the metrics (group by oven, species, grinding_method or is_oven_c_era)"""
+    def compute():
+        arrays = correlations.load_process_arrays(db, oven_c_era, date_from, date_to)
+        return correlations.grouped_stats(arrays, by, metrics)
     
-    # Use supercapacitor targets as primary grade
-    targets = BET_TARGETS["supercapacitor"]
+    return _cached_analytics(request, response, compute)
+
+@router.get("/correlations/trends")
+def get_correlation_trends(
+    request: Request,
+    response: Response,
+    x: List[str] = Query(["temperature", "koh_ratio"]),
+    metric: str = "bet",
+    group_by: Optional[str] = "is_oven_c_era",
+    degree: int = Query(1, ge=1, le=correlations.MAX_TREND_DEGREE),
+    oven_c_era: Optional[bool] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: Session = Depends(get_read_db)
+):
+    """Least-squares trend of metric against each x parameter, per group, with a sampled curve for charting"""
+    def compute():
+        arrays = correlations.load_process_arrays(db, oven_c_era, date_from, date_to)
+        return correlations.trend_fits(arrays, x, metric, group_by or None, degree)
     
-    if bet_value >= targets["excellent"]:
-        return "Excellent"
-    elif bet_value >= targets["good"]:
-        return "Good"
-    elif bet_value >= targets["acceptable"]:
-        return "Acceptable"
-    else:
-        return "Poor"
+    return _cached_analytics(request, response, compute)
+
+def _cached_analytics(request: Request, response: Response, compute: Callable[[], Any]):
+    """Serve an analytics result from the cache, keyed by path and query parameters"""
+    params = sorted(request.query_params.multi_items())
+    key = f"{request.url.path}?{params}"
+    try:
+        value, etag = cache.get_or_compute(key, compute, ("batches", "analysis"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return conditional_response(request, response, value, etag)
@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.database import get_db
-from app.models import BiocharBatch, GrapheneBatch
+from app.utils.filters import biochar_filters, graphene_filters
+from app.utils.pagination import NEXT_CURSOR_HEADER, apply_keyset, decode_cursor, encode_cursor, parse_date
+from app.models import BiocharBatch, GrapheneBatch, BatchAnalysisSummary
+from app.services import cache
+from app.services.lineage import LINEAGE_NAMESPACE, sync_graphene_edges
 from app.schemas import (
     BiocharBatchCreate, BiocharBatchResponse,
     GrapheneBatchCreate, GrapheneBatchResponse
@@ -13,7 +17,7 @@ router = APIRouter()
 
 # Biochar Batch endpoints
 @router.post("/biochar", response_model=BiocharBatchResponse)
-async def create_biochar_batch(batch: BiocharBatchCreate, db: Session = Depends(get_db)):
+def create_biochar_batch(batch: BiocharBatchCreate, db: Session = Depends(get_db)):
     """Create a new biochar batch (Step 1)"""
     db_batch = BiocharBatch(**batch.dict())
     
@@ -23,29 +27,33 @@ async def create_biochar_batch(batch: BiocharBatchCreate, db: Session = Depends(
     
     db.add(db_batch)
     db.commit()
+    cache.bump("batches")
     db.refresh(db_batch)
     return db_batch
 
 @router.get("/biochar", response_model=List[BiocharBatchResponse])
-async def get_biochar_batches(
+def get_biochar_batches(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     oven: Optional[str] = None,
     operator: Optional[str] = None,
+    sort: str = "date_created",
+    order: str = "desc",
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """Get list of biochar batches with optional filtering"""
-    query = db.query(BiocharBatch)
+    """Get list of biochar batches with optional filtering
     
-    if oven:
-        query = query.filter(BiocharBatch.oven == oven)
-    if operator:
-        query = query.filter(BiocharBatch.operator == operator)
+    Pass the X-Next-Cursor response header back as cursor to fetch the next page.
+    """
+    query = db.query(BiocharBatch).filter(*biochar_filters(oven, operator))
     
-    return query.offset(skip).limit(limit).all()
+    rows = _keyset_page(query, BIOCHAR_SORT_KEYS, BiocharBatch.id, sort, order, cursor, skip, limit, response)
+    return [batch for batch, in rows]
 
 @router.get("/biochar/{batch_id}", response_model=BiocharBatchResponse)
-async def get_biochar_batch(batch_id: str, db: Session = Depends(get_db)):
+def get_biochar_batch(batch_id: str, db: Session = Depends(get_db)):
     """Get specific biochar batch by ID"""
     batch = db.query(BiocharBatch).filter(BiocharBatch.id == batch_id).first()
     if not batch:
@@ -54,7 +62,7 @@ async def get_biochar_batch(batch_id: str, db: Session = Depends(get_db)):
 
 # Graphene Batch endpoints
 @router.post("/graphene", response_model=GrapheneBatchResponse)
-async def create_graphene_batch(batch: GrapheneBatchCreate, db: Session = Depends(get_db)):
+def create_graphene_batch(batch: GrapheneBatchCreate, db: Session = Depends(get_db)):
     """Create a new graphene batch (Step 2)"""
     batch_data = batch.dict()
     
@@ -64,63 +72,106 @@ async def create_graphene_batch(batch: GrapheneBatchCreate, db: Session = Depend
     
     db_batch = GrapheneBatch(**batch_data)
     db.add(db_batch)
+    db.flush()
+    sync_graphene_edges(db, [db_batch.id])
     db.commit()
+    cache.bump("batches", LINEAGE_NAMESPACE)
     db.refresh(db_batch)
     return db_batch
 
 @router.get("/graphene", response_model=List[GrapheneBatchResponse])
-async def get_graphene_batches(
+def get_graphene_batches(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     oven: Optional[str] = None,
     species: Optional[int] = None,
     shipped_only: bool = False,
     oven_c_era: Optional[bool] = None,
+    sort: str = "date_created",
+    order: str = "desc",
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """Get list of graphene batches with filtering"""
-    query = db.query(GrapheneBatch)
+    """Get list of graphene batches with filtering
     
-    if oven:
-        query = query.filter(GrapheneBatch.oven == oven)
-    if species:
-        query = query.filter(GrapheneBatch.species == species)
-    if shipped_only:
-        query = query.filter(GrapheneBatch.shipped_to.isnot(None))
-    if oven_c_era is not None:
-        query = query.filter(GrapheneBatch.is_oven_c_era == oven_c_era)
+    Pass the X-Next-Cursor response header back as cursor to fetch the next page.
+    """
+    query = db.query(GrapheneBatch, BatchAnalysisSummary).outerjoin(BatchAnalysisSummary).filter(
+        *graphene_filters(oven, species, shipped_only, oven_c_era)
+    )
     
-    # Order by date created (newest first)
-    query = query.order_by(GrapheneBatch.date_created.desc())
-    
-    batches = query.offset(skip).limit(limit).all()
-    
-    # Add analysis summary to each batch
-    for batch in batches:
-        analysis_results = [r for r in batch.analysis_results]
-        batch.analysis_count = len(analysis_results)
-        if analysis_results:
-            bet_values = [r.bet_surface_area for r in analysis_results if r.bet_surface_area]
-            conductivity_values = [r.conductivity for r in analysis_results if r.conductivity]
-            batch.best_bet = max(bet_values) if bet_values else None
-            batch.best_conductivity = max(conductivity_values) if conductivity_values else None
-    
-    return batches
+    rows = _keyset_page(query, GRAPHENE_SORT_KEYS, GrapheneBatch.id, sort, order, cursor, skip, limit, response)
+    return [_with_analysis_summary(*row) for row in rows]
 
 @router.get("/graphene/{batch_id}", response_model=GrapheneBatchResponse)
-async def get_graphene_batch(batch_id: str, db: Session = Depends(get_db)):
+def get_graphene_batch(batch_id: str, db: Session = Depends(get_db)):
     """Get specific graphene batch with analysis summary"""
-    batch = db.query(GrapheneBatch).filter(GrapheneBatch.id == batch_id).first()
-    if not batch:
+    row = db.query(GrapheneBatch, BatchAnalysisSummary).outerjoin(BatchAnalysisSummary).filter(
+        GrapheneBatch.id == batch_id
+    ).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Graphene batch not found")
     
-    # Add analysis summary
-    analysis_results = batch.analysis_results
-    batch.analysis_count = len(analysis_results)
-    if analysis_results:
-        bet_values = [r.bet_surface_area for r in analysis_results if r.bet_surface_area]
-        conductivity_values = [r.conductivity for r in analysis_results if r.conductivity]
-        batch.best_bet = max(bet_values) if bet_values else None
-        batch.best_conductivity = max(conductivity_values) if conductivity_values else None
+    return _with_analysis_summary(*row)
+
+# Whitelisted sort keys for the list endpoints (newest first by default)
+BIOCHAR_SORT_KEYS = {
+    "date_created": (BiocharBatch.date_created, parse_date),
+    "temperature": (BiocharBatch.temperature, float),
+    "yield_percent": (BiocharBatch.yield_percent, float),
+    "name": (BiocharBatch.name, str)
+}
+
+GRAPHENE_SORT_KEYS = {
+    "date_created": (GrapheneBatch.date_created, parse_date),
+    "best_bet": (BatchAnalysisSummary.max_bet, float),
+    "temperature": (GrapheneBatch.temperature, float),
+    "shipped_date": (GrapheneBatch.shipped_date, parse_date),
+    "name": (GrapheneBatch.name, str)
+}
+
+def _keyset_page(query, sort_keys, id_column, sort: str, order: str, cursor: Optional[str],
+                 skip: int, limit: int, response: Response) -> list:
+    """Fetch one page ordered by (sort, id), setting the next-page cursor header when more rows follow
+
+    Returns the query's row tuples.
+    """
+    if sort not in sort_keys:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(sort_keys)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be asc or desc")
+    
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor, sort, order, sort_keys)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    sort_column = sort_keys[sort][0]
+    query = apply_keyset(query, sort_column, id_column, order == "desc", after).add_columns(sort_column)
     
+    # Offset paging is still honoured for older clients, but only without a cursor
+    if skip and not cursor:
+        query = query.offset(skip)
+    rows = query.limit(limit + 1).all()
+    
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(sort, order, last[-1], last[0].id)
+    
+    # Drop the sort value added for the cursor
+    return [row[:-1] for row in rows]
+
+def _with_analysis_summary(batch: GrapheneBatch, summary: Optional[BatchAnalysisSummary]) -> GrapheneBatch:
+    """Attach the materialised analysis summary to a batch for the response model"""
+    batch.analysis_count = summary.analysis_count if summary else 0
+    if summary:
+        batch.best_bet = summary.max_bet
+        batch.mean_bet = summary.mean_bet
+        batch.best_conductivity = summary.max_conductivity
+        batch.latest_analysis_date = summary.latest_analysis_date
+        batch.energy_grade = summary.energy_grade
     return batch
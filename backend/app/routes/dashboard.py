@@ -1,70 +1,63 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from app.database import get_db
-from app.models import GrapheneBatch, AnalysisResult, BiocharBatch
+from sqlalchemy import func, select, true
+from app.database import get_read_db
+from app.models import GrapheneBatch, BatchAnalysisSummary
+from app.services import cache
+from app.utils.http_cache import conditional_response
 from typing import Dict, List, Any
 from datetime import date, timedelta
 
 router = APIRouter()
 
+# Cache namespaces the dashboard reads from, bumped by the batch, analysis and import writes
+DASHBOARD_DEPENDS_ON = ("batches", "analysis")
+
+# Size of the summary's recent shipments list and rolling BET average window
+RECENT_SHIPMENTS = 5
+RECENT_OVEN_C_BATCHES = 10
+
 @router.get("/summary")
-async def get_dashboard_summary(db: Session = Depends(get_db)) -> Dict[str, Any]:
+def get_dashboard_summary(request: Request, response: Response, db: Session = Depends(get_read_db)) -> Dict[str, Any]:
     """Get executive summary for dashboard"""
-    
-    # Get latest Oven C performance
-    oven_c_batches = db.query(GrapheneBatch).filter(
-        GrapheneBatch.is_oven_c_era == True
-    ).order_by(desc(GrapheneBatch.date_created)).limit(10).all()
-    
-    # Get best BET results
-    best_bet_query = db.query(
-        GrapheneBatch.name,
-        GrapheneBatch.shipped_to,
-        func.max(AnalysisResult.bet_surface_area).label('max_bet')
-    ).join(AnalysisResult).filter(
-        GrapheneBatch.is_oven_c_era == True,
-        AnalysisResult.bet_surface_area.isnot(None)
-    ).group_by(GrapheneBatch.name, GrapheneBatch.shipped_to).order_by(
-        desc('max_bet')
-    ).first()
-    
-    # Calculate average BET for last 10 batches
-    recent_bet_avg = db.query(func.avg(AnalysisResult.bet_surface_area)).join(
-        GrapheneBatch
-    ).filter(
-        GrapheneBatch.is_oven_c_era == True,
-        AnalysisResult.bet_surface_area.isnot(None)
-    ).scalar()
-    
-    # Get shipment status
-    shipped_batches = db.query(GrapheneBatch).filter(
-        GrapheneBatch.shipped_to.isnot(None)
-    ).all()
-    
-    pending_shipments = db.query(GrapheneBatch).filter(
-        GrapheneBatch.shipped_to.is_(None),
-        GrapheneBatch.is_oven_c_era == True
-    ).count()
+    value, etag = cache.get_or_compute(
+        "dashboard:summary", lambda: _dashboard_summary(db), DASHBOARD_DEPENDS_ON
+    )
+    return conditional_response(request, response, value, etag)
+
+@router.get("/batch-performance")
+def get_batch_performance(request: Request, response: Response, db: Session = Depends(get_read_db)):
+    """Get batch performance data for visualization"""
+    value, etag = cache.get_or_compute(
+        "dashboard:batch-performance", lambda: _batch_performance(db), DASHBOARD_DEPENDS_ON
+    )
+    return conditional_response(request, response, value, etag)
+
+def _dashboard_summary(db: Session) -> Dict[str, Any]:
+    # One statement: a single row of counts/aggregates, left joined to the recent shipments
+    rows = db.execute(_summary_statement()).all()
+    first = rows[0]
+    avg_bet_recent = first.avg_bet_recent
     
     return {
         "oven_c_performance": {
-            "total_batches": len(oven_c_batches),
-            "best_bet": best_bet_query.max_bet if best_bet_query else None,
-            "best_batch": best_bet_query.name if best_bet_query else None,
-            "avg_bet_recent": round(recent_bet_avg, 1) if recent_bet_avg else None
+            "total_batches": first.oven_c_batches,
+            "best_bet": first.best_bet,
+            "best_batch": first.best_batch,
+            "recent_batches": first.recent_batches,
+            "avg_bet_recent": round(avg_bet_recent, 1) if avg_bet_recent else None
         },
         "shipments": {
-            "total_shipped": len(shipped_batches),
-            "pending": pending_shipments,
+            "total_shipped": first.total_shipped,
+            "pending": first.pending,
             "recent_shipments": [
                 {
-                    "batch": batch.name,
-                    "customer": batch.shipped_to,
-                    "weight": batch.shipped_weight,
-                    "date": batch.shipped_date.isoformat() if batch.shipped_date else None
+                    "batch": row.batch,
+                    "customer": row.customer,
+                    "weight": row.weight,
+                    "date": row.date.isoformat() if row.date else None
                 }
-                for batch in shipped_batches[-5:]  # Last 5 shipments
+                for row in rows if row.batch is not None
             ]
         },
         "insights": [
@@ -75,10 +68,55 @@ async def get_dashboard_summary(db: Session = Depends(get_db)) -> Dict[str, Any]
         ]
     }
 
-@router.get("/batch-performance")
-async def get_batch_performance(db: Session = Depends(get_db)):
-    """Get batch performance data for visualization"""
+def _summary_statement():
+    """Dashboard summary query; every part is an index lookup or a scan of a partial index"""
+    oven_c = GrapheneBatch.is_oven_c_era == True
+    shipped = GrapheneBatch.shipped_to.isnot(None)
+    
+    # Rolling average over the mean BET of the last N Oven C batches
+    recent_oven_c = select(BatchAnalysisSummary.mean_bet).select_from(GrapheneBatch).outerjoin(
+        BatchAnalysisSummary
+    ).where(oven_c).order_by(
+        GrapheneBatch.date_created.desc(), GrapheneBatch.id.desc()
+    ).limit(RECENT_OVEN_C_BATCHES).cte("recent_oven_c")
+    
+    best = select(
+        GrapheneBatch.name.label("best_batch"),
+        BatchAnalysisSummary.max_bet.label("best_bet")
+    ).join(BatchAnalysisSummary).where(
+        oven_c, BatchAnalysisSummary.max_bet.isnot(None)
+    ).order_by(BatchAnalysisSummary.max_bet.desc()).limit(1).cte("best")
+    
+    counts = select(
+        _count(oven_c).label("oven_c_batches"),
+        _count(shipped).label("total_shipped"),
+        _count(GrapheneBatch.shipped_to.is_(None), oven_c).label("pending"),
+        select(func.count()).select_from(recent_oven_c).scalar_subquery().label("recent_batches"),
+        select(func.avg(recent_oven_c.c.mean_bet)).scalar_subquery().label("avg_bet_recent"),
+        select(best.c.best_batch).scalar_subquery().label("best_batch"),
+        select(best.c.best_bet).scalar_subquery().label("best_bet")
+    ).cte("counts")
     
+    # Shipments without a date cannot be placed in the timeline, so only dated ones are listed
+    newest_first = (GrapheneBatch.shipped_date.desc(), GrapheneBatch.id.desc())
+    shipments = select(
+        GrapheneBatch.name.label("batch"),
+        GrapheneBatch.shipped_to.label("customer"),
+        GrapheneBatch.shipped_weight.label("weight"),
+        GrapheneBatch.shipped_date.label("date"),
+        func.row_number().over(order_by=newest_first).label("position")
+    ).where(shipped, GrapheneBatch.shipped_date.isnot(None)).order_by(
+        *newest_first
+    ).limit(RECENT_SHIPMENTS).cte("recent_shipments")
+    
+    return select(counts, shipments).select_from(
+        counts.outerjoin(shipments, true())
+    ).order_by(shipments.c.position)
+
+def _count(*conditions):
+    return select(func.count()).select_from(GrapheneBatch).where(*conditions).scalar_subquery()
+
+def _batch_performance(db: Session) -> List[Dict[str, Any]]:
     # Get all graphene batches with their best analysis results
     batches_query = db.query(
         GrapheneBatch.name,
@@ -89,19 +127,9 @@ async def get_batch_performance(db: Session = Depends(get_db)):
         GrapheneBatch.koh_ratio,
         GrapheneBatch.is_oven_c_era,
         GrapheneBatch.shipped_to,
-        func.max(AnalysisResult.bet_surface_area).label('best_bet'),
-        func.max(AnalysisResult.conductivity).label('best_conductivity')
-    ).outerjoin(AnalysisResult).group_by(
-        GrapheneBatch.id,
-        GrapheneBatch.name,
-        GrapheneBatch.date_created,
-        GrapheneBatch.oven,
-        GrapheneBatch.species,
-        GrapheneBatch.temperature,
-        GrapheneBatch.koh_ratio,
-        GrapheneBatch.is_oven_c_era,
-        GrapheneBatch.shipped_to
-    ).order_by(GrapheneBatch.date_created).all()
+        BatchAnalysisSummary.max_bet.label('best_bet'),
+        BatchAnalysisSummary.max_conductivity.label('best_conductivity')
+    ).outerjoin(BatchAnalysisSummary).order_by(GrapheneBatch.date_created).all()
     
     return [
         {
@@ -0,0 +1,242 @@
+"""Streaming bulk exports of batches and analysis results.
+
+Rows are read from a server-side cursor (yield_per) in EXPORT_BATCH_ROWS
+partitions and each partition is encoded and sent before the next is
+fetched, so memory stays flat however large the export. Formats: csv,
+ndjson, parquet and arrow (IPC stream); the last two use pyarrow, which is
+in requirements.txt, and answer 501 on an install without it.
+"""
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, select
+from app.database import ReadSessionLocal
+from app.models import AnalysisResult, BatchAnalysisSummary, BiocharBatch, GrapheneBatch
+from app.utils.filters import analysis_filters, biochar_filters, graphene_filters
+from datetime import date, datetime
+from typing import Any, Iterator, List, Optional
+import csv
+import io
+import itertools
+import json
+import os
+import uuid
+
+router = APIRouter()
+
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "5000"))
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream"
+}
+
+# Internal bookkeeping columns left out of exports
+EXCLUDED_COLUMNS = ("content_hash",)
+
+@router.get("/graphene")
+def export_graphene_batches(
+    format: str = "csv",
+    oven: Optional[str] = None,
+    species: Optional[int] = None,
+    shipped_only: bool = False,
+    oven_c_era: Optional[bool] = None
+):
+    """Export graphene batches with their analysis summary (same filters as /batches/graphene)"""
+    columns = _table_columns(GrapheneBatch) + [
+        BatchAnalysisSummary.analysis_count,
+        BatchAnalysisSummary.max_bet.label("best_bet"),
+        BatchAnalysisSummary.mean_bet,
+        BatchAnalysisSummary.max_conductivity.label("best_conductivity"),
+        BatchAnalysisSummary.latest_analysis_date,
+        BatchAnalysisSummary.energy_grade
+    ]
+    statement = select(*columns).outerjoin(BatchAnalysisSummary).where(
+        *graphene_filters(oven, species, shipped_only, oven_c_era)
+    ).order_by(GrapheneBatch.date_created, GrapheneBatch.id)
+    return _export(statement, columns, format, "graphene_batches")
+
+@router.get("/biochar")
+def export_biochar_batches(
+    format: str = "csv",
+    oven: Optional[str] = None,
+    operator: Optional[str] = None
+):
+    """Export biochar batches (same filters as /batches/biochar)"""
+    columns = _table_columns(BiocharBatch)
+    statement = select(*columns).where(*biochar_filters(oven, operator)).order_by(
+        BiocharBatch.date_created, BiocharBatch.id
+    )
+    return _export(statement, columns, format, "biochar_batches")
+
+@router.get("/analysis")
+def export_analysis_results(
+    format: str = "csv",
+    graphene_batch_id: Optional[uuid.UUID] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None
+):
+    """Export analysis results with their batch name"""
+    columns = _table_columns(AnalysisResult)
+    columns.insert(2, GrapheneBatch.name.label("batch_name"))
+    statement = select(*columns).join(GrapheneBatch).where(
+        *analysis_filters(graphene_batch_id, date_from, date_to)
+    ).order_by(AnalysisResult.graphene_batch_id, AnalysisResult.date_analyzed, AnalysisResult.id)
+    return _export(statement, columns, format, "analysis_results")
+
+def _table_columns(model) -> list:
+    return [column for column in model.__table__.columns if column.name not in EXCLUDED_COLUMNS]
+
+def _export(statement, columns: list, format: str, name: str) -> StreamingResponse:
+    if format not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(MEDIA_TYPES)}")
+    if format in ("parquet", "arrow"):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail=f"{format} export requires pyarrow to be installed")
+
+    names = [column.key for column in columns]
+    encoders = {"csv": _csv_chunks, "ndjson": _ndjson_chunks, "parquet": _arrow_chunks, "arrow": _arrow_chunks}
+    extension = "parquet" if format == "parquet" else format
+    filename = f"hgraph2_{name}_{date.today().isoformat()}.{extension}"
+    return StreamingResponse(
+        encoders[format](_started_partitions(statement), names, columns, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+def _started_partitions(statement) -> Iterator[List[Any]]:
+    """Run the query and fetch its first partition now, so errors become an
+    error response instead of an empty or truncated 200 download"""
+    partitions = _partitions(statement)
+    first = next(partitions, None)
+    return itertools.chain([first] if first is not None else [], partitions)
+
+def _partitions(statement) -> Iterator[List[Any]]:
+    """Rows in EXPORT_BATCH_ROWS partitions from a server-side cursor.
+
+    The session is opened here, not by a dependency, because the body is
+    produced after the route function has returned.
+    """
+    db = ReadSessionLocal()
+    try:
+        result = db.execute(statement.execution_options(yield_per=EXPORT_BATCH_ROWS))
+        for partition in result.partitions():
+            yield partition
+    finally:
+        db.close()
+
+def _text_value(value: Any) -> Any:
+    """Plain JSON/CSV representation of a column value"""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+def _csv_chunks(partitions, names: List[str], columns: list, format: str) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    for partition in partitions:
+        for row in partition:
+            writer.writerow([
+                json.dumps(value) if isinstance(value, (list, dict)) else
+                "" if value is None else _text_value(value)
+                for value in row
+            ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def _ndjson_chunks(partitions, names: List[str], columns: list, format: str) -> Iterator[str]:
+    for partition in partitions:
+        yield "".join(
+            json.dumps({name: _text_value(value) for name, value in zip(names, row)}, default=str) + "\n"
+            for row in partition
+        )
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back as chunks"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+def _arrow_chunks(partitions, names: List[str], columns: list, format: str) -> Iterator[bytes]:
+    """Parquet (one row group per partition) or an Arrow IPC stream (one record batch per partition)"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([pa.field(name, _arrow_type(column)) for name, column in zip(names, columns)])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema) if format == "parquet" else pa.ipc.new_stream(sink, schema)
+    try:
+        for partition in partitions:
+            arrays = [
+                pa.array([_arrow_value(row[i], field.type) for row in partition], type=field.type)
+                for i, field in enumerate(schema)
+            ]
+            batch = pa.RecordBatch.from_arrays(arrays, schema=schema)
+            if format == "parquet":
+                writer.write_table(pa.Table.from_batches([batch]))
+            else:
+                writer.write_batch(batch)
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+def _arrow_type(column):
+    import pyarrow as pa
+
+    column_type = column.type
+    if isinstance(column_type, Boolean):
+        return pa.bool_()
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    if isinstance(column_type, Float):
+        return pa.float64()
+    if isinstance(column_type, DateTime):
+        return pa.timestamp("us", tz="UTC") if column_type.timezone else pa.timestamp("us")
+    if isinstance(column_type, Date):
+        return pa.date32()
+    # Strings, UUIDs and JSON (serialised) are exported as text
+    return pa.string()
+
+def _arrow_value(value: Any, arrow_type) -> Any:
+    import pyarrow as pa
+
+    if value is None or not pa.types.is_string(arrow_type):
+        return value
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return str(value)
@@ -0,0 +1,84 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.models import StoredImage
+from app.services import image_derivatives, image_store
+from app.utils.http_cache import IMMUTABLE_CACHE_CONTROL, file_response
+import os
+
+router = APIRouter()
+
+# Images and everything derived from them are addressed by the original's
+# content hash, so a URL's bytes never change and can be cached forever.
+
+@router.get("/{sha256}")
+def get_image(sha256: str, request: Request, db: Session = Depends(get_db)):
+    """Download a stored SEM/TEM image by its content hash (supports Range requests)"""
+    _check_hash(sha256)
+    image = db.query(StoredImage).filter(StoredImage.sha256 == sha256).first()
+    if not image:
+        raise HTTPException(status_code=404, detail="Image not found")
+    _check_image(sha256)
+
+    return file_response(
+        request, image_store.image_path(sha256), image.content_type or "application/octet-stream", f'"{sha256}"'
+    )
+
+@router.get("/{sha256}/thumbnail")
+def get_thumbnail(
+    sha256: str,
+    request: Request,
+    size: int = Query(image_derivatives.DEFAULT_THUMBNAIL_SIZE)
+):
+    """WebP thumbnail of an image; generated on first request if the upload worker hasn't made it yet"""
+    if size not in image_derivatives.THUMBNAIL_SIZES:
+        sizes = ", ".join(map(str, image_derivatives.THUMBNAIL_SIZES))
+        raise HTTPException(status_code=400, detail=f"size must be one of: {sizes}")
+    _check_hash(sha256)
+    path = image_derivatives.thumbnail_path(sha256, size)
+    if not os.path.exists(path):
+        _check_image(sha256)
+        path = _generate(image_derivatives.ensure_thumbnail, sha256, size)
+    return file_response(request, path, "image/webp", f'"{sha256}-{size}"')
+
+@router.get("/{sha256}/tiles.dzi")
+def get_tile_descriptor(sha256: str):
+    """Deep Zoom descriptor for viewers such as OpenSeadragon; tiles are under tiles_files/"""
+    _check_hash(sha256)
+    path = image_derivatives.dzi_path(sha256)
+    if not os.path.exists(path):
+        _check_image(sha256)
+        path = _generate(image_derivatives.ensure_tiles, sha256)
+    with open(path, "rb") as descriptor:
+        return Response(
+            descriptor.read(), media_type="application/xml", headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL}
+        )
+
+@router.get("/{sha256}/tiles_files/{level}/{column}_{row}.webp")
+def get_tile(sha256: str, level: int, column: int, row: int, request: Request):
+    """One WebP tile of an image's Deep Zoom pyramid"""
+    _check_hash(sha256)
+    path = image_derivatives.tile_path(sha256, level, column, row)
+    if not os.path.exists(path):
+        _check_image(sha256)
+        _generate(image_derivatives.ensure_tiles, sha256)
+        # The pyramid is complete, so a still-missing tile is outside it
+        if not os.path.exists(path):
+            raise HTTPException(status_code=404, detail="Tile not found")
+    return file_response(request, path, "image/webp", f'"{sha256}-{level}-{column}-{row}"')
+
+def _check_hash(sha256: str):
+    if not image_store.is_valid_sha256(sha256):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+def _check_image(sha256: str):
+    if not os.path.exists(image_store.image_path(sha256)):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+def _generate(ensure, sha256: str, *args) -> str:
+    try:
+        return ensure(sha256, *args)
+    except (OSError, SyntaxError, ValueError) as e:
+        # Pillow raises these for truncated or unsupported files
+        raise HTTPException(status_code=422, detail=f"Could not render image: {e}")
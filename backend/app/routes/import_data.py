@@ -1,241 +1,114 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.models import BiocharBatch, GrapheneBatch, AnalysisResult
-import pandas as pd
-import io
-from datetime import datetime, date
-from typing import Dict, Any
+from app.services.bulk_import import DEFAULT_CHUNK_SIZE, IMPORTERS, ON_CONFLICT_MODES, import_file
+from app.services import import_jobs
+from app.utils.readers import DEFAULT_READ_CHUNK_ROWS, is_supported_file, sha256_file
+import asyncio
 import json
 
 router = APIRouter()
 
 @router.post("/csv")
-async def import_csv_data(
+def import_csv_data(
     file: UploadFile = File(...),
     data_type: str = "graphene",  # "biochar", "graphene", or "analysis"
+    on_conflict: str = "error",   # "error", "skip" or "update"
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=50000),
+    read_chunk_rows: int = Query(DEFAULT_READ_CHUNK_ROWS, ge=100, le=1000000),
     db: Session = Depends(get_db)
 ):
-    """Import batch data from CSV file matching Curia report format"""
+    """Import batch data from CSV file matching Curia report format
     
-    if not file.filename.endswith(('.csv', '.xlsx')):
-        raise HTTPException(status_code=400, detail="File must be CSV or Excel format")
+    The file is read in chunks of read_chunk_rows rows so memory stays bounded;
+    gzip-compressed CSV (.csv.gz) is accepted. With on_conflict=skip|update,
+    rows clashing with stored batches/results are upserted and a file that
+    was already imported cleanly is skipped.
+    """
+    
+    _validate_import_params(file.filename, data_type, on_conflict)
     
     try:
-        # Read file content
-        content = await file.read()
-        
-        if file.filename.endswith('.xlsx'):
-            df = pd.read_excel(io.BytesIO(content))
-        else:
-            df = pd.read_csv(io.StringIO(content.decode('utf-8')))
-        
-        imported_count = 0
-        errors = []
-        
-        if data_type == "graphene":
-            imported_count, errors = await _import_graphene_batches(df, db)
-        elif data_type == "biochar":
-            imported_count, errors = await _import_biochar_batches(df, db)
-        elif data_type == "analysis":
-            imported_count, errors = await _import_analysis_results(df, db)
-        else:
-            raise HTTPException(status_code=400, detail="Invalid data_type")
-        
-        return {
-            "message": f"Import completed",
-            "imported_count": imported_count,
-            "errors": errors,
-            "total_rows": len(df)
-        }
+        # Read straight from the spooled upload instead of loading it into memory
+        file_hash = sha256_file(file.file)
+        return import_file(
+            file.file, file.filename, data_type, db,
+            file_hash=file_hash,
+            chunk_size=chunk_size,
+            read_chunk_rows=read_chunk_rows,
+            on_conflict=on_conflict
+        )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Import failed: {str(e)}")
 
-async def _import_graphene_batches(df: pd.DataFrame, db: Session) -> tuple[int, list]:
-    """Import graphene batch data from DataFrame"""
-    imported_count = 0
-    errors = []
-    
-    # Expected columns for graphene batches (based on Curia report)
-    column_mapping = {
-        'Experiment': 'name',
-        'Oven': 'oven', 
-        'Lot': 'parent_biochar_name',  # We'll need to resolve to IDs
-        'T (rate)': 'temperature',
-        't': 'time_hours',
-        'Species': 'species',
-        'Appearance': 'appearance',
-        'Output': 'output_weight'
-    }
+@router.post("/jobs", status_code=202)
+async def create_import_job(
+    file: UploadFile = File(...),
+    data_type: str = "graphene",  # "biochar", "graphene", or "analysis"
+    on_conflict: str = "error",   # "error", "skip" or "update"
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=50000),
+    read_chunk_rows: int = Query(DEFAULT_READ_CHUNK_ROWS, ge=100, le=1000000)
+):
+    """Spool an upload to disk and import it in the background, returning a job ID"""
     
-    for index, row in df.iterrows():
-        try:
-            # Extract data based on column mapping
-            batch_data = {}
-            
-            # Required fields
-            if 'Experiment' in row and pd.notna(row['Experiment']):
-                batch_data['name'] = str(row['Experiment']).strip()
-            else:
-                errors.append(f"Row {index}: Missing experiment name")
-                continue
-            
-            # Set default date to today if not provided
-            batch_data['date_created'] = date.today()
-            
-            # Map other fields
-            for csv_col, model_field in column_mapping.items():
-                if csv_col in row and pd.notna(row[csv_col]):
-                    value = row[csv_col]
-                    
-                    if model_field in ['temperature', 'time_hours', 'output_weight']:
-                        # Convert to float, handle units
-                        if isinstance(value, str):
-                            # Remove units and convert
-                            value = ''.join(c for c in value if c.isdigit() or c in '.-')
-                            try:
-                                value = float(value) if value else None
-                            except:
-                                value = None
-                        batch_data[model_field] = value
-                    elif model_field == 'species':
-                        # Extract species number
-                        if 'Species' in str(value):
-                            batch_data[model_field] = 1 if '1' in str(value) else 2
-                    else:
-                        batch_data[model_field] = str(value).strip()
-            
-            # Set Oven C era flag
-            batch_data['is_oven_c_era'] = batch_data.get('oven') == 'C'
-            
-            # Create batch
-            db_batch = GrapheneBatch(**batch_data)
-            db.add(db_batch)
-            db.commit()
-            imported_count += 1
-            
-        except Exception as e:
-            errors.append(f"Row {index}: {str(e)}")
-            db.rollback()
+    _validate_import_params(file.filename, data_type, on_conflict)
     
-    return imported_count, errors
+    path, file_hash = await import_jobs.spool_upload(file)
+    return await run_in_threadpool(
+        import_jobs.submit_import_job,
+        path, file.filename, data_type, chunk_size, read_chunk_rows, on_conflict, file_hash
+    )
 
-async def _import_biochar_batches(df: pd.DataFrame, db: Session) -> tuple[int, list]:
-    """Import biochar batch data from DataFrame"""
-    imported_count = 0
-    errors = []
-    
-    # Expected columns for biochar batches
-    column_mapping = {
-        'Experiment': 'name',
-        'Reactor': 'oven',
-        'T': 'temperature', 
-        't': 'time_hours',
-        'Output': 'output_weight',
-        'Raw material': 'input_weight'
-    }
-    
-    for index, row in df.iterrows():
-        try:
-            batch_data = {}
-            
-            # Required fields
-            if 'Experiment' in row and pd.notna(row['Experiment']):
-                batch_data['name'] = str(row['Experiment']).strip()
-            else:
-                errors.append(f"Row {index}: Missing experiment name")
-                continue
-                
-            batch_data['date_created'] = date.today()
-            
-            # Map fields with unit handling
-            for csv_col, model_field in column_mapping.items():
-                if csv_col in row and pd.notna(row[csv_col]):
-                    value = row[csv_col]
-                    
-                    if model_field in ['temperature', 'time_hours', 'input_weight', 'output_weight']:
-                        # Parse numeric values
-                        if isinstance(value, str):
-                            value = ''.join(c for c in value if c.isdigit() or c in '.-')
-                            try:
-                                value = float(value) if value else None
-                            except:
-                                value = None
-                        batch_data[model_field] = value
-                    else:
-                        batch_data[model_field] = str(value).strip()
-            
-            # Calculate yield
-            if batch_data.get('input_weight') and batch_data.get('output_weight'):
-                batch_data['yield_percent'] = (batch_data['output_weight'] / batch_data['input_weight']) * 100
-            
-            db_batch = BiocharBatch(**batch_data)
-            db.add(db_batch)
-            db.commit()
-            imported_count += 1
-            
-        except Exception as e:
-            errors.append(f"Row {index}: {str(e)}")
-            db.rollback()
-    
-    return imported_count, errors
+def _validate_import_params(filename: str, data_type: str, on_conflict: str):
+    if not is_supported_file(filename):
+        raise HTTPException(status_code=400, detail="File must be CSV, gzipped CSV or Excel format")
+    if data_type not in IMPORTERS:
+        raise HTTPException(status_code=400, detail="Invalid data_type")
+    if on_conflict not in ON_CONFLICT_MODES:
+        raise HTTPException(status_code=400, detail="Invalid on_conflict")
+
+@router.get("/jobs")
+def list_import_jobs():
+    """List known import jobs, newest first"""
+    return import_jobs.list_jobs()
 
-async def _import_analysis_results(df: pd.DataFrame, db: Session) -> tuple[int, list]:
-    """Import analysis results (BET, conductivity) from DataFrame"""
-    imported_count = 0
-    errors = []
+@router.get("/jobs/{job_id}")
+def get_import_job(job_id: str):
+    """Poll the progress of an import job"""
+    job = import_jobs.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+@router.get("/jobs/{job_id}/events")
+async def stream_import_job(job_id: str, interval: float = Query(0.5, ge=0.1, le=10)):
+    """Stream import job progress as server-sent events until the job finishes
     
-    column_mapping = {
-        'Sample': 'batch_name',
-        'Multipoint BET Area [m^2/g]': 'bet_surface_area',
-        'Langmuir Surface Area [m^2/g]': 'bet_langmuir',
-        'Conductivity (S/cm)': 'conductivity'
-    }
+    Ends with "event: gone" if the job is pruned while being streamed.
+    """
+    if not await run_in_threadpool(import_jobs.get_job, job_id):
+        raise HTTPException(status_code=404, detail="Import job not found")
     
-    for index, row in df.iterrows():
-        try:
-            # Find the graphene batch
-            batch_name = row.get('Sample') or row.get('Material')
-            if not batch_name:
-                errors.append(f"Row {index}: No batch name found")
-                continue
-                
-            batch = db.query(GrapheneBatch).filter(
-                GrapheneBatch.name == str(batch_name).strip()
-            ).first()
-            
-            if not batch:
-                errors.append(f"Row {index}: Batch {batch_name} not found")
-                continue
-            
-            analysis_data = {
-                'graphene_batch_id': batch.id,
-                'date_analyzed': date.today()
-            }
-            
-            # Map measurement fields
-            for csv_col, model_field in column_mapping.items():
-                if csv_col in row and pd.notna(row[csv_col]):
-                    value = row[csv_col]
-                    if isinstance(value, (int, float)):
-                        analysis_data[model_field] = float(value)
-            
-            # Handle conductivity unit conversion (S/cm to S/m)
-            if 'conductivity' in analysis_data:
-                analysis_data['conductivity'] = analysis_data['conductivity'] * 100  # S/cm to S/m
-                analysis_data['conductivity_unit'] = 'S/m'
-            
-            db_analysis = AnalysisResult(**analysis_data)
-            db.add(db_analysis)
-            db.commit()
-            imported_count += 1
-            
-        except Exception as e:
-            errors.append(f"Row {index}: {str(e)}")
-            db.rollback()
+    async def events():
+        last = None
+        while True:
+            job = await run_in_threadpool(import_jobs.get_job, job_id)
+            if job is None:
+                yield f"event: gone\ndata: {json.dumps({'id': job_id})}\n\n"
+                return
+            progress = {k: v for k, v in job.items() if k not in ("errors", "warnings")}
+            if progress != last:
+                yield f"event: progress\ndata: {json.dumps(progress)}\n\n"
+                last = progress
+            if import_jobs.is_finished(job):
+                yield f"event: done\ndata: {json.dumps(job)}\n\n"
+                return
+            await asyncio.sleep(interval)
     
-    return imported_count, errors
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 @router.get("/template/{data_type}")
 async def download_import_template(data_type: str):
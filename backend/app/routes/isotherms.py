@@ -0,0 +1,100 @@
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from app.database import get_db
+from app.models import AnalysisResult, Isotherm
+from app.schemas import IsothermResponse, IsothermDetailResponse
+from app.utils.readers import is_supported_file, iter_import_frames
+import os
+import time
+
+router = APIRouter()
+
+@router.post("/upload")
+def upload_isotherms(
+    file: UploadFile = File(...),
+    analysis_result_id: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Upload raw isotherms (P/P0 vs quantity adsorbed) and fit BET, Langmuir, t-plot and pore sizes
+    
+    A file may hold one isotherm, or a whole instrument export with a Sample
+    column; samples are matched to graphene batches by name.
+    """
+    # The fitting service needs NumPy and pandas, so it is loaded on first use
+    from app.services import isotherms
+    import pandas as pd
+
+    if not is_supported_file(file.filename):
+        raise HTTPException(status_code=400, detail="File must be CSV, gzipped CSV or Excel format")
+    if analysis_result_id and not db.query(AnalysisResult).filter(AnalysisResult.id == analysis_result_id).first():
+        raise HTTPException(status_code=404, detail="Analysis result not found")
+    
+    started = time.perf_counter()
+    try:
+        frame = pd.concat(list(iter_import_frames(file.file, file.filename)))
+        default_sample = os.path.splitext(os.path.basename(file.filename))[0]
+        parsed = isotherms.parse_isotherm_frame(frame, default_sample)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not parsed:
+        raise HTTPException(status_code=400, detail="No isotherm points found")
+    
+    rows, unresolved = isotherms.store_isotherms(db, parsed, file.filename, analysis_result_id)
+    db.commit()
+    
+    return {
+        "message": "Isotherms imported",
+        "isotherm_count": len(rows),
+        "unresolved_samples": unresolved,
+        "duration_seconds": round(time.perf_counter() - started, 3),
+        "isotherms": [IsothermResponse.model_validate(row) for row in rows]
+    }
+
+@router.post("/refit")
+def refit_isotherms(
+    graphene_batch_id: Optional[str] = None,
+    bet_min: Optional[float] = Query(None, gt=0, lt=1),
+    bet_max: Optional[float] = Query(None, gt=0, lt=1),
+    db: Session = Depends(get_db)
+):
+    """Refit stored isotherms (all, or one batch's), e.g. with a different BET pressure range
+    
+    bet_min and bet_max default to the standard BET range (0.05-0.30 P/P0).
+    """
+    from app.services import isotherms
+    
+    bet_range = (bet_min or isotherms.BET_RANGE[0], bet_max or isotherms.BET_RANGE[1])
+    if bet_range[0] >= bet_range[1]:
+        raise HTTPException(status_code=400, detail="bet_min must be below bet_max")
+    
+    started = time.perf_counter()
+    count = isotherms.refit_isotherms(db, graphene_batch_id, bet_range)
+    elapsed = time.perf_counter() - started
+    return {
+        "refitted_count": count,
+        "duration_seconds": round(elapsed, 3),
+        "isotherms_per_second": round(count / elapsed, 1) if elapsed > 0 else None
+    }
+
+@router.get("/batch/{graphene_batch_id}", response_model=List[IsothermResponse])
+def get_batch_isotherms(graphene_batch_id: str, db: Session = Depends(get_db)):
+    """Get the fitted isotherms of a graphene batch"""
+    return db.query(Isotherm).filter(
+        Isotherm.graphene_batch_id == graphene_batch_id
+    ).order_by(Isotherm.created_at.desc()).all()
+
+@router.get("/{isotherm_id}", response_model=IsothermDetailResponse)
+def get_isotherm(isotherm_id: str, db: Session = Depends(get_db)):
+    """Get an isotherm with its points and pore-size distribution"""
+    from app.services import isotherms
+    
+    isotherm = db.query(Isotherm).filter(Isotherm.id == isotherm_id).first()
+    if not isotherm:
+        raise HTTPException(status_code=404, detail="Isotherm not found")
+    
+    return {
+        **IsothermResponse.model_validate(isotherm).model_dump(),
+        "pore_size_distribution": isotherm.pore_size_distribution,
+        **isotherms.isotherm_points(isotherm)
+    }
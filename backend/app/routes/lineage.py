@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Any, Dict
+from app.database import get_db
+from app.services.lineage import DEFAULT_MAX_DEPTH, lineage, rebuild_lineage, resolve_node, shipment_trace
+
+router = APIRouter()
+
+# Nodes are addressed by UUID or by exact batch name, e.g. /api/v1/lineage/MB3047/shipments
+
+@router.get("/{node_ref}/ancestors")
+def get_ancestors(node_ref: str, max_depth: int = Query(DEFAULT_MAX_DEPTH, ge=1, le=50),
+                  db: Session = Depends(get_db)) -> Dict[str, Any]:
+    """Get the biochar lots (and earlier batches) a batch was made from"""
+    return lineage(db, _node_or_404(db, node_ref), "ancestors", max_depth)
+
+@router.get("/{node_ref}/descendants")
+def get_descendants(node_ref: str, max_depth: int = Query(DEFAULT_MAX_DEPTH, ge=1, le=50),
+                    db: Session = Depends(get_db)) -> Dict[str, Any]:
+    """Get every batch made from a biochar lot or batch"""
+    return lineage(db, _node_or_404(db, node_ref), "descendants", max_depth)
+
+@router.get("/{node_ref}/shipments")
+def get_shipment_trace(node_ref: str, max_depth: int = Query(DEFAULT_MAX_DEPTH, ge=1, le=50),
+                       db: Session = Depends(get_db)) -> Dict[str, Any]:
+    """Get every shipment containing material from a biochar lot or batch"""
+    return shipment_trace(db, _node_or_404(db, node_ref), max_depth)
+
+@router.post("/rebuild")
+def rebuild_lineage_edges(db: Session = Depends(get_db)):
+    """Rebuild the lineage edges from the batches' and milestones' JSON ID lists"""
+    return {"message": "Lineage rebuilt", "edge_count": rebuild_lineage(db)}
+
+def _node_or_404(db: Session, node_ref: str) -> Dict[str, Any]:
+    node = resolve_node(db, node_ref)
+    if not node:
+        raise HTTPException(status_code=404, detail=f"No batch or milestone {node_ref}")
+    return node
@@ -0,0 +1,90 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from app.database import get_db
+from app.models import SpcAlert, SpcState
+from app.schemas import SpcAlertResponse, SpcStateResponse
+from app.services.spc import rebaseline_stream, stream_limits
+
+router = APIRouter()
+
+@router.get("/alerts", response_model=List[SpcAlertResponse])
+def get_spc_alerts(
+    acknowledged: Optional[bool] = False,
+    oven: Optional[str] = None,
+    species: Optional[int] = None,
+    metric: Optional[str] = None,
+    rule: Optional[str] = None,
+    limit: int = 100,
+    db: Session = Depends(get_db)
+):
+    """Get statistical process control alerts, newest first (unacknowledged by default)"""
+    query = db.query(SpcAlert)
+    
+    if acknowledged is not None:
+        query = query.filter(SpcAlert.acknowledged == acknowledged)
+    if oven:
+        query = query.filter(SpcAlert.oven == oven)
+    if species is not None:
+        query = query.filter(SpcAlert.species == species)
+    if metric:
+        query = query.filter(SpcAlert.metric == metric)
+    if rule:
+        query = query.filter(SpcAlert.rule == rule)
+    
+    return query.order_by(SpcAlert.created_at.desc(), SpcAlert.id.desc()).limit(limit).all()
+
+@router.post("/alerts/{alert_id}/acknowledge", response_model=SpcAlertResponse)
+def acknowledge_spc_alert(alert_id: str, db: Session = Depends(get_db)):
+    """Mark an alert as reviewed"""
+    alert = db.query(SpcAlert).filter(SpcAlert.id == alert_id).first()
+    if not alert:
+        raise HTTPException(status_code=404, detail="Alert not found")
+    
+    alert.acknowledged = True
+    db.commit()
+    db.refresh(alert)
+    return alert
+
+@router.get("/control-limits", response_model=List[SpcStateResponse])
+def get_control_limits(
+    oven: Optional[str] = None,
+    metric: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Get the running centre line, control limits, EWMA and CUSUM of every oven/species stream"""
+    query = db.query(SpcState)
+    
+    if oven:
+        query = query.filter(SpcState.oven == oven)
+    if metric:
+        query = query.filter(SpcState.metric == metric)
+    
+    return [_limits_response(state) for state in query.order_by(SpcState.oven, SpcState.species, SpcState.metric)]
+
+@router.post("/control-limits/{oven}/{species}/{metric}/rebaseline", response_model=SpcStateResponse)
+def rebaseline_control_limits(oven: str, species: int, metric: str, db: Session = Depends(get_db)):
+    """Start a stream's baseline over after a known process change (existing alerts are kept)"""
+    state = db.query(SpcState).filter(
+        SpcState.oven == oven, SpcState.species == species, SpcState.metric == metric
+    ).with_for_update().first()
+    if not state:
+        raise HTTPException(status_code=404, detail="SPC stream not found")
+    
+    rebaseline_stream(state)
+    db.commit()
+    db.refresh(state)
+    return _limits_response(state)
+
+def _limits_response(state: SpcState) -> dict:
+    return {
+        "oven": state.oven,
+        "species": state.species,
+        "metric": state.metric,
+        "count": state.count,
+        "ewma": state.ewma,
+        "cusum_high": state.cusum_high,
+        "cusum_low": state.cusum_low,
+        "updated_at": state.updated_at,
+        **stream_limits(state)
+    }
@@ -0,0 +1,76 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.database import get_read_db
+from app.services import reports
+from datetime import date
+import re
+
+router = APIRouter()
+
+# Report IDs are content hashes, so a rendered PDF never changes
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+@router.get("/customers")
+def get_report_customers(db: Session = Depends(get_read_db)):
+    """Customers that can be reported on (have at least one shipment)"""
+    return reports.report_customers(db)
+
+@router.post("/customer-summary")
+def create_customer_summary_report(
+    response: Response,
+    customer: str,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    oven_c_only: bool = False,
+    wait: float = Query(0, ge=0, le=60),
+    db: Session = Depends(get_read_db)
+):
+    """Render (or reuse) the customer summary PDF for a customer's shipments
+    
+    Returns straight away with status "ready" when the same inputs were
+    rendered before; otherwise 202 with status "rendering" (poll the report,
+    or pass wait=seconds to block until it is done).
+    """
+    inputs = reports.customer_report_inputs(db, customer, date_from, date_to, oven_c_only)
+    if not inputs["batches"]:
+        raise HTTPException(status_code=404, detail=f"No shipments found for {customer}")
+    
+    status = reports.request_report("customer_summary", inputs)
+    if wait and status["status"] == "rendering":
+        status = reports.report_status(status["report_id"], wait)
+    return _with_download_url(response, status)
+
+@router.get("/{report_id}")
+def get_report_status(report_id: str, response: Response, wait: float = Query(0, ge=0, le=60)):
+    """Poll a report's rendering status"""
+    _check_report_id(report_id)
+    status = reports.report_status(report_id, wait)
+    if status["status"] == "unknown":
+        raise HTTPException(status_code=404, detail="Report not found")
+    return _with_download_url(response, status)
+
+@router.get("/{report_id}/pdf")
+def download_report(report_id: str):
+    """Download a rendered report"""
+    _check_report_id(report_id)
+    path = reports.report_path(report_id)
+    if reports.report_status(report_id)["status"] != "ready":
+        raise HTTPException(status_code=404, detail="Report not rendered")
+    return FileResponse(
+        path, media_type="application/pdf", filename=f"HGraph2_Report_{report_id[:12]}.pdf",
+        headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    )
+
+def _check_report_id(report_id: str):
+    # IDs become file names, so only accept what report_id() produces
+    if not re.fullmatch(r"[0-9a-f]{64}", report_id):
+        raise HTTPException(status_code=404, detail="Report not found")
+
+def _with_download_url(response: Response, status: dict) -> dict:
+    if status["status"] == "ready":
+        status["download_url"] = f"/api/v1/reports/{status['report_id']}/pdf"
+    elif status["status"] == "rendering":
+        response.status_code = 202
+    return status
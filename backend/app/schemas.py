@@ -54,7 +54,10 @@ class GrapheneBatchResponse(GrapheneBatchCreate):
     updated_at: Optional[datetime]
     analysis_count: int = 0
     best_bet: Optional[float] = None
+    mean_bet: Optional[float] = None
     best_conductivity: Optional[float] = None
+    latest_analysis_date: Optional[date] = None
+    energy_grade: Optional[str] = None
     
     class Config:
         from_attributes = True
@@ -83,3 +86,63 @@ class AnalysisResultResponse(AnalysisResultCreate):
     
     class Config:
         from_attributes = True
+
+class SpcAlertResponse(BaseModel):
+    id: uuid.UUID
+    analysis_result_id: Optional[uuid.UUID]
+    graphene_batch_id: Optional[uuid.UUID]
+    oven: str
+    species: int
+    metric: str
+    rule: str
+    message: Optional[str]
+    value: Optional[float]
+    center: Optional[float]
+    sigma: Optional[float]
+    date_analyzed: Optional[date]
+    acknowledged: bool
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class SpcStateResponse(BaseModel):
+    oven: str
+    species: int
+    metric: str
+    count: int
+    center: Optional[float]
+    sigma: Optional[float]
+    ucl: Optional[float]
+    lcl: Optional[float]
+    ewma: Optional[float]
+    cusum_high: float
+    cusum_low: float
+    updated_at: Optional[datetime]
+
+class IsothermResponse(BaseModel):
+    id: uuid.UUID
+    graphene_batch_id: Optional[uuid.UUID]
+    analysis_result_id: Optional[uuid.UUID]
+    sample_name: Optional[str]
+    source_filename: Optional[str]
+    adsorbate: Optional[str]
+    point_count: int
+    bet_area: Optional[float]
+    bet_c: Optional[float]
+    bet_r_squared: Optional[float]
+    langmuir_area: Optional[float]
+    tplot_external_area: Optional[float]
+    tplot_micropore_volume: Optional[float]
+    total_pore_volume: Optional[float]
+    mean_pore_diameter: Optional[float]
+    fitted_at: Optional[datetime]
+    created_at: Optional[datetime]
+    
+    class Config:
+        from_attributes = True
+
+class IsothermDetailResponse(IsothermResponse):
+    pore_size_distribution: Optional[dict] = None
+    adsorption: dict
+    desorption: Optional[dict] = None
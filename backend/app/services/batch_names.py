@@ -0,0 +1,74 @@
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models import BATCH_NAME_SEPARATORS, GrapheneBatch, normalised_name_sql
+from typing import Dict, Iterable, Optional
+import re
+import uuid
+
+# Names or keys per IN (...) list, well under SQLite's bound-parameter limit
+NAME_CHUNK_SIZE = 1000
+
+def normalise_batch_name(name: str) -> str:
+    """Case-fold a batch name and drop separators and parenthesised notes"""
+    key = re.sub(r'\(.*?\)', '', str(name)).lower()
+    for separator in BATCH_NAME_SEPARATORS:
+        key = key.replace(separator, '')
+    return key.strip()
+
+class BatchNameIndex:
+    """Name -> graphene batch ID map for every sample referenced by one file.
+
+    All names are resolved up front, in chunks, against the exact stored name
+    and the indexed normalised form (normalised_name_sql). Lookups are then
+    in memory.
+    """
+
+    def __init__(self, db: Session, names: Iterable[str]):
+        self._names = {str(name).strip() for name in names if name is not None}
+        self._exact: Dict[str, uuid.UUID] = {}
+        self._normalised: Dict[str, Optional[uuid.UUID]] = {}
+        self._resolved: Dict[str, Optional[uuid.UUID]] = {}
+        self.stats = {"distinct_names": len(self._names), "exact": 0, "normalised": 0, "ambiguous": 0, "unresolved": 0}
+
+        keys = {normalise_batch_name(name) for name in self._names}
+        # The same batch can match both lists, so collect by ID before keying
+        batches: Dict[uuid.UUID, str] = {}
+        for column, values in ((GrapheneBatch.name, sorted(self._names)),
+                               (normalised_name_sql(GrapheneBatch.name), sorted(keys))):
+            for start in range(0, len(values), NAME_CHUNK_SIZE):
+                batches.update(db.execute(
+                    select(GrapheneBatch.id, GrapheneBatch.name)
+                    .where(column.in_(values[start:start + NAME_CHUNK_SIZE]))
+                ).all())
+        for batch_id, batch_name in batches.items():
+            self._exact[batch_name] = batch_id
+            key = normalise_batch_name(batch_name)
+            # Two stored batches sharing a normalised key cannot be told apart
+            self._normalised[key] = None if key in self._normalised else batch_id
+
+        for name in self._names:
+            self._resolved[name] = self._resolve(name)
+
+    def _resolve(self, name: str) -> Optional[uuid.UUID]:
+        if name in self._exact:
+            self.stats["exact"] += 1
+            return self._exact[name]
+
+        key = normalise_batch_name(name)
+        if key in self._normalised:
+            if self._normalised[key] is None:
+                self.stats["ambiguous"] += 1
+                return None
+            self.stats["normalised"] += 1
+            return self._normalised[key]
+
+        self.stats["unresolved"] += 1
+        return None
+
+    def get(self, name: str) -> Optional[uuid.UUID]:
+        """Return the batch ID for a sample name, or None if it did not resolve"""
+        return self._resolved.get(str(name).strip())
+
+    def is_ambiguous(self, name: str) -> bool:
+        key = normalise_batch_name(name)
+        return self.get(name) is None and key in self._normalised and self._normalised[key] is None
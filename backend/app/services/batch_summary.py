@@ -0,0 +1,156 @@
+"""Materialised per-batch analysis summaries.
+
+batch_analysis_summaries holds the analysis count, max/mean BET, max
+conductivity, latest analysis date and energy grade of every graphene batch
+with analyses, so batch and dashboard reads are plain indexed lookups.
+Single analysis writes fold in an O(1) delta, bulk imports refresh only the
+batches they touched, and the whole table can be rebuilt with:
+
+    python -m app.services.batch_summary
+"""
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.orm import Session
+from app.models import AnalysisResult, BatchAnalysisSummary, BET_TARGETS
+from app.utils.sql import dialect_insert
+from typing import Iterable, Optional
+import uuid
+
+# Batch IDs per refresh statement
+_REFRESH_CHUNK = 1000
+
+def calculate_energy_grade(bet_value: Optional[float]) -> Optional[str]:
+    """Calculate energy storage application grade based on BET surface area"""
+    if not bet_value:
+        return None
+
+    # Use supercapacitor targets as primary grade
+    targets = BET_TARGETS["supercapacitor"]
+
+    if bet_value >= targets["excellent"]:
+        return "Excellent"
+    elif bet_value >= targets["good"]:
+        return "Good"
+    elif bet_value >= targets["acceptable"]:
+        return "Acceptable"
+    else:
+        return "Poor"
+
+def energy_grade_sql(bet_value):
+    """SQL expression equivalent of calculate_energy_grade"""
+    targets = BET_TARGETS["supercapacitor"]
+    return case(
+        (bet_value.is_(None) | (bet_value == 0), None),
+        (bet_value >= targets["excellent"], "Excellent"),
+        (bet_value >= targets["good"], "Good"),
+        (bet_value >= targets["acceptable"], "Acceptable"),
+        else_="Poor"
+    )
+
+def apply_analysis_result(db: Session, analysis: AnalysisResult):
+    """Fold one new analysis result into its batch summary without rescanning the batch.
+
+    Runs in the caller's transaction; the caller commits.
+    """
+    try:
+        insert_for_dialect = dialect_insert(db)
+    except ValueError:
+        refresh_batch_summaries(db, [analysis.graphene_batch_id])
+        return
+
+    bet = analysis.bet_surface_area
+    statement = insert_for_dialect(BatchAnalysisSummary).values(
+        graphene_batch_id=analysis.graphene_batch_id,
+        analysis_count=1,
+        bet_count=1 if bet is not None else 0,
+        bet_sum=bet or 0,
+        max_bet=bet,
+        mean_bet=bet,
+        max_conductivity=analysis.conductivity,
+        latest_analysis_date=analysis.date_analyzed,
+        energy_grade=calculate_energy_grade(bet)
+    )
+
+    # SET expressions all see the row as it was before the update
+    current = BatchAnalysisSummary.__table__.c
+    new = statement.excluded
+    bet_count = current.bet_count + new.bet_count
+    bet_sum = current.bet_sum + new.bet_sum
+    max_bet = _greater(current.max_bet, new.max_bet)
+    statement = statement.on_conflict_do_update(
+        index_elements=[current.graphene_batch_id],
+        set_={
+            'analysis_count': current.analysis_count + new.analysis_count,
+            'bet_count': bet_count,
+            'bet_sum': bet_sum,
+            'max_bet': max_bet,
+            'mean_bet': bet_sum / func.nullif(bet_count, 0),
+            'max_conductivity': _greater(current.max_conductivity, new.max_conductivity),
+            'latest_analysis_date': _greater(current.latest_analysis_date, new.latest_analysis_date),
+            'energy_grade': energy_grade_sql(max_bet),
+            'updated_at': func.now()
+        }
+    )
+    db.execute(statement)
+
+def refresh_batch_summaries(db: Session, batch_ids: Optional[Iterable[uuid.UUID]] = None):
+    """Recompute summaries from analysis_results for the given batches (all when None).
+
+    Runs in the caller's transaction; the caller commits.
+    """
+    bet = AnalysisResult.bet_surface_area
+    aggregates = select(
+        AnalysisResult.graphene_batch_id,
+        func.count(AnalysisResult.id),
+        func.count(bet),
+        func.coalesce(func.sum(bet), 0),
+        func.max(bet),
+        func.avg(bet),
+        func.max(AnalysisResult.conductivity),
+        func.max(AnalysisResult.date_analyzed),
+        energy_grade_sql(func.max(bet))
+    ).group_by(AnalysisResult.graphene_batch_id)
+    columns = [
+        'graphene_batch_id', 'analysis_count', 'bet_count', 'bet_sum', 'max_bet', 'mean_bet',
+        'max_conductivity', 'latest_analysis_date', 'energy_grade'
+    ]
+
+    if batch_ids is None:
+        db.execute(delete(BatchAnalysisSummary))
+        db.execute(insert(BatchAnalysisSummary).from_select(columns, aggregates))
+        return
+
+    batch_ids = list(set(batch_ids))
+    for start in range(0, len(batch_ids), _REFRESH_CHUNK):
+        chunk = batch_ids[start:start + _REFRESH_CHUNK]
+        db.execute(
+            delete(BatchAnalysisSummary).where(BatchAnalysisSummary.graphene_batch_id.in_(chunk)),
+            execution_options={"synchronize_session": False}
+        )
+        db.execute(insert(BatchAnalysisSummary).from_select(
+            columns, aggregates.where(AnalysisResult.graphene_batch_id.in_(chunk))
+        ))
+
+def rebuild_batch_summaries(db: Session) -> int:
+    """Rebuild the whole summary table and return the number of batches summarised"""
+    refresh_batch_summaries(db)
+    db.commit()
+    return db.scalar(select(func.count()).select_from(BatchAnalysisSummary))
+
+def _greater(current, new):
+    """NULL-tolerant max of two column expressions"""
+    return case(
+        (new.is_(None), current),
+        (current.is_(None), new),
+        (new > current, new),
+        else_=current
+    )
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        count = rebuild_batch_summaries(db)
+        print(f"✅ Rebuilt analysis summaries for {count} graphene batches")
+    finally:
+        db.close()
@@ -0,0 +1,532 @@
+from __future__ import annotations
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.models import BiocharBatch, GrapheneBatch, AnalysisResult, ImportedFile
+from datetime import date
+from app.services import cache
+from app.services.batch_names import BatchNameIndex
+from app.services.batch_summary import refresh_batch_summaries
+from app.services.lineage import sync_graphene_edges
+from app.services.spc import record_measurements
+from app.utils.parsing import parse_quantity
+from app.utils.readers import DEFAULT_READ_CHUNK_ROWS, iter_import_frames
+from app.utils.sql import dialect_insert
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Tuple
+from collections import Counter
+import functools
+import hashlib
+import json
+import time
+
+# pandas is imported where frames are built, so API workers load it on their first import
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Rows per multi-row INSERT / transaction
+DEFAULT_CHUNK_SIZE = 1000
+
+# "error" reports rows that clash with stored data, "skip" leaves the stored
+# row alone and "update" overwrites it when its content hash differs
+ON_CONFLICT_MODES = ("error", "skip", "update")
+
+# Import dates are always "today", so they are left out of the content hash
+# and never overwritten by an upsert
+_IMPORT_DATE_COLUMNS = ('date_created', 'date_analyzed')
+
+# Records are (row label, column values) pairs so errors can still name the CSV row
+Record = Tuple[Any, Dict[str, Any]]
+
+# Called after each committed chunk with (rows inserted by the chunk, errors so far)
+Progress = Callable[[int, int], None]
+
+def import_graphene_batches(df: pd.DataFrame, db: Session, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                            progress: Optional[Progress] = None, on_conflict: str = "error") -> tuple[int, list, dict]:
+    """Normalise a Curia graphene sheet and bulk insert it"""
+    records, errors, warnings = _normalise_graphene_frame(df, db)
+    records = _drop_conflicts(db, GrapheneBatch.name, _with_content_hashes(records), errors, on_conflict,
+                              "Batch {} already exists", "Duplicate batch {} in file")
+    result = _load(db, GrapheneBatch, 'name', records, errors, chunk_size, progress, on_conflict,
+                   {"warnings": warnings})
+
+    # Mirror the parent lots into lineage edges (upserts may have changed them)
+    if result[0]:
+        names = [values['name'] for _, values in records]
+        batch_ids = []
+        for start in range(0, len(names), DEFAULT_CHUNK_SIZE):
+            batch_ids.extend(db.scalars(select(GrapheneBatch.id).where(
+                GrapheneBatch.name.in_(names[start:start + DEFAULT_CHUNK_SIZE])
+            )))
+        sync_graphene_edges(db, batch_ids)
+        db.commit()
+    return result
+
+def import_biochar_batches(df: pd.DataFrame, db: Session, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                           progress: Optional[Progress] = None, on_conflict: str = "error") -> tuple[int, list, dict]:
+    """Normalise a Curia biochar sheet and bulk insert it"""
+    records, errors, warnings = _normalise_biochar_frame(df)
+    records = _drop_conflicts(db, BiocharBatch.name, _with_content_hashes(records), errors, on_conflict,
+                              "Batch {} already exists", "Duplicate batch {} in file")
+    return _load(db, BiocharBatch, 'name', records, errors, chunk_size, progress, on_conflict,
+                 {"warnings": warnings})
+
+def import_analysis_results(df: pd.DataFrame, db: Session, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                            progress: Optional[Progress] = None, on_conflict: str = "error",
+                            replicates: Optional[Counter] = None) -> tuple[int, list, dict]:
+    """Normalise a Clariant BET/conductivity sheet and bulk insert it
+
+    The third element carries details for the response: warnings (rows
+    written with a caveat) and, here, the sample name resolution stats.
+    replicates counts identical rows already seen in the file (shared by
+    all of its frames), so repeated measurements are kept as replicates.
+    """
+    records, errors, details = _normalise_analysis_frame(df, db)
+    records = _with_content_hashes(records, Counter() if replicates is None else replicates)
+    records = _drop_conflicts(db, AnalysisResult.content_hash, records, errors, on_conflict,
+                              "Analysis result already imported", "Duplicate analysis result in file",
+                              identical_duplicates=True)
+    # Rows already stored are identical (the key is the content hash), so only the rest are new measurements
+    hashes = [values['content_hash'] for _, values in records]
+    if on_conflict != "error":
+        stored = _existing_keys(db, AnalysisResult.content_hash, hashes)
+        hashes = [value for value in hashes if value not in stored]
+    result = _load(db, AnalysisResult, 'content_hash', records, errors, chunk_size, progress, on_conflict, details)
+
+    # Keep the per-batch rollups and SPC streams in step for just the results this sheet added
+    if result[0]:
+        refresh_batch_summaries(db, {values['graphene_batch_id'] for _, values in records})
+        added = []
+        for start in range(0, len(hashes), DEFAULT_CHUNK_SIZE):
+            added.extend(db.scalars(select(AnalysisResult).where(
+                AnalysisResult.content_hash.in_(hashes[start:start + DEFAULT_CHUNK_SIZE])
+            )))
+        record_measurements(db, added)
+        db.commit()
+    return result
+
+IMPORTERS = {
+    "graphene": import_graphene_batches,
+    "biochar": import_biochar_batches,
+    "analysis": import_analysis_results
+}
+
+# Cache namespaces invalidated by each import type
+CACHE_NAMESPACES = {
+    "graphene": ("batches", "lineage"),
+    "biochar": ("batches",),
+    "analysis": ("analysis",)
+}
+
+def import_file(source, filename: str, data_type: str, db: Session, file_hash: Optional[str] = None,
+                chunk_size: int = DEFAULT_CHUNK_SIZE, read_chunk_rows: int = DEFAULT_READ_CHUNK_ROWS,
+                on_conflict: str = "error", progress: Optional[Progress] = None,
+                on_frame: Optional[Callable[[int], None]] = None) -> Dict[str, Any]:
+    """Import a whole upload and build the import response.
+
+    With on_conflict "skip" or "update", a file whose hash was already
+    imported cleanly for this data_type is a no-op.
+    """
+    if file_hash and on_conflict != "error":
+        previous = db.scalar(select(ImportedFile).where(
+            ImportedFile.sha256 == file_hash, ImportedFile.data_type == data_type
+        ))
+        if previous:
+            return {
+                "message": "File already imported",
+                "imported_count": 0,
+                "errors": [],
+                "warnings": [],
+                "total_rows": previous.total_rows,
+                "file_sha256": file_hash,
+                "previously_imported_at": previous.imported_at.isoformat() if previous.imported_at else None
+            }
+
+    started = time.perf_counter()
+    frames = iter_import_frames(source, filename, read_chunk_rows)
+    total_rows, imported_count, errors, details = import_frames(
+        frames, data_type, db, chunk_size, progress, on_frame, on_conflict
+    )
+    elapsed = time.perf_counter() - started
+
+    # Only imports that wrote every row are remembered, so files with failed rows
+    # can be retried; warnings (e.g. a cell stored as NULL) do not block this
+    if file_hash and not errors:
+        _record_imported_file(db, file_hash, data_type, filename, total_rows, imported_count)
+
+    return {
+        "message": "Import completed",
+        "imported_count": imported_count,
+        "errors": errors,
+        "warnings": details.pop("warnings", []),
+        "total_rows": total_rows,
+        "duration_seconds": round(elapsed, 3),
+        "rows_per_second": round(total_rows / elapsed, 1) if elapsed > 0 else None,
+        "file_sha256": file_hash,
+        **details
+    }
+
+def import_frames(frames: Iterable[pd.DataFrame], data_type: str, db: Session, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  progress: Optional[Progress] = None, on_frame: Optional[Callable[[int], None]] = None,
+                  on_conflict: str = "error") -> tuple[int, int, list, dict]:
+    """Feed a stream of DataFrame chunks through the importer for data_type.
+
+    Returns (total rows, imported count, errors, details); numeric details
+    such as name resolution stats are summed over the chunks and warnings
+    are concatenated.
+    """
+    importer = IMPORTERS[data_type]
+    if data_type == "analysis":
+        # Identical rows in different frames of one file are still separate replicates
+        importer = functools.partial(importer, replicates=Counter())
+    total_rows = 0
+    imported_count = 0
+    errors = []
+    details = {}
+
+    def chunk_progress(inserted: int, error_count: int):
+        progress(inserted, len(errors) + error_count)
+
+    try:
+        for df in frames:
+            total_rows += len(df)
+            if on_frame:
+                on_frame(len(df))
+            count, frame_errors, frame_details = importer(
+                df, db, chunk_size, chunk_progress if progress else None, on_conflict
+            )
+            imported_count += count
+            errors.extend(frame_errors)
+            _merge_details(details, frame_details)
+    finally:
+        # Chunks are committed as they load, so cached reads are stale even if a later chunk fails
+        cache.bump(*CACHE_NAMESPACES[data_type])
+
+    return total_rows, imported_count, errors, details
+
+def _merge_details(total: dict, details: dict):
+    for key, value in details.items():
+        if isinstance(value, dict):
+            _merge_details(total.setdefault(key, {}), value)
+        elif isinstance(value, list):
+            total.setdefault(key, []).extend(value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            total[key] = total.get(key, 0) + value
+        else:
+            total[key] = value
+
+def _record_imported_file(db: Session, file_hash: str, data_type: str, filename: str, total_rows: int, imported_count: int):
+    existing = db.scalar(select(ImportedFile).where(
+        ImportedFile.sha256 == file_hash, ImportedFile.data_type == data_type
+    ))
+    if not existing:
+        db.add(ImportedFile(
+            sha256=file_hash,
+            data_type=data_type,
+            filename=filename,
+            total_rows=total_rows,
+            imported_count=imported_count
+        ))
+        db.commit()
+
+def _load(db: Session, model, conflict_key: str, records: List[Record], errors: list, chunk_size: int,
+          progress: Optional[Progress], on_conflict: str, details: dict) -> tuple[int, list, dict]:
+    """Bulk insert records and report how many were left unchanged by an upsert"""
+    errors_before = len(errors)
+    written = bulk_insert(db, model, records, errors, chunk_size, progress, on_conflict, conflict_key)
+    if on_conflict != "error":
+        details = {**details, "unchanged_count": len(records) - written - (len(errors) - errors_before)}
+    return written, errors, details
+
+def bulk_insert(db: Session, model, records: List[Record], errors: list, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                progress: Optional[Progress] = None, on_conflict: str = "error",
+                conflict_key: Optional[str] = None) -> int:
+    """Insert records with multi-row INSERTs, committing once per chunk.
+
+    With on_conflict "skip" or "update" the rows are upserted on conflict_key
+    with INSERT ... ON CONFLICT and only rows actually written are counted.
+    If a chunk is rejected it is replayed row by row inside savepoints so the
+    offending rows are reported individually and the rest still land.
+    """
+    if on_conflict not in ON_CONFLICT_MODES:
+        raise ValueError(f"on_conflict must be one of {', '.join(ON_CONFLICT_MODES)}")
+    if not records:
+        return 0
+
+    statement = _insert_statement(db, model, on_conflict, conflict_key, records[0][1].keys())
+    inserted = 0
+    for start in range(0, len(records), chunk_size):
+        chunk = records[start:start + chunk_size]
+        try:
+            chunk_inserted = _execute(db, statement, on_conflict, [values for _, values in chunk])
+            db.commit()
+        except SQLAlchemyError:
+            db.rollback()
+            chunk_inserted = _insert_rows_individually(db, statement, on_conflict, chunk, errors)
+        inserted += chunk_inserted
+        if progress:
+            progress(chunk_inserted, len(errors))
+    return inserted
+
+def _insert_statement(db: Session, model, on_conflict: str, conflict_key: Optional[str], columns: Iterable[str]):
+    """Plain INSERT, or a native INSERT ... ON CONFLICT for PostgreSQL/SQLite"""
+    if on_conflict == "error":
+        return insert(model)
+
+    statement = dialect_insert(db)(model)
+    if on_conflict == "skip":
+        statement = statement.on_conflict_do_nothing(index_elements=[conflict_key])
+    else:
+        table = model.__table__
+        updates = {
+            column: statement.excluded[column]
+            for column in columns
+            if column not in (conflict_key, 'id') + _IMPORT_DATE_COLUMNS
+        }
+        if 'updated_at' in table.c:
+            updates['updated_at'] = func.now()
+        # Unchanged rows are not rewritten at all
+        statement = statement.on_conflict_do_update(
+            index_elements=[conflict_key],
+            set_=updates,
+            where=table.c.content_hash.is_distinct_from(statement.excluded.content_hash)
+        )
+    return statement.returning(model.id)
+
+def _execute(db: Session, statement, on_conflict: str, params: List[Dict[str, Any]]) -> int:
+    """Run statement for params and return the number of rows written"""
+    result = db.execute(statement, params)
+    if on_conflict == "error":
+        return len(params)
+    # Upserts return a row only for each row inserted or updated
+    return len(result.all())
+
+def _insert_rows_individually(db: Session, statement, on_conflict: str, chunk: List[Record], errors: list) -> int:
+    """Fallback for a failed chunk: isolate bad rows with savepoints"""
+    inserted = 0
+    for label, values in chunk:
+        try:
+            with db.begin_nested():
+                inserted += _execute(db, statement, on_conflict, [values])
+        except SQLAlchemyError as e:
+            errors.append(f"Row {label}: {getattr(e, 'orig', None) or e}")
+    db.commit()
+    return inserted
+
+def _with_content_hashes(records: List[Record], replicates: Optional[Counter] = None) -> List[Record]:
+    """Add a SHA-256 of each row's values (minus import dates) as content_hash
+
+    With replicates, the n-th repeat of identical values in a file is hashed
+    with n as well. Replicate measurements then get their own keys, while
+    re-importing the same file still matches every stored row.
+    """
+    hashed = []
+    for label, values in records:
+        content = {k: v for k, v in values.items() if k not in _IMPORT_DATE_COLUMNS}
+        digest = hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+        if replicates is not None:
+            repeat = replicates[digest]
+            replicates[digest] += 1
+            if repeat:
+                digest = hashlib.sha256(f"{digest}:{repeat}".encode()).hexdigest()
+        hashed.append((label, {**values, 'content_hash': digest}))
+    return hashed
+
+def _drop_conflicts(db: Session, key_column, records: List[Record], errors: list, on_conflict: str,
+                    exists_message: str, duplicate_message: str, identical_duplicates: bool = False) -> List[Record]:
+    """Reject rows whose key repeats within the file, or that already exist when on_conflict is "error"
+
+    The messages are formatted with the key value. When the key is a content
+    hash (identical_duplicates), repeats are dropped silently under skip/update.
+    """
+    key = key_column.key
+    existing = set()
+    if on_conflict == "error":
+        existing = _existing_keys(db, key_column, [values[key] for _, values in records])
+
+    seen = set()
+    kept = []
+    for label, values in records:
+        value = values[key]
+        if value in existing:
+            errors.append(f"Row {label}: " + exists_message.format(value))
+        elif value in seen:
+            if on_conflict == "error" or not identical_duplicates:
+                errors.append(f"Row {label}: " + duplicate_message.format(value))
+        else:
+            seen.add(value)
+            kept.append((label, values))
+    return kept
+
+def _existing_keys(db: Session, key_column, keys: list) -> set:
+    """Subset of keys already stored in key_column"""
+    existing = set()
+    for start in range(0, len(keys), DEFAULT_CHUNK_SIZE):
+        existing.update(db.scalars(
+            select(key_column).where(key_column.in_(keys[start:start + DEFAULT_CHUNK_SIZE]))
+        ))
+    return existing
+
+def _require_names(df: pd.DataFrame, column: str, errors: list) -> pd.Series:
+    """Return stripped names for rows that have one, recording the rest as errors"""
+    import pandas as pd
+
+    if column not in df.columns:
+        names = pd.Series(pd.NA, index=df.index, dtype="object")
+    else:
+        names = df[column].where(df[column].notna()).astype("string").str.strip()
+
+    missing = names.isna() | (names == "")
+    for index in df.index[missing]:
+        errors.append(f"Row {index}: Missing experiment name")
+    return names[~missing]
+
+def _quantity_column(df: pd.DataFrame, column: str, unit: str, warnings: list,
+                     default_unit: Optional[str] = None) -> pd.Series:
+    """Parse a whole column of quantities into unit.
+
+    Unparseable cells and bounds ("<10") are stored as NULL with a warning;
+    approximate values ("~800 °C") are stored with a warning.
+    """
+    parsed = parse_quantity(df[column], unit, default_unit)
+    for index, value in df.loc[parsed['bound'], column].items():
+        warnings.append(f"Row {index}: {column} value '{value}' is a bound, not a measurement; stored as empty")
+    for index, value in df.loc[df[column].notna() & ~parsed['valid'] & ~parsed['bound'], column].items():
+        warnings.append(f"Row {index}: Could not parse {column} value '{value}' as {unit}")
+    for index, value in df.loc[parsed['approximate'], column].items():
+        warnings.append(f"Row {index}: {column} value '{value}' is approximate; stored as {parsed.at[index, 'value']:g} {unit}")
+    return parsed['value']
+
+def _text_column(df: pd.DataFrame, column: str) -> pd.Series:
+    return df[column].where(df[column].notna()).astype("string").str.strip()
+
+def _to_records(frame: pd.DataFrame) -> List[Record]:
+    """Convert a normalised frame to records, mapping NaN/NA to None"""
+    frame = frame.astype(object).where(frame.notna(), None)
+    return list(zip(frame.index, frame.to_dict("records")))
+
+def _normalise_graphene_frame(df: pd.DataFrame, db: Session) -> tuple[List[Record], list, list]:
+    """Normalise a graphene sheet column by column; returns (records, errors, warnings)"""
+    import pandas as pd
+
+    errors = []
+    warnings = []
+    names = _require_names(df, 'Experiment', errors)
+    rows = df.loc[names.index]
+
+    # Expected columns for graphene batches (based on Curia report)
+    frame = pd.DataFrame({'name': names}, index=names.index)
+    frame['date_created'] = date.today()
+
+    for csv_col, model_field in {'Oven': 'oven', 'Appearance': 'appearance'}.items():
+        if csv_col in rows.columns:
+            frame[model_field] = _text_column(rows, csv_col)
+
+    # 'Output' has no counterpart on GrapheneBatch, so it is not loaded
+    numeric_mapping = {
+        'T (rate)': ('temperature', '°C'),
+        't': ('time_hours', 'h')
+    }
+    for csv_col, (model_field, unit) in numeric_mapping.items():
+        if csv_col in rows.columns:
+            frame[model_field] = _quantity_column(rows, csv_col, unit, warnings)
+
+    if 'Species' in rows.columns:
+        species = rows['Species'].astype("string")
+        frame['species'] = pd.Series(pd.NA, index=rows.index, dtype="Int64").mask(
+            species.str.contains('Species', na=False),
+            species.str.contains('1', na=False).map({True: 1, False: 2})
+        )
+
+    # Resolve parent biochar lots to IDs with a single query
+    if 'Lot' in rows.columns:
+        lots = _text_column(rows, 'Lot')
+        lot_ids = dict(db.execute(
+            select(BiocharBatch.name, BiocharBatch.id).where(BiocharBatch.name.in_(lots.dropna().unique().tolist()))
+        ).all())
+        frame['parent_biochar_ids'] = lots.map(lambda lot: [str(lot_ids[lot])] if lot in lot_ids else None)
+        for index, lot in lots[lots.notna() & frame['parent_biochar_ids'].isna()].items():
+            warnings.append(f"Row {index}: Biochar lot {lot} not found, imported without parent link")
+
+    # Set Oven C era flag
+    frame['is_oven_c_era'] = frame['oven'].eq('C').fillna(False) if 'oven' in frame else False
+
+    return _to_records(frame), errors, warnings
+
+def _normalise_biochar_frame(df: pd.DataFrame) -> tuple[List[Record], list, list]:
+    """Normalise a biochar sheet column by column; returns (records, errors, warnings)"""
+    import pandas as pd
+
+    errors = []
+    warnings = []
+    names = _require_names(df, 'Experiment', errors)
+    rows = df.loc[names.index]
+
+    frame = pd.DataFrame({'name': names}, index=names.index)
+    frame['date_created'] = date.today()
+
+    if 'Reactor' in rows.columns:
+        frame['oven'] = _text_column(rows, 'Reactor')
+
+    # Map fields with unit handling
+    numeric_mapping = {
+        'T': ('temperature', '°C'),
+        't': ('time_hours', 'h'),
+        'Output': ('output_weight', 'g'),
+        'Raw material': ('input_weight', 'g')
+    }
+    for csv_col, (model_field, unit) in numeric_mapping.items():
+        if csv_col in rows.columns:
+            frame[model_field] = _quantity_column(rows, csv_col, unit, warnings)
+
+    # Calculate yield
+    if 'input_weight' in frame and 'output_weight' in frame:
+        has_weights = (frame['input_weight'] > 0) & (frame['output_weight'] > 0)
+        frame['yield_percent'] = (frame['output_weight'] / frame['input_weight'] * 100).where(has_weights)
+
+    return _to_records(frame), errors, warnings
+
+def _normalise_analysis_frame(df: pd.DataFrame, db: Session) -> tuple[List[Record], list, dict]:
+    """Normalise an analysis sheet and resolve its sample names in one query"""
+    import pandas as pd
+
+    errors = []
+    warnings = []
+
+    names = pd.Series(pd.NA, index=df.index, dtype="string")
+    for column in ('Sample', 'Material'):
+        if column in df.columns:
+            names = names.fillna(_text_column(df, column))
+
+    missing = names.isna() | (names == "")
+    for index in df.index[missing]:
+        errors.append(f"Row {index}: No batch name found")
+    names = names[~missing]
+
+    name_index = BatchNameIndex(db, names.unique().tolist())
+    resolved = names.map(name_index.get)
+    for index, name in names[resolved.isna()].items():
+        if name_index.is_ambiguous(name):
+            errors.append(f"Row {index}: Batch {name} matches several batches")
+        else:
+            errors.append(f"Row {index}: Batch {name} not found")
+
+    resolved = resolved.dropna()
+    rows = df.loc[resolved.index]
+    frame = pd.DataFrame({'graphene_batch_id': resolved}, index=resolved.index)
+    frame['date_analyzed'] = date.today()
+
+    # Bare numbers are read in the unit named by the column header
+    column_mapping = {
+        'Multipoint BET Area [m^2/g]': ('bet_surface_area', 'm²/g', None),
+        'Langmuir Surface Area [m^2/g]': ('bet_langmuir', 'm²/g', None),
+        'Conductivity (S/cm)': ('conductivity', 'S/m', 'S/cm')
+    }
+    for csv_col, (model_field, unit, default_unit) in column_mapping.items():
+        if csv_col in rows.columns:
+            frame[model_field] = _quantity_column(rows, csv_col, unit, warnings, default_unit)
+
+    # Conductivity is always stored in S/m
+    if 'conductivity' in frame:
+        frame['conductivity_unit'] = 'S/m'
+
+    return _to_records(frame), errors, {"warnings": warnings, "name_resolution": name_index.stats}
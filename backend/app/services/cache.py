@@ -0,0 +1,139 @@
+"""Read-through cache for expensive read endpoints.
+
+Entries are keyed by the current version of every namespace they depend on
+("batches", "analysis"). Write paths call bump() after committing, which
+moves readers onto new keys, so stale entries are never served and simply
+age out. Values are computed at most once per key at a time in this process
+(single-flight); concurrent callers wait for the first one's result.
+
+The default backend is an in-process TTL/LRU. Set CACHE_URL=redis://... (and
+install redis) to share entries and versions between API workers, or pass
+any object with get/set/incr to set_backend().
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+import hashlib
+import json
+import os
+import threading
+import time
+
+CACHE_URL = os.getenv("CACHE_URL", "")
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+
+class MemoryBackend:
+    """Thread-safe in-process LRU with per-entry expiry.
+
+    Counters (namespace versions) are kept apart from the LRU and never
+    evicted: a counter falling back to 0 would make entries cached under an
+    earlier, matching version current again.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Optional[float], Any]]" = OrderedDict()
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            if key in self._counters:
+                return self._counters[key]
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires is not None and expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def clear(self):
+        """Drop cached values; counters keep counting so derived state is still invalidated"""
+        with self._lock:
+            self._entries.clear()
+
+class RedisBackend:
+    """Shared backend; values must be JSON serialisable"""
+
+    def __init__(self, url: str):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Any:
+        raw = self._client.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        self._client.set(key, json.dumps(value, default=str), ex=ttl)
+
+    def incr(self, key: str) -> int:
+        return self._client.incr(key)
+
+    def clear(self):
+        self._client.flushdb()
+
+_backend = RedisBackend(CACHE_URL) if CACHE_URL.startswith("redis") else MemoryBackend()
+_inflight: Dict[str, threading.Lock] = {}
+_inflight_lock = threading.Lock()
+
+def set_backend(backend):
+    """Swap the cache backend (e.g. in scripts or for a shared store)"""
+    global _backend
+    _backend = backend
+
+def bump(*namespaces: str):
+    """Invalidate every entry depending on the given namespaces; call after the write commits"""
+    for namespace in namespaces:
+        _backend.incr(f"version:{namespace}")
+
+def version(namespace: str) -> int:
+    """Current version of a namespace, for callers keeping their own derived state"""
+    return _backend.get(f"version:{namespace}") or 0
+
+def get_or_compute(key: str, compute: Callable[[], Any], depends_on: Iterable[str],
+                   ttl: int = CACHE_TTL_SECONDS) -> Tuple[Any, str]:
+    """Return (value, etag) for key, computing and storing the value on a miss.
+
+    The value must be JSON serialisable; the ETag is a hash of its JSON form.
+    """
+    versions = ",".join(f"{namespace}={version(namespace)}" for namespace in depends_on)
+    versioned_key = f"{key}|{versions}"
+
+    entry = _backend.get(versioned_key)
+    if entry is not None:
+        return entry["value"], entry["etag"]
+
+    with _inflight_lock:
+        lock = _inflight.setdefault(versioned_key, threading.Lock())
+    with lock:
+        # Another caller may have filled the entry while we waited
+        entry = _backend.get(versioned_key)
+        if entry is None:
+            value = compute()
+            entry = {"value": value, "etag": make_etag(value)}
+            _backend.set(versioned_key, entry, ttl)
+    with _inflight_lock:
+        if _inflight.get(versioned_key) is lock and not lock.locked():
+            del _inflight[versioned_key]
+    return entry["value"], entry["etag"]
+
+def make_etag(value: Any) -> str:
+    payload = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return '"' + hashlib.sha256(payload.encode()).hexdigest()[:32] + '"'
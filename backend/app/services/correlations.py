@@ -0,0 +1,282 @@
+"""Process-parameter analytics over graphene batches.
+
+Batch parameters and their analysis rollups are loaded once into NumPy
+arrays; correlation matrices, grouped statistics and polynomial trend fits
+are then computed for all variables / groups at once with matrix and
+bincount operations instead of per-batch Python loops. Missing values are
+NaN and every statistic uses the pairwise-complete observations. NumPy
+is imported on first use, keeping it out of API worker start-up.
+"""
+from __future__ import annotations
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models import GrapheneBatch, BatchAnalysisSummary
+from datetime import date
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence
+import math
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Numeric variables that can be correlated or used as trend inputs / outcomes
+NUMERIC_VARIABLES = {
+    "temperature": GrapheneBatch.temperature,
+    "koh_ratio": GrapheneBatch.koh_ratio,
+    "time_hours": GrapheneBatch.time_hours,
+    "species": GrapheneBatch.species,
+    "bet": BatchAnalysisSummary.max_bet,
+    "mean_bet": BatchAnalysisSummary.mean_bet,
+    "conductivity": BatchAnalysisSummary.max_conductivity
+}
+
+# Variables batches can be grouped by
+GROUP_VARIABLES = {
+    "oven": GrapheneBatch.oven,
+    "species": GrapheneBatch.species,
+    "grinding_method": GrapheneBatch.grinding_method,
+    "is_oven_c_era": GrapheneBatch.is_oven_c_era
+}
+
+CORRELATION_METHODS = ("pearson", "spearman")
+MAX_TREND_DEGREE = 3
+
+# Points returned per fitted trend curve
+TREND_CURVE_POINTS = 25
+
+def load_process_arrays(db: Session, oven_c_era: Optional[bool] = None,
+                        date_from: Optional[date] = None, date_to: Optional[date] = None) -> Dict[str, np.ndarray]:
+    """Load every batch's parameters and analysis rollup as column arrays (float with NaN, or object for groups)"""
+    import numpy as np
+
+    columns = [*NUMERIC_VARIABLES.items(), *((f"group:{name}", column) for name, column in GROUP_VARIABLES.items())]
+    statement = select(*[column for _, column in columns]).select_from(
+        GrapheneBatch
+    ).outerjoin(BatchAnalysisSummary)
+    if oven_c_era is not None:
+        statement = statement.where(GrapheneBatch.is_oven_c_era == oven_c_era)
+    if date_from:
+        statement = statement.where(GrapheneBatch.date_created >= date_from)
+    if date_to:
+        statement = statement.where(GrapheneBatch.date_created <= date_to)
+
+    rows = db.execute(statement).all()
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    return {
+        key: np.array(column_values, dtype=float if key in NUMERIC_VARIABLES else object)
+        for (key, _), column_values in zip(columns, values)
+    }
+
+def correlation_matrix(arrays: Dict[str, np.ndarray], variables: Sequence[str],
+                       method: str = "pearson") -> Dict[str, Any]:
+    """Pairwise-complete correlation matrix of the given numeric variables.
+
+    Spearman ranks each variable over its own non-missing values.
+    """
+    import numpy as np
+
+    _check_variables(variables)
+    if method not in CORRELATION_METHODS:
+        raise ValueError(f"method must be one of: {', '.join(CORRELATION_METHODS)}")
+
+    data = np.column_stack([arrays[name] for name in variables]) if len(arrays[variables[0]]) else \
+        np.empty((0, len(variables)))
+    if method == "spearman":
+        data = np.column_stack([_rank(data[:, i]) for i in range(data.shape[1])]) if len(data) else data
+
+    present = ~np.isnan(data)
+    mask = present.astype(float)
+    filled = np.where(present, data, 0.0)
+
+    # Sums over the rows where both variables of each pair are present
+    n = mask.T @ mask
+    sum_x = filled.T @ mask                     # [i, j]: sum of variable i where j is present
+    sum_xx = (filled ** 2).T @ mask
+    sum_xy = filled.T @ filled
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        covariance = n * sum_xy - sum_x * sum_x.T
+        spread = (n * sum_xx - sum_x ** 2) * (n * sum_xx.T - sum_x.T ** 2)
+        matrix = covariance / np.sqrt(spread)
+    matrix[n < 3] = np.nan
+    np.fill_diagonal(matrix, np.where(np.diag(n) >= 3, 1.0, np.nan))
+
+    return {
+        "variables": list(variables),
+        "method": method,
+        "matrix": _to_list(np.clip(matrix, -1, 1), 4),
+        "n": n.astype(int).tolist()
+    }
+
+def grouped_stats(arrays: Dict[str, np.ndarray], by: str, metrics: Sequence[str]) -> List[Dict[str, Any]]:
+    """Count, mean, std, min and max of each metric per group value"""
+    import numpy as np
+
+    if by not in GROUP_VARIABLES:
+        raise ValueError(f"by must be one of: {', '.join(GROUP_VARIABLES)}")
+    _check_variables(metrics)
+
+    labels, inverse = _group_codes(arrays[f"group:{by}"])
+    group_count = len(labels)
+    batches = np.bincount(inverse, minlength=group_count)
+    stats = [{by: label, "batches": int(count)} for label, count in zip(labels, batches)]
+
+    for metric in metrics:
+        values = arrays[metric]
+        present = ~np.isnan(values)
+        codes = inverse[present]
+        values = values[present]
+        count = np.bincount(codes, minlength=group_count)
+        total = np.bincount(codes, weights=values, minlength=group_count)
+        total_sq = np.bincount(codes, weights=values ** 2, minlength=group_count)
+        minimum = np.full(group_count, np.inf)
+        maximum = np.full(group_count, -np.inf)
+        np.minimum.at(minimum, codes, values)
+        np.maximum.at(maximum, codes, values)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = total / count
+            # Sample standard deviation
+            variance = (total_sq - count * mean ** 2) / (count - 1)
+            std = np.sqrt(np.clip(variance, 0, None))
+        std[count < 2] = np.nan
+        minimum[count == 0] = np.nan
+        maximum[count == 0] = np.nan
+
+        for i, row in enumerate(stats):
+            row[metric] = {
+                "count": int(count[i]),
+                "mean": _round(mean[i], 2),
+                "std": _round(std[i], 2),
+                "min": _round(minimum[i], 2),
+                "max": _round(maximum[i], 2)
+            }
+    return stats
+
+def trend_fits(arrays: Dict[str, np.ndarray], x_variables: Sequence[str], metric: str,
+               group_by: Optional[str] = None, degree: int = 1) -> List[Dict[str, Any]]:
+    """Least-squares polynomial fits of metric against each x variable, per group.
+
+    All (x variable, group) fits are solved together from stacked normal
+    equations. x is standardised per variable before fitting for numerical
+    stability; coefficients are reported for the original units, lowest
+    power first.
+    """
+    import numpy as np
+
+    _check_variables([*x_variables, metric])
+    if not 1 <= degree <= MAX_TREND_DEGREE:
+        raise ValueError(f"degree must be between 1 and {MAX_TREND_DEGREE}")
+    if group_by is not None and group_by not in GROUP_VARIABLES:
+        raise ValueError(f"group_by must be one of: {', '.join(GROUP_VARIABLES)}")
+
+    y = arrays[metric]
+    if group_by:
+        labels, inverse = _group_codes(arrays[f"group:{group_by}"])
+    else:
+        labels, inverse = [None], np.zeros(len(y), dtype=int)
+    group_count = len(labels)
+    variable_count = len(x_variables)
+    terms = degree + 1
+
+    x = np.column_stack([arrays[name] for name in x_variables]) if len(y) else np.empty((0, variable_count))
+    valid = ~np.isnan(x) & ~np.isnan(y)[:, None]
+    x_filled = np.where(valid, x, 0.0)
+    present = np.maximum(valid.sum(axis=0), 1)
+    centre = x_filled.sum(axis=0) / present
+    scale = np.sqrt(np.where(valid, (x_filled - centre) ** 2, 0.0).sum(axis=0) / present)
+    scale = np.where(scale > 0, scale, 1.0)
+    z = np.where(valid, (x - centre) / scale, 0.0)
+    y_filled = np.where(valid, y[:, None], 0.0)
+    weight = valid.astype(float)
+
+    # Power sums per (group, variable): sum z^p for p <= 2*degree, and sum y*z^p for p <= degree
+    powers = z[:, :, None] ** np.arange(2 * degree + 1) * weight[:, :, None]
+    power_sums = np.zeros((group_count, variable_count, 2 * degree + 1))
+    np.add.at(power_sums, inverse, powers)
+    moment_sums = np.zeros((group_count, variable_count, terms))
+    np.add.at(moment_sums, inverse, powers[:, :, :terms] * y_filled[:, :, None])
+    y_sums = np.zeros((group_count, variable_count, 2))
+    np.add.at(y_sums, inverse, np.stack([y_filled, y_filled ** 2], axis=-1))
+
+    # Normal equations A c = b for every fit at once: A[p, q] = sum z^(p+q)
+    index = np.arange(terms)[:, None] + np.arange(terms)[None, :]
+    normal = power_sums[:, :, index]
+    coefficients = np.einsum("gvpq,gvq->gvp", np.linalg.pinv(normal), moment_sums)
+
+    n = power_sums[:, :, 0]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Residual sum of squares from the normal equations: sum y^2 - c.b
+        residual = y_sums[:, :, 1] - np.einsum("gvp,gvp->gv", coefficients, moment_sums)
+        total = y_sums[:, :, 1] - y_sums[:, :, 0] ** 2 / n
+        r_squared = 1 - residual / total
+
+    fits = []
+    for g, label in enumerate(labels):
+        for v, name in enumerate(x_variables):
+            count = int(n[g, v])
+            fit = {"x": name, "metric": metric, "n": count, "degree": degree}
+            if group_by:
+                fit[group_by] = label
+            if count <= degree:
+                fit.update({"coefficients": None, "r_squared": None, "curve": []})
+                fits.append(fit)
+                continue
+
+            polynomial = np.polynomial.Polynomial(coefficients[g, v])(
+                np.polynomial.Polynomial([-centre[v] / scale[v], 1 / scale[v]])
+            )
+            x_values = x[:, v][(inverse == g) & valid[:, v]]
+            curve_x = np.linspace(x_values.min(), x_values.max(), TREND_CURVE_POINTS if np.ptp(x_values) else 1)
+            fit.update({
+                "coefficients": [_significant(c) for c in np.pad(polynomial.coef, (0, terms - len(polynomial.coef)))],
+                "r_squared": _round(r_squared[g, v], 4),
+                "curve": [{"x": _round(a, 4), "y": _round(b, 2)} for a, b in zip(curve_x, polynomial(curve_x))]
+            })
+            fits.append(fit)
+    return fits
+
+def _check_variables(variables: Sequence[str]):
+    if not variables:
+        raise ValueError("At least one variable is required")
+    unknown = [name for name in variables if name not in NUMERIC_VARIABLES]
+    if unknown:
+        raise ValueError(f"Unknown variables: {', '.join(unknown)}; expected {', '.join(NUMERIC_VARIABLES)}")
+
+def _group_codes(values: np.ndarray):
+    """Distinct group labels (missing values last, as None) and each row's label index"""
+    import numpy as np
+
+    labels = sorted({value for value in values if value is not None}, key=str)
+    if any(value is None for value in values):
+        labels.append(None)
+    index = {label: i for i, label in enumerate(labels)}
+    return labels, np.array([index[value] for value in values], dtype=int)
+
+def _rank(values: np.ndarray) -> np.ndarray:
+    """Average ranks of the non-missing values, NaN elsewhere"""
+    import numpy as np
+
+    ranks = np.full(len(values), np.nan)
+    present = ~np.isnan(values)
+    observed = values[present]
+    order = np.argsort(observed, kind="mergesort")
+    sorted_values = observed[order]
+    # Ties share the mean of their positions
+    _, first, counts = np.unique(sorted_values, return_index=True, return_counts=True)
+    tie_ranks = first + (counts + 1) / 2
+    position_ranks = np.repeat(tie_ranks, counts)
+    result = np.empty(len(observed))
+    result[order] = position_ranks
+    ranks[present] = result
+    return ranks
+
+def _round(value, digits: int):
+    value = float(value)
+    return round(value, digits) if math.isfinite(value) else None
+
+def _significant(value, digits: int = 6):
+    value = float(value)
+    return float(f"{value:.{digits}g}") if math.isfinite(value) else None
+
+def _to_list(matrix: np.ndarray, digits: int) -> list:
+    return [[_round(value, digits) for value in row] for row in matrix]
@@ -0,0 +1,165 @@
+"""Thumbnails and deep-zoom tile pyramids for stored SEM/TEM images.
+
+Derived images live under IMAGE_DERIVED_DIR/ab/cd/<sha256>/:
+
+    thumb_<size>.webp          gallery thumbnails (longest side <= size)
+    tiles.dzi                  Deep Zoom descriptor (OpenSeadragon etc.)
+    tiles_files/<level>/<col>_<row>.webp
+
+They are queued on a thread pool (Pillow releases the GIL while resizing
+and encoding) when an image is uploaded, and generated on first request
+for images stored before this existed. Everything is keyed by the
+original's content hash, so a derived file never changes once written.
+"""
+from __future__ import annotations
+from concurrent.futures import Future, ThreadPoolExecutor
+from app.services.image_store import image_path
+from app.utils.storage import upload_dir
+from typing import TYPE_CHECKING, Callable, Dict, Iterable
+import math
+import os
+import threading
+import uuid
+
+# Pillow is imported by the workers that decode images, not at API start-up
+if TYPE_CHECKING:
+    from PIL import Image
+
+IMAGE_DERIVED_DIR = upload_dir("IMAGE_DERIVED_DIR", "image_derivatives")
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+
+THUMBNAIL_SIZES = (256, 1024)
+DEFAULT_THUMBNAIL_SIZE = 256
+TILE_SIZE = 254
+TILE_OVERLAP = 1
+WEBP_QUALITY = int(os.getenv("WEBP_QUALITY", "80"))
+
+# Large microscopy scans exceed Pillow's default decompression-bomb limit
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", str(400_000_000)))
+
+_executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="image-derivatives")
+_pending: Dict[str, Future] = {}
+_lock = threading.Lock()
+
+def derived_dir(sha256: str) -> str:
+    return os.path.join(IMAGE_DERIVED_DIR, sha256[:2], sha256[2:4], sha256)
+
+def thumbnail_path(sha256: str, size: int) -> str:
+    return os.path.join(derived_dir(sha256), f"thumb_{size}.webp")
+
+def dzi_path(sha256: str) -> str:
+    return os.path.join(derived_dir(sha256), "tiles.dzi")
+
+def tile_path(sha256: str, level: int, column: int, row: int) -> str:
+    return os.path.join(derived_dir(sha256), "tiles_files", str(level), f"{column}_{row}.webp")
+
+def schedule_derivatives(sha256s: Iterable[str]):
+    """Queue thumbnails and tiles for freshly stored images"""
+    for sha256 in set(sha256s):
+        _submit(f"thumbnails:{sha256}", lambda sha256=sha256: generate_thumbnails(sha256))
+        _submit(f"tiles:{sha256}", lambda sha256=sha256: generate_tiles(sha256))
+
+def ensure_thumbnail(sha256: str, size: int) -> str:
+    """Path of a thumbnail, generating it (or waiting for a queued run) if missing"""
+    path = thumbnail_path(sha256, size)
+    if not os.path.exists(path):
+        _submit(f"thumbnails:{sha256}", lambda: generate_thumbnails(sha256)).result()
+    return path
+
+def ensure_tiles(sha256: str) -> str:
+    """Path of the DZI descriptor, generating the whole pyramid if missing"""
+    path = dzi_path(sha256)
+    if not os.path.exists(path):
+        _submit(f"tiles:{sha256}", lambda: generate_tiles(sha256)).result()
+    return path
+
+def generate_thumbnails(sha256: str):
+    from PIL import Image
+
+    with _open(sha256) as image:
+        for size in sorted(THUMBNAIL_SIZES, reverse=True):
+            if os.path.exists(thumbnail_path(sha256, size)):
+                continue
+            # Each smaller size is reduced from the previous one
+            image.thumbnail((size, size), Image.LANCZOS)
+            _save_webp(image, thumbnail_path(sha256, size))
+
+def generate_tiles(sha256: str):
+    """Write every pyramid level's tiles, then the descriptor (whose presence marks completion)"""
+    from PIL import Image
+
+    with _open(sha256) as image:
+        width, height = image.size
+        max_level = math.ceil(math.log2(max(width, height, 1)))
+        level_image = image
+        for level in range(max_level, -1, -1):
+            if level != max_level:
+                # Halve the previous level; the ceil matches the DZI level size formula
+                level_image = level_image.resize(
+                    (max(1, math.ceil(level_image.width / 2)), max(1, math.ceil(level_image.height / 2))),
+                    Image.LANCZOS
+                )
+            for column in range(math.ceil(level_image.width / TILE_SIZE)):
+                for row in range(math.ceil(level_image.height / TILE_SIZE)):
+                    left = max(0, column * TILE_SIZE - TILE_OVERLAP)
+                    top = max(0, row * TILE_SIZE - TILE_OVERLAP)
+                    right = min(level_image.width, (column + 1) * TILE_SIZE + TILE_OVERLAP)
+                    bottom = min(level_image.height, (row + 1) * TILE_SIZE + TILE_OVERLAP)
+                    _save_webp(level_image.crop((left, top, right, bottom)), tile_path(sha256, level, column, row))
+
+    descriptor = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" Format="webp" '
+        f'Overlap="{TILE_OVERLAP}" TileSize="{TILE_SIZE}">\n'
+        f'  <Size Width="{width}" Height="{height}"/>\n'
+        '</Image>\n'
+    )
+    _write_atomically(dzi_path(sha256), descriptor.encode())
+
+def _submit(key: str, work: Callable[[], None]) -> Future:
+    """Run work on the pool unless the same key is already queued or running"""
+    with _lock:
+        future = _pending.get(key)
+        if future is None:
+            future = _executor.submit(work)
+            _pending[key] = future
+            future.add_done_callback(lambda done: _forget(key, done))
+    return future
+
+def _forget(key: str, future: Future):
+    with _lock:
+        if _pending.get(key) is future:
+            del _pending[key]
+
+def _open(sha256: str) -> Image.Image:
+    """Load the original as 8-bit RGB(A); 16-bit and float micrographs are stretched to their range"""
+    from PIL import Image
+
+    Image.MAX_IMAGE_PIXELS = IMAGE_MAX_PIXELS
+    with Image.open(image_path(sha256)) as source:
+        source.seek(0)   # first frame of multi-page TIFFs
+        image = source.convert("I") if source.mode.startswith("I;16") else source.copy()
+    if image.mode in ("I", "F"):
+        low, high = image.getextrema()
+        scale = 255 / (high - low) if high > low else 1
+        image = image.point(lambda value: (value - low) * scale).convert("L")
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.mode or "transparency" in image.info else "RGB")
+    return image
+
+def _save_webp(image: Image.Image, path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        image.save(partial, "WEBP", quality=WEBP_QUALITY, method=4)
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+
+def _write_atomically(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(partial, "wb") as out:
+        out.write(data)
+    os.replace(partial, path)
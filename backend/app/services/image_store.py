@@ -0,0 +1,276 @@
+"""Content-addressed storage for SEM/TEM images.
+
+Uploads are streamed to disk in chunks with aiofiles while being hashed,
+then moved to IMAGE_STORE_DIR/ab/cd/<sha256>. Identical files attached to
+several analyses are stored once; stored_images.ref_count counts the
+analysis image-list entries pointing at each file. Analyses reference
+images by URL (/api/v1/images/<sha256>).
+
+Files are never deleted while a request might be deduplicating against
+them: detaching only lowers ref_count, and garbage collection later removes
+unreferenced files older than a grace period. The same command first moves
+legacy path references (uploads/sem_images/<uuid>_<name>, under UPLOAD_DIR)
+into the store:
+
+    python -m app.services.image_store
+"""
+from collections import Counter
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+from app.models import AnalysisResult, StoredImage
+from app.utils.sql import dialect_insert
+from app.utils.storage import legacy_upload_path, upload_dir
+from typing import Any, Dict, Iterable, List, Optional
+import aiofiles
+import asyncio
+import hashlib
+import mimetypes
+import os
+import re
+import shutil
+import time
+import uuid
+
+IMAGE_STORE_DIR = upload_dir("IMAGE_STORE_DIR", "images")
+MAX_IMAGE_BYTES = int(os.getenv("MAX_IMAGE_BYTES", str(100 * 1024 * 1024)))
+
+# Unreferenced files younger than this are kept (they may be mid-upload or just deduplicated)
+GC_GRACE_SECONDS = int(os.getenv("IMAGE_GC_GRACE_SECONDS", "3600"))
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp", ".gif", ".webp")
+IMAGE_URL_PREFIX = "/api/v1/images/"
+
+# Analysis columns holding image references
+IMAGE_FIELDS = ("sem_images", "tem_images")
+
+_SHA256 = re.compile(r"[0-9a-f]{64}")
+
+class ImageTooLargeError(ValueError):
+    pass
+
+def image_path(sha256: str) -> str:
+    return os.path.join(IMAGE_STORE_DIR, sha256[:2], sha256[2:4], sha256)
+
+def image_url(sha256: str) -> str:
+    return f"{IMAGE_URL_PREFIX}{sha256}"
+
+def sha256_from_reference(reference: str) -> Optional[str]:
+    """The hash behind an image URL, or None for legacy path references"""
+    if isinstance(reference, str) and reference.startswith(IMAGE_URL_PREFIX):
+        candidate = reference[len(IMAGE_URL_PREFIX):]
+        if _SHA256.fullmatch(candidate):
+            return candidate
+    return None
+
+def is_valid_sha256(value: str) -> bool:
+    return bool(_SHA256.fullmatch(value))
+
+async def save_upload(file: UploadFile) -> Dict[str, Any]:
+    """Stream one upload into the store, returning its hash, size, type and name"""
+    filename = os.path.basename(file.filename or "")
+    if not filename.lower().endswith(IMAGE_EXTENSIONS):
+        raise ValueError(f"{filename or 'File'} is not a supported image ({', '.join(IMAGE_EXTENSIONS)})")
+
+    # Filesystem calls other than the streamed writes run on the thread pool, off the event loop
+    spool_dir = os.path.join(IMAGE_STORE_DIR, "tmp")
+    await run_in_threadpool(os.makedirs, spool_dir, exist_ok=True)
+    partial = os.path.join(spool_dir, f"{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(partial, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if size > MAX_IMAGE_BYTES:
+                    raise ImageTooLargeError(f"{filename} exceeds the {MAX_IMAGE_BYTES // (1024 * 1024)} MB limit")
+                digest.update(chunk)
+                await out.write(chunk)
+        if not size:
+            raise ValueError(f"{filename} is empty")
+
+        sha256 = digest.hexdigest()
+        await run_in_threadpool(_store_file, partial, image_path(sha256))
+    finally:
+        await run_in_threadpool(_remove_partial, partial)
+
+    return {
+        "sha256": sha256,
+        "size_bytes": size,
+        "content_type": file.content_type if (file.content_type or "").startswith("image/")
+        else mimetypes.guess_type(filename)[0],
+        "original_filename": filename
+    }
+
+async def save_uploads(files: Iterable[UploadFile]) -> List[Dict[str, Any]]:
+    """Store several uploads concurrently"""
+    return list(await asyncio.gather(*(save_upload(file) for file in files if file.filename)))
+
+def attach_images(db: Session, analysis: AnalysisResult, field: str, stored: List[Dict[str, Any]]) -> int:
+    """Append stored images to one of the analysis's image lists and take references.
+
+    Images already in that list are skipped. The list is re-read with the
+    analysis row locked, so concurrent uploads cannot drop each other's
+    entries (and their references). Runs in the caller's transaction;
+    returns the number of images added.
+    """
+    db.refresh(analysis, attribute_names=[field], with_for_update=True)
+    current = list(getattr(analysis, field) or [])
+    present = set(current)
+    added = []
+    for image in stored:
+        url = image_url(image["sha256"])
+        if url not in present:
+            present.add(url)
+            added.append(image)
+    if not added:
+        return 0
+
+    insert = dialect_insert(db)
+    db.execute(insert(StoredImage).values([
+        {**image, "ref_count": 0} for image in {image["sha256"]: image for image in added}.values()
+    ]).on_conflict_do_nothing(index_elements=["sha256"]))
+    _adjust_ref_counts(db, Counter(image["sha256"] for image in added))
+    setattr(analysis, field, current + [image_url(image["sha256"]) for image in added])
+    return len(added)
+
+def detach_image(db: Session, analysis: AnalysisResult, sha256: str) -> int:
+    """Remove an image from the analysis's image lists and release its references (row locked, as in attach_images)"""
+    db.refresh(analysis, attribute_names=list(IMAGE_FIELDS), with_for_update=True)
+    url = image_url(sha256)
+    removed = 0
+    for field in IMAGE_FIELDS:
+        current = getattr(analysis, field) or []
+        kept = [reference for reference in current if reference != url]
+        if len(kept) != len(current):
+            removed += len(current) - len(kept)
+            setattr(analysis, field, kept)
+    if removed:
+        _adjust_ref_counts(db, Counter({sha256: -removed}))
+    return removed
+
+def adopt_legacy_images(db: Session) -> int:
+    """Copy files behind legacy path references into the store and point analyses at their URLs; commits.
+
+    References whose file no longer exists are left untouched. Reference
+    counts are not adjusted here, so run rebuild_ref_counts afterwards.
+    """
+    adopted = 0
+    for analysis in db.query(AnalysisResult).all():
+        for field in IMAGE_FIELDS:
+            references = getattr(analysis, field) or []
+            if all(sha256_from_reference(reference) for reference in references):
+                continue
+            updated = []
+            for reference in references:
+                if not sha256_from_reference(reference) and os.path.isfile(legacy_upload_path(reference)):
+                    reference = image_url(_adopt_file(db, legacy_upload_path(reference)))
+                    adopted += 1
+                updated.append(reference)
+            setattr(analysis, field, updated)
+    db.commit()
+    return adopted
+
+def rebuild_ref_counts(db: Session) -> int:
+    """Recount references from every analysis's image lists; commits and returns the number of referenced images"""
+    counts = Counter()
+    rows = db.execute(
+        select(*(getattr(AnalysisResult, field) for field in IMAGE_FIELDS)).execution_options(yield_per=1000)
+    )
+    for lists in rows:
+        for references in lists:
+            counts.update(filter(None, map(sha256_from_reference, references or [])))
+
+    db.execute(update(StoredImage).values(ref_count=0))
+    for sha256, count in counts.items():
+        db.execute(update(StoredImage).where(StoredImage.sha256 == sha256).values(ref_count=count))
+    db.commit()
+    return len(counts)
+
+def collect_garbage(db: Session, grace_seconds: int = GC_GRACE_SECONDS) -> int:
+    """Delete unreferenced images (and stray files with no row) older than the grace period; commits"""
+    cutoff = time.time() - grace_seconds
+    removed = 0
+    for sha256 in db.scalars(select(StoredImage.sha256).where(StoredImage.ref_count <= 0)).all():
+        path = image_path(sha256)
+        if os.path.exists(path) and os.path.getmtime(path) > cutoff:
+            continue
+        deleted = db.execute(delete(StoredImage).where(StoredImage.sha256 == sha256, StoredImage.ref_count <= 0))
+        db.commit()
+        # Re-referenced since the scan
+        if not deleted.rowcount:
+            continue
+        if os.path.exists(path):
+            os.remove(path)
+        _remove_derivatives(sha256)
+        removed += 1
+
+    # Files whose upload never reached the database, and abandoned partial uploads
+    known = set(db.scalars(select(StoredImage.sha256)))
+    for directory, _, filenames in os.walk(IMAGE_STORE_DIR):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            stray = filename.endswith(".part") or (is_valid_sha256(filename) and filename not in known)
+            if stray and os.path.getmtime(path) <= cutoff:
+                os.remove(path)
+                removed += 1
+    return removed
+
+def _store_file(partial: str, path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        # Already stored: refresh its age so garbage collection leaves it alone
+        os.utime(path)
+    else:
+        os.replace(partial, path)
+
+def _remove_partial(partial: str):
+    if os.path.exists(partial):
+        os.remove(partial)
+
+def _adopt_file(db: Session, path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        while chunk := source.read(UPLOAD_CHUNK_BYTES):
+            digest.update(chunk)
+    sha256 = digest.hexdigest()
+
+    stored = image_path(sha256)
+    if not os.path.exists(stored):
+        os.makedirs(os.path.dirname(stored), exist_ok=True)
+        partial = f"{stored}.{uuid.uuid4().hex}.part"
+        shutil.copyfile(path, partial)
+        os.replace(partial, stored)
+    # Legacy names are <uuid>_<original filename>
+    filename = os.path.basename(path).split("_", 1)[-1]
+    db.execute(dialect_insert(db)(StoredImage).values(
+        sha256=sha256, size_bytes=os.path.getsize(stored), content_type=mimetypes.guess_type(filename)[0],
+        original_filename=filename, ref_count=0
+    ).on_conflict_do_nothing(index_elements=["sha256"]))
+    return sha256
+
+def _remove_derivatives(sha256: str):
+    # Imported here: image_derivatives builds on this module
+    from app.services.image_derivatives import derived_dir
+    shutil.rmtree(derived_dir(sha256), ignore_errors=True)
+
+def _adjust_ref_counts(db: Session, deltas: Counter):
+    for sha256, delta in deltas.items():
+        db.execute(
+            update(StoredImage).where(StoredImage.sha256 == sha256).values(ref_count=StoredImage.ref_count + delta)
+        )
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        adopted = adopt_legacy_images(db)
+        referenced = rebuild_ref_counts(db)
+        removed = collect_garbage(db)
+        print(f"✅ {adopted} legacy images adopted, {referenced} images referenced, "
+              f"{removed} unreferenced files removed")
+    finally:
+        db.close()
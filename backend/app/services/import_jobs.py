@@ -0,0 +1,183 @@
+"""Background import jobs.
+
+Uploads are spooled to disk and a job ID is returned straight away; the
+parse and bulk load then run on a thread pool so several files can be
+imported at once without blocking the event loop. The job runs on the
+worker that spooled the upload, but its state is kept in the import_jobs
+table, so progress can be polled or streamed from any API worker. A job
+whose worker dies mid-import stays "running".
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from fastapi import UploadFile
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import defer
+from app.database import SessionLocal
+from app.models import ImportJob
+from app.services.bulk_import import import_file
+from app.utils.readers import DEFAULT_READ_CHUNK_ROWS
+from app.utils.storage import upload_dir
+from typing import Any, Dict, List, Optional, Tuple
+import aiofiles
+import hashlib
+import os
+import uuid
+
+IMPORT_SPOOL_DIR = upload_dir("IMPORT_SPOOL_DIR", "import_jobs")
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "4"))
+
+# Bytes read from the upload per write to the spool file
+SPOOL_CHUNK_BYTES = 1024 * 1024
+
+# Finished jobs kept for polling
+MAX_FINISHED_JOBS = 200
+
+FINISHED_STATUSES = ("completed", "failed")
+
+_executor = ThreadPoolExecutor(max_workers=IMPORT_WORKERS, thread_name_prefix="import-job")
+
+async def spool_upload(file: UploadFile) -> Tuple[str, str]:
+    """Stream an upload to the spool directory in fixed-size chunks, returning (path, sha256)"""
+    os.makedirs(IMPORT_SPOOL_DIR, exist_ok=True)
+    path = os.path.join(IMPORT_SPOOL_DIR, f"{uuid.uuid4()}_{os.path.basename(file.filename)}")
+    digest = hashlib.sha256()
+    async with aiofiles.open(path, "wb") as spool:
+        while chunk := await file.read(SPOOL_CHUNK_BYTES):
+            digest.update(chunk)
+            await spool.write(chunk)
+    return path, digest.hexdigest()
+
+def submit_import_job(path: str, filename: str, data_type: str, chunk_size: int,
+                      read_chunk_rows: int = DEFAULT_READ_CHUNK_ROWS, on_conflict: str = "error",
+                      file_hash: Optional[str] = None) -> Dict[str, Any]:
+    """Register a job for a spooled file and queue it on the worker pool"""
+    job = ImportJob(
+        id=uuid.uuid4(),
+        filename=filename,
+        data_type=data_type,
+        on_conflict=on_conflict,
+        file_sha256=file_hash,
+        status="queued",
+        rows_parsed=0,
+        rows_inserted=0,
+        error_count=0,
+        errors=[],
+        warnings=[],
+        details={},
+        created_at=_now()
+    )
+    with SessionLocal() as db:
+        _prune_finished_jobs(db)
+        db.add(job)
+        db.commit()
+        snapshot = _as_dict(job)
+    _executor.submit(_run_import_job, snapshot["id"], path, chunk_size, read_chunk_rows)
+    return snapshot
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Snapshot of a job's state, or None if unknown"""
+    try:
+        key = uuid.UUID(str(job_id))
+    except ValueError:
+        return None
+    with SessionLocal() as db:
+        job = db.get(ImportJob, key)
+        return _as_dict(job) if job else None
+
+def list_jobs() -> List[Dict[str, Any]]:
+    """Snapshots of all known jobs without their error and warning lists, newest first"""
+    with SessionLocal() as db:
+        jobs = db.scalars(
+            select(ImportJob).options(defer(ImportJob.errors), defer(ImportJob.warnings))
+            .order_by(ImportJob.created_at.desc())
+        ).all()
+        return [_as_dict(job, lists=False) for job in jobs]
+
+def is_finished(job: Dict[str, Any]) -> bool:
+    return job["status"] in FINISHED_STATUSES
+
+def _update(job_id: str, **changes):
+    with SessionLocal() as db:
+        db.execute(update(ImportJob).where(ImportJob.id == uuid.UUID(job_id)).values(**changes))
+        db.commit()
+
+def _run_import_job(job_id: str, path: str, chunk_size: int, read_chunk_rows: int):
+    """Worker body: parse the spooled file, bulk load it and record progress"""
+    _update(job_id, status="running", started_at=_now())
+    job = get_job(job_id)
+    db = SessionLocal()
+
+    def on_frame(rows: int):
+        _update(job_id, rows_parsed=ImportJob.rows_parsed + rows)
+
+    def on_progress(inserted: int, error_count: int):
+        _update(job_id, rows_inserted=ImportJob.rows_inserted + inserted, error_count=error_count)
+
+    try:
+        result = import_file(
+            path, job["filename"], job["data_type"], db,
+            file_hash=job["file_sha256"],
+            chunk_size=chunk_size,
+            read_chunk_rows=read_chunk_rows,
+            on_conflict=job["on_conflict"],
+            progress=on_progress,
+            on_frame=on_frame
+        )
+        errors = result.pop("errors")
+        _update(
+            job_id,
+            status="completed",
+            rows_parsed=result.pop("total_rows") or 0,
+            rows_inserted=result.pop("imported_count"),
+            errors=errors,
+            error_count=len(errors),
+            warnings=result.pop("warnings"),
+            rows_per_second=result.pop("rows_per_second", None),
+            message=result.pop("message"),
+            details=result,
+            finished_at=_now()
+        )
+    except Exception as e:
+        db.rollback()
+        _update(job_id, status="failed", message=f"Import failed: {str(e)}", finished_at=_now())
+    finally:
+        db.close()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def _prune_finished_jobs(db):
+    """Delete the oldest finished jobs beyond MAX_FINISHED_JOBS"""
+    stale = select(ImportJob.id).where(ImportJob.status.in_(FINISHED_STATUSES)).order_by(
+        ImportJob.created_at.desc()
+    ).offset(MAX_FINISHED_JOBS)
+    db.execute(delete(ImportJob).where(ImportJob.id.in_(stale.scalar_subquery())))
+
+def _as_dict(job: ImportJob, lists: bool = True) -> Dict[str, Any]:
+    snapshot = {
+        "id": str(job.id),
+        "filename": job.filename,
+        "data_type": job.data_type,
+        "on_conflict": job.on_conflict,
+        "file_sha256": job.file_sha256,
+        "status": job.status,
+        "rows_parsed": job.rows_parsed,
+        "rows_inserted": job.rows_inserted,
+        "error_count": job.error_count,
+        "details": job.details or {},
+        "created_at": _iso(job.created_at),
+        "started_at": _iso(job.started_at),
+        "finished_at": _iso(job.finished_at),
+        "rows_per_second": job.rows_per_second,
+        "message": job.message
+    }
+    if lists:
+        snapshot.update(errors=list(job.errors or []), warnings=list(job.warnings or []))
+    return snapshot
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
@@ -0,0 +1,322 @@
+"""Nitrogen (77 K) isotherm storage and batch fitting.
+
+Isotherms are stored as little-endian float32 arrays. Fitting pads a batch
+of isotherms into (isotherm x point) matrices with a validity mask, so BET,
+Langmuir, t-plot, total pore volume and a Kelvin pore-size distribution are
+computed for the whole batch with masked array sums instead of a Python loop
+per isotherm.
+
+Quantities are cm³/g STP; areas m²/g; pore volumes cm³/g liquid; pore
+diameters nm.
+"""
+from datetime import datetime, timezone
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from app.models import Isotherm
+from app.services.batch_names import BatchNameIndex
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+# Storage format for the point arrays
+ARRAY_DTYPE = np.dtype("<f4")
+
+# m²/g per cm³/g STP of N2 monolayer (N_A * 0.162 nm² / 22414 cm³/mol)
+N2_AREA_PER_CM3 = 4.353
+# cm³ liquid N2 per cm³ STP of gas
+N2_LIQUID_PER_CM3 = 0.001547
+# External surface area per unit t-plot slope (cm³ STP/g per Å) -> m²/g
+TPLOT_AREA_FACTOR = 15.47
+
+# Default fitting ranges (relative pressure, and Harkins-Jura thickness in Å)
+BET_RANGE = (0.05, 0.30)
+LANGMUIR_RANGE = (0.05, 0.30)
+TPLOT_RANGE = (3.5, 5.0)
+TOTAL_PORE_VOLUME_PRESSURE = 0.95
+KELVIN_RANGE = (0.35, 0.995)
+
+# Common log-spaced pore diameter grid for the distributions (bin edges, nm)
+PSD_EDGES = np.logspace(np.log10(1.7), np.log10(300), 31)
+
+# Header prefixes recognised in instrument exports (matched case-insensitively)
+SAMPLE_COLUMNS = ("sample", "experiment")
+PRESSURE_COLUMNS = ("p/p0", "p/p°", "relative pressure")
+QUANTITY_COLUMNS = ("quantity adsorbed", "volume @ stp", "volume adsorbed", "va")
+BRANCH_COLUMNS = ("branch",)
+
+# Isotherms fitted per batch when refitting stored data
+REFIT_BATCH_SIZE = 500
+
+# Isotherm columns written from a fit result
+FIT_FIELDS = (
+    "bet_area", "bet_c", "bet_r_squared", "langmuir_area", "tplot_external_area",
+    "tplot_micropore_volume", "total_pore_volume", "mean_pore_diameter", "pore_size_distribution"
+)
+
+def parse_isotherm_frame(df: pd.DataFrame, default_sample: str) -> List[Dict[str, Any]]:
+    """Split an export (one row per point, optionally several samples) into adsorption/desorption branches.
+
+    Without a branch column, points after the highest P/P0 of a sample are
+    taken as its desorption branch.
+    """
+    pressure_column = _find_column(df, PRESSURE_COLUMNS)
+    quantity_column = _find_column(df, QUANTITY_COLUMNS)
+    if pressure_column is None or quantity_column is None:
+        raise ValueError("Isotherm file needs a relative pressure (P/P0) and a quantity adsorbed column")
+    sample_column = _find_column(df, SAMPLE_COLUMNS)
+    branch_column = _find_column(df, BRANCH_COLUMNS)
+
+    points = pd.DataFrame({
+        "sample": df[sample_column].ffill().astype("string").str.strip() if sample_column else default_sample,
+        "x": pd.to_numeric(df[pressure_column], errors="coerce"),
+        "v": pd.to_numeric(df[quantity_column], errors="coerce")
+    }).dropna(subset=["x", "v"])
+    if branch_column:
+        points["desorption"] = df.loc[points.index, branch_column].astype("string").str.strip().str.lower() \
+            .str.startswith("d").fillna(False).astype(bool)
+
+    isotherms = []
+    for sample, group in points.groupby("sample", sort=False):
+        if "desorption" in group:
+            adsorption, desorption = group[~group["desorption"]], group[group["desorption"]]
+        else:
+            turn = group["x"].to_numpy().argmax() + 1
+            adsorption, desorption = group.iloc[:turn], group.iloc[turn:]
+        isotherms.append({
+            "sample": sample,
+            "adsorption": (adsorption["x"].to_numpy(), adsorption["v"].to_numpy()),
+            "desorption": (desorption["x"].to_numpy(), desorption["v"].to_numpy()) if len(desorption) else None
+        })
+    return isotherms
+
+def store_isotherms(db: Session, parsed: List[Dict[str, Any]], filename: str,
+                    analysis_result_id=None) -> Tuple[List[Isotherm], List[str]]:
+    """Fit parsed isotherms in one batch and add them, linked to their graphene batches.
+
+    Returns the new rows and the sample names that matched no batch. Runs in
+    the caller's transaction; the caller commits.
+    """
+    names = BatchNameIndex(db, [isotherm["sample"] for isotherm in parsed])
+    fits = fit_isotherms(
+        [isotherm["adsorption"] for isotherm in parsed],
+        [isotherm["desorption"] for isotherm in parsed]
+    )
+    fitted_at = datetime.now(timezone.utc)
+
+    rows = []
+    unresolved = []
+    for isotherm, fit in zip(parsed, fits):
+        batch_id = names.get(isotherm["sample"])
+        if batch_id is None:
+            unresolved.append(isotherm["sample"])
+        pressures, quantities = isotherm["adsorption"]
+        desorption = isotherm["desorption"]
+        rows.append(Isotherm(
+            graphene_batch_id=batch_id,
+            analysis_result_id=analysis_result_id,
+            sample_name=isotherm["sample"][:100],
+            source_filename=filename,
+            adsorbate="N2",
+            point_count=len(pressures),
+            relative_pressure=encode_array(pressures),
+            quantity_adsorbed=encode_array(quantities),
+            desorption_pressure=encode_array(desorption[0]) if desorption else None,
+            desorption_quantity=encode_array(desorption[1]) if desorption else None,
+            fitted_at=fitted_at,
+            **{field: fit[field] for field in FIT_FIELDS}
+        ))
+    db.add_all(rows)
+    return rows, unresolved
+
+def refit_isotherms(db: Session, graphene_batch_id=None, bet_range: Tuple[float, float] = BET_RANGE,
+                    batch_size: int = REFIT_BATCH_SIZE) -> int:
+    """Refit stored isotherms (all, or one batch's) batch_size at a time and commit; returns the number refitted"""
+    statement = select(
+        Isotherm.id, Isotherm.relative_pressure, Isotherm.quantity_adsorbed,
+        Isotherm.desorption_pressure, Isotherm.desorption_quantity
+    ).order_by(Isotherm.id)
+    if graphene_batch_id is not None:
+        statement = statement.where(Isotherm.graphene_batch_id == graphene_batch_id)
+
+    count = 0
+    for chunk in db.execute(statement.execution_options(yield_per=batch_size)).partitions():
+        adsorption = [(decode_array(row.relative_pressure), decode_array(row.quantity_adsorbed)) for row in chunk]
+        desorption = [
+            (decode_array(row.desorption_pressure), decode_array(row.desorption_quantity))
+            if row.desorption_pressure else None
+            for row in chunk
+        ]
+        fitted_at = datetime.now(timezone.utc)
+        updates = [
+            {"id": row.id, "fitted_at": fitted_at, **{field: fit[field] for field in FIT_FIELDS}}
+            for row, fit in zip(chunk, fit_isotherms(adsorption, desorption, bet_range))
+        ]
+        db.execute(update(Isotherm), updates)
+        count += len(updates)
+    db.commit()
+    return count
+
+def isotherm_points(isotherm: Isotherm) -> Dict[str, Any]:
+    """Decoded point arrays of a stored isotherm"""
+    points = {
+        "adsorption": {
+            "relative_pressure": decode_array(isotherm.relative_pressure).tolist(),
+            "quantity_adsorbed": decode_array(isotherm.quantity_adsorbed).tolist()
+        },
+        "desorption": None
+    }
+    if isotherm.desorption_pressure:
+        points["desorption"] = {
+            "relative_pressure": decode_array(isotherm.desorption_pressure).tolist(),
+            "quantity_adsorbed": decode_array(isotherm.desorption_quantity).tolist()
+        }
+    return points
+
+def encode_array(values: Sequence[float]) -> bytes:
+    return np.asarray(values, dtype=ARRAY_DTYPE).tobytes()
+
+def decode_array(data: Optional[bytes]) -> np.ndarray:
+    return np.frombuffer(data, dtype=ARRAY_DTYPE).astype(float) if data else np.empty(0)
+
+def harkins_jura_thickness(relative_pressure: np.ndarray) -> np.ndarray:
+    """Statistical film thickness in Å"""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.sqrt(13.99 / (0.034 - np.log10(relative_pressure)))
+
+def fit_isotherms(isotherms: Sequence[Tuple[Sequence[float], Sequence[float]]],
+                  desorption: Optional[Sequence[Optional[Tuple[Sequence[float], Sequence[float]]]]] = None,
+                  bet_range: Tuple[float, float] = BET_RANGE) -> List[Dict[str, Any]]:
+    """Fit a batch of adsorption isotherms given as (P/P0, quantity adsorbed) pairs.
+
+    The pore-size distribution uses the desorption branch where one is given
+    for an isotherm, otherwise the adsorption branch.
+    """
+    if not isotherms:
+        return []
+    x, v, mask = _pad(isotherms)
+
+    bet = _bet(x, v, mask & (x >= bet_range[0]) & (x <= bet_range[1]))
+    langmuir = _langmuir(x, v, mask & (x >= LANGMUIR_RANGE[0]) & (x <= LANGMUIR_RANGE[1]))
+    t = harkins_jura_thickness(np.where(mask, x, 0.5))
+    tplot = _line_fit(t, v, mask & (t >= TPLOT_RANGE[0]) & (t <= TPLOT_RANGE[1]))
+    total_volume = _total_pore_volume(x, v, mask)
+
+    psd_branches = [
+        branch if branch is not None and len(branch[0]) else isotherm
+        for isotherm, branch in zip(isotherms, desorption or [None] * len(isotherms))
+    ]
+    psd = _kelvin_psd(*_pad(psd_branches))
+
+    results = []
+    for i in range(len(isotherms)):
+        bet_area = bet["area"][i]
+        micropore = tplot["intercept"][i] * N2_LIQUID_PER_CM3
+        results.append({
+            "point_count": int(mask[i].sum()),
+            "bet_area": _clean(bet_area, 2),
+            "bet_c": _clean(bet["c"][i], 2),
+            "bet_r_squared": _clean(bet["r_squared"][i], 5),
+            "bet_points": int(bet["n"][i]),
+            "langmuir_area": _clean(langmuir[i], 2),
+            "tplot_external_area": _clean(tplot["slope"][i] * TPLOT_AREA_FACTOR, 2),
+            "tplot_micropore_volume": _clean(max(micropore, 0.0) if np.isfinite(micropore) else np.nan, 5),
+            "total_pore_volume": _clean(total_volume[i], 5),
+            "mean_pore_diameter": _clean(4 * total_volume[i] / bet_area * 1e3 if bet_area else np.nan, 3),
+            "pore_size_distribution": {
+                "diameter_nm": [round(float(d), 3) for d in np.sqrt(PSD_EDGES[:-1] * PSD_EDGES[1:])],
+                "dv_dlogd": [round(float(value), 6) for value in psd[i]]
+            }
+        })
+    return results
+
+def _pad(isotherms) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Stack ragged (x, v) pairs into NaN-padded matrices sorted by x, with a validity mask"""
+    width = max(len(x) for x, _ in isotherms) or 1
+    x = np.full((len(isotherms), width), np.nan)
+    v = np.full((len(isotherms), width), np.nan)
+    for i, (pressures, quantities) in enumerate(isotherms):
+        x[i, :len(pressures)] = pressures
+        v[i, :len(quantities)] = quantities
+    mask = np.isfinite(x) & np.isfinite(v) & (x > 0) & (x < 1) & (v > 0)
+    # Sort each row by pressure, invalid points last
+    order = np.argsort(np.where(mask, x, np.inf), axis=1, kind="stable")
+    rows = np.arange(len(isotherms))[:, None]
+    return x[rows, order], v[rows, order], mask[rows, order]
+
+def _line_fit(x: np.ndarray, y: np.ndarray, mask: np.ndarray) -> Dict[str, np.ndarray]:
+    """Row-wise least-squares line y = intercept + slope * x over the masked points"""
+    weight = mask.astype(float)
+    xs = np.where(mask, x, 0.0)
+    ys = np.where(mask, y, 0.0)
+    n = weight.sum(axis=1)
+    sx, sy = xs.sum(axis=1), ys.sum(axis=1)
+    sxx, syy, sxy = (xs * xs).sum(axis=1), (ys * ys).sum(axis=1), (xs * ys).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = (n * sxy - sx * sy) / (n * sxx - sx ** 2)
+        intercept = (sy - slope * sx) / n
+        r = (n * sxy - sx * sy) / np.sqrt((n * sxx - sx ** 2) * (n * syy - sy ** 2))
+    too_few = n < 2
+    slope[too_few] = np.nan
+    intercept[too_few] = np.nan
+    return {"slope": slope, "intercept": intercept, "r_squared": r ** 2, "n": n}
+
+def _bet(x: np.ndarray, v: np.ndarray, mask: np.ndarray) -> Dict[str, np.ndarray]:
+    """BET transform x / (v (1 - x)) = 1/(vm C) + (C - 1)/(vm C) x"""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fit = _line_fit(x, x / (v * (1 - x)), mask)
+        monolayer = 1 / (fit["slope"] + fit["intercept"])
+        c = 1 + fit["slope"] / fit["intercept"]
+    # A negative C means the range is outside the BET regime (e.g. micropore filling)
+    invalid = ~(c > 0) | ~(monolayer > 0)
+    area = np.where(invalid, np.nan, monolayer * N2_AREA_PER_CM3)
+    return {"area": area, "c": np.where(invalid, np.nan, c), "r_squared": fit["r_squared"], "n": fit["n"]}
+
+def _langmuir(x: np.ndarray, v: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Langmuir area from x / v = x / vm + 1 / (K vm)"""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fit = _line_fit(x, x / v, mask)
+        monolayer = 1 / fit["slope"]
+    return np.where(monolayer > 0, monolayer * N2_AREA_PER_CM3, np.nan)
+
+def _total_pore_volume(x: np.ndarray, v: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Liquid volume adsorbed at the point closest to P/P0 = 0.95 (at or above 0.90)"""
+    distance = np.where(mask & (x >= 0.90), np.abs(x - TOTAL_PORE_VOLUME_PRESSURE), np.inf)
+    nearest = distance.argmin(axis=1)
+    rows = np.arange(len(x))
+    found = np.isfinite(distance[rows, nearest])
+    return np.where(found, v[rows, nearest] * N2_LIQUID_PER_CM3, np.nan)
+
+def _kelvin_psd(x: np.ndarray, v: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """dV/dlog(D) on PSD_EDGES from the Kelvin equation plus the film thickness.
+
+    A simplified BJH: the volume change between consecutive points is assigned
+    to pores of the mean Kelvin diameter of the interval, without correcting
+    for film thinning in already emptied pores.
+    """
+    in_range = mask & (x >= KELVIN_RANGE[0]) & (x <= KELVIN_RANGE[1])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        kelvin_radius = -4.15 / np.log10(x)                     # Å
+        diameter = 2 * (kelvin_radius + harkins_jura_thickness(x)) / 10   # nm
+    liquid = v * N2_LIQUID_PER_CM3
+
+    # Consecutive point pairs inside the Kelvin range
+    pair = in_range[:, 1:] & in_range[:, :-1]
+    d_volume = np.where(pair, np.abs(np.diff(liquid, axis=1)), 0.0)
+    d_mid = np.where(pair, np.sqrt(np.abs(diameter[:, 1:] * diameter[:, :-1])), np.nan)
+
+    bins = np.digitize(np.where(pair, d_mid, 0.0), PSD_EDGES) - 1
+    valid = pair & (bins >= 0) & (bins < len(PSD_EDGES) - 1)
+    volumes = np.zeros((len(x), len(PSD_EDGES) - 1))
+    rows = np.broadcast_to(np.arange(len(x))[:, None], bins.shape)
+    np.add.at(volumes, (rows[valid], bins[valid]), d_volume[valid])
+    return volumes / np.diff(np.log10(PSD_EDGES))
+
+def _find_column(df: pd.DataFrame, prefixes: Iterable[str]) -> Optional[str]:
+    for column in df.columns:
+        if str(column).strip().lower().startswith(tuple(prefixes)):
+            return column
+    return None
+
+def _clean(value, digits: int) -> Optional[float]:
+    value = float(value)
+    return round(value, digits) if np.isfinite(value) else None
@@ -0,0 +1,351 @@
+"""Batch lineage: which graphene batches (and shipments) came from which biochar lots.
+
+GrapheneBatch.parent_biochar_ids and Milestone.affected_batch_ids stay the
+source of truth; every write mirrors them into lineage_edges so lineage can
+be walked without decoding JSON. Every edge write also increments the
+lineage_version row in the same transaction. Walks use an in-process
+adjacency map of the "derived_from" edges, reloaded whenever that version
+changes (so writes by any worker are seen), or a recursive CTE when
+LINEAGE_ADJACENCY_CACHE=0. Rebuild the edge table from the JSON columns with:
+
+    python -m app.services.lineage
+"""
+from sqlalchemy import delete, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+from app.models import BiocharBatch, GrapheneBatch, LineageEdge, LineageVersion, Milestone
+from app.services import cache
+from collections import defaultdict, deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import os
+import threading
+import uuid
+
+LINEAGE_ADJACENCY_CACHE = os.getenv("LINEAGE_ADJACENCY_CACHE", "1") != "0"
+
+# Cache namespace bumped by every edge write
+LINEAGE_NAMESPACE = "lineage"
+
+DERIVED_FROM = "derived_from"   # biochar lot -> graphene batch made from it
+AFFECTS = "affects"             # milestone -> batch it affected
+
+DEFAULT_MAX_DEPTH = 10
+
+# IDs per IN (...) list
+CHUNK_SIZE = 1000
+
+NODE_MODELS = {"biochar": BiocharBatch, "graphene": GrapheneBatch, "milestone": Milestone}
+
+# Depth of each reached node, keyed by (node id, node type)
+Walk = Dict[Tuple[uuid.UUID, str], int]
+
+def sync_graphene_edges(db: Session, batch_ids: Iterable[uuid.UUID]) -> int:
+    """Replace the derived_from edges of the given graphene batches from their parent_biochar_ids.
+
+    Runs in the caller's transaction, bumping lineage_version; the caller
+    commits and bumps the "lineage" cache namespace. Returns the number of
+    edges written.
+    """
+    written = 0
+    _bump_version(db)
+    for chunk in _chunks(list(batch_ids)):
+        rows = db.execute(
+            select(GrapheneBatch.id, GrapheneBatch.parent_biochar_ids).where(GrapheneBatch.id.in_(chunk))
+        ).all()
+        parents = _resolve_biochar_refs(db, {ref for _, refs in rows for ref in refs or []})
+        db.execute(delete(LineageEdge).where(LineageEdge.child_id.in_(chunk), LineageEdge.relation == DERIVED_FROM))
+        edges = {
+            (parents[str(ref)], batch_id)
+            for batch_id, refs in rows
+            for ref in refs or []
+            if str(ref) in parents
+        }
+        written += _insert_edges(db, [
+            {"parent_id": parent_id, "parent_type": "biochar", "child_id": child_id,
+             "child_type": "graphene", "relation": DERIVED_FROM}
+            for parent_id, child_id in edges
+        ])
+    return written
+
+def sync_milestone_edges(db: Session, milestone_ids: Iterable[uuid.UUID]) -> int:
+    """Replace the affects edges of the given milestones from their affected_batch_ids"""
+    written = 0
+    _bump_version(db)
+    for chunk in _chunks(list(milestone_ids)):
+        rows = db.execute(select(Milestone.id, Milestone.affected_batch_ids).where(Milestone.id.in_(chunk))).all()
+        types = _batch_types(db, {ref for _, refs in rows for ref in refs or []})
+        db.execute(delete(LineageEdge).where(LineageEdge.parent_id.in_(chunk), LineageEdge.relation == AFFECTS))
+        edges = {
+            (milestone_id, types[str(ref)])
+            for milestone_id, refs in rows
+            for ref in refs or []
+            if str(ref) in types
+        }
+        written += _insert_edges(db, [
+            {"parent_id": milestone_id, "parent_type": "milestone", "child_id": batch_id,
+             "child_type": child_type, "relation": AFFECTS}
+            for milestone_id, (batch_id, child_type) in edges
+        ])
+    return written
+
+def rebuild_lineage(db: Session) -> int:
+    """Recreate the whole edge table from the JSON columns; commits and returns the edge count"""
+    _bump_version(db)
+    db.execute(delete(LineageEdge))
+    graphene_ids = db.scalars(select(GrapheneBatch.id).where(GrapheneBatch.parent_biochar_ids.isnot(None))).all()
+    milestone_ids = db.scalars(select(Milestone.id).where(Milestone.affected_batch_ids.isnot(None))).all()
+    count = sync_graphene_edges(db, graphene_ids) + sync_milestone_edges(db, milestone_ids)
+    db.commit()
+    cache.bump(LINEAGE_NAMESPACE)
+    return count
+
+def resolve_node(db: Session, ref: str) -> Optional[Dict[str, Any]]:
+    """Find a batch or milestone by UUID, or a batch by its exact name"""
+    try:
+        node_id = uuid.UUID(ref)
+    except ValueError:
+        node_id = None
+
+    for node_type, model in NODE_MODELS.items():
+        if node_id is not None:
+            condition = model.id == node_id
+        elif node_type != "milestone":
+            condition = model.name == ref
+        else:
+            continue
+        found = db.scalar(select(model.id).where(condition))
+        if found is not None:
+            return _describe(db, {(found, node_type): 0})[0]
+    return None
+
+def walk(db: Session, node_id: uuid.UUID, direction: str, max_depth: int = DEFAULT_MAX_DEPTH) -> Walk:
+    """Every node reachable from node_id along derived_from edges, with its distance.
+
+    direction is "ancestors" (towards biochar lots) or "descendants".
+    """
+    if direction not in ("ancestors", "descendants"):
+        raise ValueError("direction must be ancestors or descendants")
+    if LINEAGE_ADJACENCY_CACHE:
+        return _walk_adjacency(_adjacency(db)[direction], node_id, max_depth)
+    return _walk_sql(db, node_id, direction, max_depth)
+
+def lineage(db: Session, node: Dict[str, Any], direction: str, max_depth: int = DEFAULT_MAX_DEPTH) -> Dict[str, Any]:
+    """A node's ancestors or descendants with details, plus the milestones affecting any of them"""
+    reached = walk(db, node["id"], direction, max_depth)
+    return {
+        "node": node,
+        "direction": direction,
+        "nodes": sorted(_describe(db, reached), key=lambda item: (item["depth"], item["type"], item["name"] or "")),
+        "milestones": _milestones(db, [node["id"], *(node_id for node_id, _ in reached)])
+    }
+
+def shipment_trace(db: Session, node: Dict[str, Any], max_depth: int = DEFAULT_MAX_DEPTH) -> Dict[str, Any]:
+    """Every shipment of the node or of a batch derived from it"""
+    reached = walk(db, node["id"], "descendants", max_depth)
+    graphene_ids = [node_id for (node_id, node_type) in reached if node_type == "graphene"]
+    depths = {node_id: depth for (node_id, _), depth in reached.items()}
+    if node["type"] == "graphene":
+        graphene_ids.append(node["id"])
+        depths[node["id"]] = 0
+
+    shipments = []
+    for chunk in _chunks(graphene_ids):
+        shipments.extend(
+            {
+                "batch_id": row.id,
+                "batch": row.name,
+                "customer": row.shipped_to,
+                "weight": row.shipped_weight,
+                "date": row.shipped_date.isoformat() if row.shipped_date else None,
+                "depth": depths[row.id]
+            }
+            for row in db.execute(
+                select(
+                    GrapheneBatch.id, GrapheneBatch.name, GrapheneBatch.shipped_to,
+                    GrapheneBatch.shipped_weight, GrapheneBatch.shipped_date
+                ).where(GrapheneBatch.id.in_(chunk), GrapheneBatch.shipped_to.isnot(None))
+            )
+        )
+    shipments.sort(key=lambda item: (item["date"] is None, item["date"] or "", item["batch"]))
+    return {
+        "node": node,
+        "batches_traced": len(graphene_ids),
+        "total_shipped_weight": sum(item["weight"] or 0 for item in shipments),
+        "shipments": shipments
+    }
+
+# In-process adjacency: (freshness key, {"descendants": ..., "ancestors": ...})
+_graph: Optional[Tuple[tuple, Dict[str, Dict[uuid.UUID, List[Tuple[uuid.UUID, str]]]]]] = None
+_graph_lock = threading.Lock()
+
+def _adjacency(db: Session) -> Dict[str, Dict[uuid.UUID, List[Tuple[uuid.UUID, str]]]]:
+    """Adjacency lists of the derived_from edges, reloaded after any edge write.
+
+    Freshness is checked against lineage_version on every call. Edge writes
+    increment it in their own transaction, so commits by other workers are
+    seen as soon as they are visible.
+    """
+    global _graph
+    # Read the key before loading so a concurrent write forces another reload
+    current = (db.scalar(select(LineageVersion.version)),)
+    graph = _graph
+    if graph is not None and graph[0] == current:
+        return graph[1]
+
+    with _graph_lock:
+        if _graph is not None and _graph[0] == current:
+            return _graph[1]
+        descendants = defaultdict(list)
+        ancestors = defaultdict(list)
+        edges = db.execute(
+            select(LineageEdge.parent_id, LineageEdge.parent_type, LineageEdge.child_id, LineageEdge.child_type)
+            .where(LineageEdge.relation == DERIVED_FROM)
+        )
+        for parent_id, parent_type, child_id, child_type in edges:
+            descendants[parent_id].append((child_id, child_type))
+            ancestors[child_id].append((parent_id, parent_type))
+        _graph = (current, {"descendants": dict(descendants), "ancestors": dict(ancestors)})
+        return _graph[1]
+
+def _walk_adjacency(adjacency: Dict[uuid.UUID, List[Tuple[uuid.UUID, str]]], node_id: uuid.UUID, max_depth: int) -> Walk:
+    """Breadth-first walk, so each node is recorded at its shortest distance"""
+    reached: Walk = {}
+    seen = {node_id}
+    queue = deque([(node_id, 0)])
+    while queue:
+        current, depth = queue.popleft()
+        if depth >= max_depth:
+            continue
+        for neighbour, neighbour_type in adjacency.get(current, ()):
+            if neighbour not in seen:
+                seen.add(neighbour)
+                reached[(neighbour, neighbour_type)] = depth + 1
+                queue.append((neighbour, depth + 1))
+    return reached
+
+def _walk_sql(db: Session, node_id: uuid.UUID, direction: str, max_depth: int) -> Walk:
+    """The same walk as a recursive CTE over lineage_edges"""
+    edges = LineageEdge.__table__
+    if direction == "descendants":
+        start, step, step_type = edges.c.parent_id, edges.c.child_id, edges.c.child_type
+    else:
+        start, step, step_type = edges.c.child_id, edges.c.parent_id, edges.c.parent_type
+
+    reached = select(
+        step.label("node_id"), step_type.label("node_type"), literal(1).label("depth")
+    ).where(start == node_id, edges.c.relation == DERIVED_FROM).cte("reached", recursive=True)
+    # Depth-limited, so cycles in bad data still terminate
+    reached = reached.union_all(
+        select(step, step_type, reached.c.depth + 1).select_from(
+            edges.join(reached, start == reached.c.node_id)
+        ).where(edges.c.relation == DERIVED_FROM, reached.c.depth < max_depth)
+    )
+    rows = db.execute(
+        select(reached.c.node_id, reached.c.node_type, func.min(reached.c.depth))
+        .where(reached.c.node_id != node_id)
+        .group_by(reached.c.node_id, reached.c.node_type)
+    )
+    return {(reached_id, node_type): depth for reached_id, node_type, depth in rows}
+
+def _describe(db: Session, reached: Walk) -> List[Dict[str, Any]]:
+    """Load name, date and shipment details for reached nodes, one query per node type"""
+    by_type = defaultdict(list)
+    for node_id, node_type in reached:
+        by_type[node_type].append(node_id)
+
+    nodes = []
+    for node_type, ids in by_type.items():
+        model = NODE_MODELS[node_type]
+        if node_type == "milestone":
+            columns = (model.id, model.title.label("name"), model.date_occurred.label("date"))
+        else:
+            columns = (model.id, model.name, model.date_created.label("date"), model.oven)
+        if node_type == "graphene":
+            columns += (model.species, model.shipped_to, model.shipped_date)
+        for chunk in _chunks(ids):
+            for row in db.execute(select(*columns).where(model.id.in_(chunk))):
+                item = {"id": row.id, "type": node_type, "depth": reached[(row.id, node_type)]}
+                item.update({
+                    key: value.isoformat() if key in ("date", "shipped_date") and value else value
+                    for key, value in row._mapping.items() if key != "id"
+                })
+                nodes.append(item)
+    return nodes
+
+def _milestones(db: Session, node_ids: List[uuid.UUID]) -> List[Dict[str, Any]]:
+    """Milestones with an affects edge to any of the nodes"""
+    milestone_ids = set()
+    for chunk in _chunks(node_ids):
+        milestone_ids.update(db.scalars(
+            select(LineageEdge.parent_id).where(LineageEdge.child_id.in_(chunk), LineageEdge.relation == AFFECTS)
+        ))
+    if not milestone_ids:
+        return []
+    milestones = db.scalars(
+        select(Milestone).where(Milestone.id.in_(list(milestone_ids))).order_by(Milestone.date_occurred)
+    )
+    return [
+        {
+            "id": milestone.id,
+            "date": milestone.date_occurred.isoformat(),
+            "title": milestone.title,
+            "impact_level": milestone.impact_level
+        }
+        for milestone in milestones
+    ]
+
+def _resolve_biochar_refs(db: Session, refs: set) -> Dict[str, uuid.UUID]:
+    """Map parent_biochar_ids entries (UUID strings, or lot names from older clients) to existing biochar IDs"""
+    ids, names = _split_refs(refs)
+    resolved = {}
+    for chunk in _chunks(list(ids)):
+        found = set(db.scalars(select(BiocharBatch.id).where(BiocharBatch.id.in_(chunk))))
+        resolved.update({ids[key]: key for key in chunk if key in found})
+    for chunk in _chunks(list(names)):
+        resolved.update(db.execute(select(BiocharBatch.name, BiocharBatch.id).where(BiocharBatch.name.in_(chunk))).all())
+    return resolved
+
+def _batch_types(db: Session, refs: set) -> Dict[str, Tuple[uuid.UUID, str]]:
+    """Map affected_batch_ids entries to (batch id, "biochar" or "graphene")"""
+    ids, _ = _split_refs(refs)
+    resolved = {}
+    for node_type in ("biochar", "graphene"):
+        model = NODE_MODELS[node_type]
+        for chunk in _chunks(list(ids)):
+            for found in db.scalars(select(model.id).where(model.id.in_(chunk))):
+                resolved.setdefault(ids[found], (found, node_type))
+    return resolved
+
+def _split_refs(refs: set) -> Tuple[Dict[uuid.UUID, str], set]:
+    """Split JSON entries into {UUID: original string} and the remaining names"""
+    ids, names = {}, set()
+    for ref in refs:
+        try:
+            ids[uuid.UUID(str(ref))] = str(ref)
+        except ValueError:
+            names.add(str(ref))
+    return ids, names
+
+def _bump_version(db: Session):
+    """Increment lineage_version; the row lock also serialises concurrent edge writers"""
+    if not db.execute(update(LineageVersion).values(version=LineageVersion.version + 1)).rowcount:
+        db.add(LineageVersion(id=1, version=1))
+        db.flush()
+
+def _insert_edges(db: Session, edges: List[Dict[str, Any]]) -> int:
+    if edges:
+        db.execute(insert(LineageEdge), edges)
+    return len(edges)
+
+def _chunks(values: list):
+    for start in range(0, len(values), CHUNK_SIZE):
+        yield values[start:start + CHUNK_SIZE]
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        count = rebuild_lineage(db)
+        print(f"✅ Rebuilt {count} lineage edges")
+    finally:
+        db.close()
@@ -0,0 +1,309 @@
+"""Request metrics, SQL instrumentation and on-demand profiling.
+
+MetricsMiddleware times every request until its last body byte is sent.
+SQLAlchemy cursor events count the statements each request issues, their
+time and the rows they return, and a wrapper around FastAPI's response
+serialisation times model validation and encoding. Per-route totals and
+histograms are served in Prometheus text format at /metrics, and each
+response carries a Server-Timing header for the browser's network panel.
+
+With PROFILING_ENABLED set, adding ?profile=1 to any request returns a
+cProfile breakdown of that request (event loop and worker threads) instead
+of its normal body. Profiled requests run one at a time.
+"""
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import QueryParams
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILE_TOP_FUNCTIONS = int(os.getenv("PROFILE_TOP_FUNCTIONS", "40"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# An N+1 shows up as requests in the high statement buckets
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 500)
+
+# Requests that matched no route share one label so paths can't explode the series count
+UNMATCHED_ROUTE = "unmatched"
+
+class RequestStats:
+    __slots__ = ("statements", "sql_seconds", "rows", "serialize_seconds", "profiles")
+
+    def __init__(self):
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.rows = 0
+        self.serialize_seconds = 0.0
+        # Worker-thread profiles of a ?profile=1 request, else None
+        self.profiles: Optional[List[cProfile.Profile]] = None
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+_lock = threading.Lock()
+_requests: Dict[Tuple[str, str, int], int] = {}
+_latency: Dict[Tuple[str, str], _Histogram] = {}
+_statements: Dict[Tuple[str, str], _Histogram] = {}
+# (method, route) -> [sql seconds, rows, serialisation seconds]
+_totals: Dict[Tuple[str, str], List[float]] = {}
+
+def record_request(method: str, route: str, status: int, seconds: float, stats: RequestStats):
+    key = (method, route)
+    with _lock:
+        _requests[(method, route, status)] = _requests.get((method, route, status), 0) + 1
+        _latency.setdefault(key, _Histogram(LATENCY_BUCKETS)).observe(seconds)
+        _statements.setdefault(key, _Histogram(STATEMENT_BUCKETS)).observe(stats.statements)
+        totals = _totals.setdefault(key, [0.0, 0, 0.0])
+        totals[0] += stats.sql_seconds
+        totals[1] += stats.rows
+        totals[2] += stats.serialize_seconds
+
+def render_metrics() -> str:
+    """All metrics in Prometheus text exposition format"""
+    from app.database import pool_status
+
+    with _lock:
+        requests = dict(_requests)
+        latency = {key: (list(h.counts), h.sum, h.count) for key, h in _latency.items()}
+        statements = {key: (list(h.counts), h.sum, h.count) for key, h in _statements.items()}
+        totals = {key: list(values) for key, values in _totals.items()}
+
+    lines: List[str] = []
+    _counter(lines, "hgraph2_http_requests_total", "Requests by route and status",
+             {_labels(method=m, route=r, status=s): v for (m, r, s), v in requests.items()})
+    _histogram(lines, "hgraph2_http_request_duration_seconds", "Request latency until the last body byte",
+               LATENCY_BUCKETS, latency)
+    _histogram(lines, "hgraph2_db_statements_per_request", "SQL statements issued per request",
+               STATEMENT_BUCKETS, statements)
+    _counter(lines, "hgraph2_db_statement_seconds_total", "Time spent executing SQL",
+             {_labels(method=m, route=r): v[0] for (m, r), v in totals.items()})
+    _counter(lines, "hgraph2_db_rows_total", "Rows returned or affected, where the driver reports them",
+             {_labels(method=m, route=r): v[1] for (m, r), v in totals.items()})
+    _counter(lines, "hgraph2_serialization_seconds_total", "Time spent validating and encoding responses",
+             {_labels(method=m, route=r): v[2] for (m, r), v in totals.items()})
+
+    pools = pool_status()
+    for name, field, help_text, kind in (
+        ("hgraph2_db_pool_checked_out", "checked_out", "Connections in use", "gauge"),
+        ("hgraph2_db_pool_size", "size", "Configured pool size", "gauge"),
+        ("hgraph2_db_pool_overflow", "overflow", "Connections opened beyond the pool size", "gauge"),
+        ("hgraph2_db_pool_checkouts_total", "checkouts", "Connection checkouts", "counter"),
+        ("hgraph2_db_pool_connects_total", "connects", "New database connections", "counter")
+    ):
+        values = {_labels(engine=role): stats[field] for role, stats in pools.items() if field in stats}
+        if values:
+            _metric(lines, name, help_text, kind, values)
+    return "\n".join(lines) + "\n"
+
+def _labels(**labels) -> str:
+    escaped = (
+        f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for key, value in labels.items()
+    )
+    return "{" + ",".join(escaped) + "}"
+
+def _metric(lines: List[str], name: str, help_text: str, kind: str, values: Dict[str, float]):
+    lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"])
+    lines.extend(f"{name}{labels} {_number(value)}" for labels, value in sorted(values.items()))
+
+def _counter(lines: List[str], name: str, help_text: str, values: Dict[str, float]):
+    _metric(lines, name, help_text, "counter", values)
+
+def _histogram(lines: List[str], name: str, help_text: str, buckets: Tuple[float, ...], series: Dict):
+    lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} histogram"])
+    for (method, route), (counts, total, count) in sorted(series.items()):
+        for bound, bucket_count in zip(buckets, counts):
+            lines.append(f"{name}_bucket{_labels(method=method, route=route, le=_number(bound))} {bucket_count}")
+        lines.append(f"{name}_bucket{_labels(method=method, route=route, le='+Inf')} {count}")
+        lines.append(f"{name}_sum{_labels(method=method, route=route)} {_number(total)}")
+        lines.append(f"{name}_count{_labels(method=method, route=route)} {count}")
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+# SQL instrumentation: registered on the Engine class so the primary and replica are both covered
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    starts = conn.info.get("metrics_query_start")
+    if stats is None or not starts:
+        return
+    stats.statements += 1
+    stats.sql_seconds += time.perf_counter() - starts.pop()
+    # psycopg2 reports rows for SELECTs too; SQLite only for writes (-1 otherwise)
+    if cursor.rowcount and cursor.rowcount > 0:
+        stats.rows += cursor.rowcount
+
+def _install_serialization_timer():
+    """Wrap FastAPI's response serialisation (validation plus jsonable_encoder) with a timer"""
+    import fastapi.routing
+
+    serialize_response = fastapi.routing.serialize_response
+    if getattr(serialize_response, "timed", False):
+        return
+
+    async def timed_serialize_response(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await serialize_response(*args, **kwargs)
+        finally:
+            stats = _current.get()
+            if stats is not None:
+                stats.serialize_seconds += time.perf_counter() - started
+
+    timed_serialize_response.timed = True
+    fastapi.routing.serialize_response = timed_serialize_response
+
+def _install_thread_profiling():
+    """Profile sync handlers, dependencies and streamed bodies run on the thread pool during ?profile=1"""
+    import anyio.to_thread
+
+    run_sync = anyio.to_thread.run_sync
+    if getattr(run_sync, "profiled", False):
+        return
+
+    async def profiled_run_sync(func, *args, **kwargs):
+        stats = _current.get()
+        if stats is None or stats.profiles is None:
+            return await run_sync(func, *args, **kwargs)
+
+        def run():
+            profile = cProfile.Profile()
+            stats.profiles.append(profile)
+            return profile.runcall(func, *args)
+        return await run_sync(run, **kwargs)
+
+    profiled_run_sync.profiled = True
+    anyio.to_thread.run_sync = profiled_run_sync
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streamed responses are timed to their last chunk"""
+
+    def __init__(self, app):
+        self.app = app
+        self._routes: Dict[Any, str] = {}
+        self._profile_lock = asyncio.Lock()
+        _install_serialization_timer()
+        if PROFILING_ENABLED:
+            _install_thread_profiling()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        if PROFILING_ENABLED and QueryParams(scope.get("query_string", b"")).get("profile") == "1":
+            async with self._profile_lock:
+                return await self._profile(scope, receive, send)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = time.perf_counter() - started
+                timing = (
+                    f'db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.statements} queries", '
+                    f"serialize;dur={stats.serialize_seconds * 1000:.1f}, app;dur={elapsed * 1000:.1f}"
+                )
+                message.setdefault("headers", []).append((b"server-timing", timing.encode()))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            record_request(scope["method"], self._route(scope), status, time.perf_counter() - started, stats)
+
+    def _route(self, scope) -> str:
+        """The matched route's path template (Starlette leaves the endpoint in the scope)"""
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        if endpoint not in self._routes:
+            app = scope.get("app")
+            for route in getattr(getattr(app, "router", None), "routes", []):
+                if getattr(route, "endpoint", None) is endpoint:
+                    self._routes[endpoint] = route.path
+                    break
+            else:
+                self._routes[endpoint] = getattr(endpoint, "__name__", UNMATCHED_ROUTE)
+        return self._routes[endpoint]
+
+    async def _profile(self, scope, receive, send):
+        """Run the request under cProfile and answer with the profile instead of the body"""
+        stats = RequestStats()
+        stats.profiles = []
+        token = _current.set(stats)
+        status = 500
+        body_bytes = 0
+
+        async def discard(message):
+            nonlocal status, body_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                body_bytes += len(message.get("body", b""))
+
+        loop_profile = cProfile.Profile()
+        started = time.perf_counter()
+        loop_profile.enable()
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            loop_profile.disable()
+            _current.reset(token)
+        elapsed = time.perf_counter() - started
+
+        output = io.StringIO()
+        profile_stats = pstats.Stats(loop_profile, stream=output)
+        for profile in stats.profiles:
+            profile_stats.add(profile)
+        output.write(
+            f"{scope['method']} {self._route(scope)} -> {status}, {body_bytes} bytes in {elapsed * 1000:.1f} ms\n"
+            f"SQL: {stats.statements} statements, {stats.sql_seconds * 1000:.1f} ms, {stats.rows} rows; "
+            f"serialisation {stats.serialize_seconds * 1000:.1f} ms; "
+            f"{len(stats.profiles)} thread pool calls profiled\n\n"
+        )
+        profile_stats.sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+
+        body = output.getvalue().encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/plain; charset=utf-8"), (b"content-length", str(len(body)).encode()),
+                        (b"cache-control", b"no-store")]
+        })
+        await send({"type": "http.response.body", "body": body})
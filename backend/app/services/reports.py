@@ -0,0 +1,309 @@
+"""Server-side PDF reports.
+
+A report request first gathers its inputs (shipments joined to their
+analysis summaries) with one query; the SHA-256 of those inputs plus the
+template version is the report ID. A PDF already rendered for the same
+inputs is served straight from REPORT_DIR. Otherwise rendering is queued
+on a process pool, since reportlab layout is CPU-bound Python.
+
+Render state lives next to the PDFs, so any API worker can answer a status
+poll: <id>.rendering is created exclusively before a render is queued (so
+identical concurrent requests, on any worker, share one render), and a
+failed render leaves its message in <id>.error.
+"""
+from concurrent.futures import Future, ProcessPoolExecutor
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.models import BatchAnalysisSummary, GrapheneBatch
+from app.utils.storage import upload_dir
+from datetime import date
+from typing import Any, Dict, List, Optional
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+
+REPORT_DIR = upload_dir("REPORT_DIR", "reports")
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+
+# Bump when the layout changes so cached PDFs are not reused
+REPORT_TEMPLATE_VERSION = 1
+
+# A .rendering marker older than this was left by a worker that died mid-render
+REPORT_RENDER_TIMEOUT = int(os.getenv("REPORT_RENDER_TIMEOUT", "300"))
+
+# Interval between status checks while waiting on a render queued by another worker
+STATUS_POLL_SECONDS = 0.25
+
+TECHNICAL_NOTES = [
+    "BET surface area analysis performed according to ASTM D3663/D6556 standards",
+    "All batches processed using our proprietary Oven C technology",
+    "Material optimized for energy storage applications",
+    "Quality assurance testing completed on all shipped batches"
+]
+
+_executor: Optional[ProcessPoolExecutor] = None
+_renders: Dict[str, Future] = {}
+_lock = threading.Lock()
+
+def report_customers(db: Session) -> List[Dict[str, Any]]:
+    """Customers with at least one shipment, with their shipment count and latest date"""
+    rows = db.execute(
+        select(GrapheneBatch.shipped_to, func.count(), func.max(GrapheneBatch.shipped_date))
+        .where(GrapheneBatch.shipped_to.isnot(None))
+        .group_by(GrapheneBatch.shipped_to)
+        .order_by(GrapheneBatch.shipped_to)
+    )
+    return [
+        {"customer": customer, "shipments": shipments, "last_shipped": last.isoformat() if last else None}
+        for customer, shipments, last in rows
+    ]
+
+def customer_report_inputs(db: Session, customer: str, date_from: Optional[date] = None,
+                           date_to: Optional[date] = None, oven_c_only: bool = False) -> Dict[str, Any]:
+    """Everything the customer summary shows, as plain JSON-serialisable data"""
+    statement = select(
+        GrapheneBatch.name,
+        GrapheneBatch.shipped_date,
+        GrapheneBatch.shipped_weight,
+        GrapheneBatch.oven,
+        BatchAnalysisSummary.max_bet,
+        BatchAnalysisSummary.mean_bet,
+        BatchAnalysisSummary.max_conductivity,
+        BatchAnalysisSummary.energy_grade,
+        BatchAnalysisSummary.analysis_count
+    ).outerjoin(BatchAnalysisSummary).where(GrapheneBatch.shipped_to == customer)
+    if date_from:
+        statement = statement.where(GrapheneBatch.shipped_date >= date_from)
+    if date_to:
+        statement = statement.where(GrapheneBatch.shipped_date <= date_to)
+    if oven_c_only:
+        statement = statement.where(GrapheneBatch.is_oven_c_era.is_(True))
+
+    batches = [
+        {
+            "name": row.name,
+            "shipped_date": row.shipped_date.isoformat() if row.shipped_date else None,
+            "weight": row.shipped_weight,
+            "oven": row.oven,
+            "bet": row.max_bet,
+            "mean_bet": row.mean_bet,
+            "conductivity": row.max_conductivity,
+            "grade": row.energy_grade,
+            "analysis_count": row.analysis_count or 0
+        }
+        for row in db.execute(statement.order_by(GrapheneBatch.shipped_date, GrapheneBatch.name))
+    ]
+    bets = [batch["bet"] for batch in batches if batch["bet"] is not None]
+    dates = [batch["shipped_date"] for batch in batches if batch["shipped_date"]]
+    return {
+        "customer": customer,
+        "date_from": date_from.isoformat() if date_from else None,
+        "date_to": date_to.isoformat() if date_to else None,
+        "oven_c_only": oven_c_only,
+        "data_as_of": max(dates) if dates else None,
+        "summary": {
+            "total_batches": len(batches),
+            "average_bet": round(sum(bets) / len(bets), 1) if bets else None,
+            "peak_bet": max(bets) if bets else None,
+            "total_weight": round(sum(batch["weight"] or 0 for batch in batches), 2)
+        },
+        "batches": batches
+    }
+
+def report_id(kind: str, inputs: Dict[str, Any]) -> str:
+    """Content hash of a report's inputs and template version"""
+    payload = json.dumps([kind, REPORT_TEMPLATE_VERSION, inputs], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def report_path(report_id: str) -> str:
+    return os.path.join(REPORT_DIR, f"{report_id}.pdf")
+
+def request_report(kind: str, inputs: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the cached or in-progress report for these inputs, or queue it for rendering"""
+    rid = report_id(kind, inputs)
+    status = report_status(rid)
+    # Unknown, or failed (including a dead worker's stale marker): render again
+    if status["status"] not in ("ready", "rendering") and _claim_render(rid):
+        try:
+            future = _get_executor().submit(render_report, kind, inputs, report_path(rid))
+        except Exception:
+            _remove(_marker_path(rid, "rendering"))
+            raise
+        with _lock:
+            _renders[rid] = future
+        future.add_done_callback(lambda _: _forget_render(rid, future))
+    return report_status(rid)
+
+def report_status(report_id: str, wait: float = 0) -> Dict[str, Any]:
+    """ready, rendering, failed or unknown; optionally wait up to wait seconds for a render"""
+    deadline = time.monotonic() + wait
+    while True:
+        status = _stored_status(report_id)
+        remaining = deadline - time.monotonic()
+        if status["status"] != "rendering" or remaining <= 0:
+            return status
+        with _lock:
+            future = _renders.get(report_id)
+        if future is not None:
+            try:
+                future.result(timeout=remaining)
+            except Exception:
+                pass
+        else:
+            # Queued by another worker; only the files tell us when it is done
+            time.sleep(min(STATUS_POLL_SECONDS, remaining))
+
+def render_report(kind: str, inputs: Dict[str, Any], path: str) -> str:
+    """Render a report to path (runs in a worker process); written atomically.
+
+    Clears the .rendering marker when done and records a failure in .error.
+    """
+    renderers = {"customer_summary": _render_customer_summary}
+    base = os.path.splitext(path)[0]
+    partial = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        renderers[kind](inputs, partial)
+        os.replace(partial, path)
+    except Exception as e:
+        with open(f"{base}.error", "w") as error_file:
+            error_file.write(str(e) or type(e).__name__)
+        raise
+    finally:
+        _remove(partial)
+        _remove(f"{base}.rendering")
+    return path
+
+def _stored_status(report_id: str) -> Dict[str, Any]:
+    status = {"report_id": report_id, "status": "unknown", "error": None}
+    marker = _marker_path(report_id, "rendering")
+    if os.path.exists(report_path(report_id)):
+        status["status"] = "ready"
+    elif os.path.exists(marker) and not _is_stale(marker):
+        status["status"] = "rendering"
+    elif os.path.exists(marker):
+        status.update({"status": "failed", "error": "Rendering did not finish"})
+    elif os.path.exists(_marker_path(report_id, "error")):
+        try:
+            with open(_marker_path(report_id, "error")) as error_file:
+                status.update({"status": "failed", "error": error_file.read()})
+        except FileNotFoundError:
+            # Cleared by a retry that has just started
+            return _stored_status(report_id)
+    return status
+
+def _claim_render(report_id: str) -> bool:
+    """Create the .rendering marker; False if another request (on any worker) holds it"""
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    marker = _marker_path(report_id, "rendering")
+    if os.path.exists(marker) and _is_stale(marker):
+        _remove(marker)
+    try:
+        os.close(os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        return False
+    _remove(_marker_path(report_id, "error"))
+    return True
+
+def _forget_render(report_id: str, future: Future):
+    with _lock:
+        if _renders.get(report_id) is future:
+            del _renders[report_id]
+
+def _is_stale(path: str) -> bool:
+    try:
+        return time.time() - os.path.getmtime(path) > REPORT_RENDER_TIMEOUT
+    except FileNotFoundError:
+        return False
+
+def _marker_path(report_id: str, suffix: str) -> str:
+    return os.path.join(REPORT_DIR, f"{report_id}.{suffix}")
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=REPORT_WORKERS)
+    return _executor
+
+def _render_customer_summary(inputs: Dict[str, Any], path: str):
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import mm
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    styles = getSampleStyleSheet()
+    summary = inputs["summary"]
+
+    def number(value, digits=0, unit=""):
+        return f"{value:,.{digits}f}{unit}" if value is not None else "N/A"
+
+    def footer(canvas, doc):
+        canvas.saveState()
+        canvas.setFont("Helvetica", 7)
+        canvas.setFillColor(colors.HexColor("#6b7280"))
+        canvas.drawString(20 * mm, 12 * mm, "This report is confidential and proprietary. "
+                                            "For questions, please contact our technical team.")
+        canvas.drawRightString(A4[0] - 20 * mm, 12 * mm, f"Page {doc.page}")
+        canvas.restoreState()
+
+    period = " – ".join(part for part in (inputs["date_from"], inputs["date_to"]) if part) or "All shipments"
+    if inputs.get("oven_c_only"):
+        period += " (Oven C era batches)"
+    story = [
+        Paragraph("HGraph2 Material Report", styles["Title"]),
+        Paragraph("Hemp-Derived Graphene Analysis", styles["Heading3"]),
+        Paragraph(f"Customer: <b>{_escape(inputs['customer'])}</b>", styles["Normal"]),
+        Paragraph(f"Period: {period} · Data as of {inputs['data_as_of'] or 'N/A'}", styles["Normal"]),
+        Spacer(1, 8 * mm),
+        Paragraph("Executive Summary", styles["Heading2"]),
+        Table([
+            ["Total batches", "Average BET", "Peak BET", "Total weight"],
+            [str(summary["total_batches"]), number(summary["average_bet"], 0, " m²/g"),
+             number(summary["peak_bet"], 0, " m²/g"), number(summary["total_weight"], 1, " g")]
+        ], style=TableStyle([
+            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#d1d5db")),
+            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#f3f4f6"))
+        ])),
+        Spacer(1, 8 * mm),
+        Paragraph("Batch Analysis", styles["Heading2"])
+    ]
+
+    rows = [["Batch", "Shipped", "Weight (g)", "BET (m²/g)", "Mean BET", "Conductivity (S/m)", "Grade"]]
+    rows.extend(
+        [
+            batch["name"], batch["shipped_date"] or "N/A", number(batch["weight"], 1), number(batch["bet"]),
+            number(batch["mean_bet"]), number(batch["conductivity"], 3), batch["grade"] or "N/A"
+        ]
+        for batch in inputs["batches"]
+    )
+    # repeatRows keeps the header on every page of long shipment lists
+    story.append(Table(rows, repeatRows=1, style=TableStyle([
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTSIZE", (0, 0), (-1, -1), 8),
+        ("LINEBELOW", (0, 0), (-1, 0), 0.75, colors.HexColor("#374151")),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#f9fafb")]),
+        ("ALIGN", (2, 1), (5, -1), "RIGHT")
+    ])))
+
+    story.extend([Spacer(1, 8 * mm), Paragraph("Technical Notes", styles["Heading2"])])
+    story.extend(Paragraph(f"• {note}", styles["Normal"]) for note in TECHNICAL_NOTES)
+
+    # invariant makes the bytes depend only on the inputs (no timestamps or random IDs)
+    document = SimpleDocTemplate(
+        path, pagesize=A4, title=f"HGraph2 Customer Report - {inputs['customer']}",
+        leftMargin=20 * mm, rightMargin=20 * mm, topMargin=20 * mm, bottomMargin=20 * mm, invariant=1
+    )
+    document.build(story, onFirstPage=footer, onLaterPages=footer)
+
+def _escape(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
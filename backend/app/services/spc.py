@@ -0,0 +1,238 @@
+"""Statistical process control for analysis measurements.
+
+Each (oven, species, metric) stream keeps a Welford running mean/variance,
+an EWMA and a two-sided tabular CUSUM in spc_states. A new measurement is
+scored against the stream's statistics *before* it is folded in, checked
+against the Western Electric rules, EWMA and CUSUM limits, and any violation
+is stored as an spc_alerts row. Points beyond 3σ (WE1) are left out of
+the baseline mean/variance, so a single outlier cannot widen the limits and
+hide the points after it; run-rule, EWMA and CUSUM signals are still folded
+in, so the baseline follows a real process shift. After a known change
+(new oven, new recipe) rebaseline_stream starts the stream over. Every step
+is O(1) per measurement; history is only replayed by a rebuild:
+
+    python -m app.services.spc
+"""
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.orm import Session
+from app.models import AnalysisResult, GrapheneBatch, SpcAlert, SpcState
+from app.utils.sql import dialect_insert
+from typing import Dict, Iterable, List, Optional, Tuple
+import math
+
+# AnalysisResult columns monitored
+SPC_METRICS = ("bet_surface_area", "conductivity")
+
+# Measurements a stream needs before its limits are trusted
+MIN_BASELINE = 5
+
+EWMA_LAMBDA = 0.2
+EWMA_LIMIT = 3.0          # control limit width, in EWMA standard deviations
+CUSUM_K = 0.5             # allowance, in standard deviations
+CUSUM_H = 5.0             # decision interval, in standard deviations
+
+# Longest Western Electric run rule (8 points on one side)
+RECENT_POINTS = 8
+
+UNKNOWN_OVEN = "unknown"
+UNKNOWN_SPECIES = 0
+
+StreamKey = Tuple[str, int, str]
+
+def record_measurements(db: Session, results: Iterable[AnalysisResult]) -> List[SpcAlert]:
+    """Fold new analysis results into their SPC streams and add alerts for any rule violations.
+
+    Results are applied in date_analyzed order. Runs in the caller's
+    transaction; the caller commits.
+    """
+    results = sorted(results, key=lambda result: (result.date_analyzed, str(result.id)))
+    if not results:
+        return []
+
+    batch_ids = {result.graphene_batch_id for result in results}
+    batches = {
+        row.id: (row.oven or UNKNOWN_OVEN, row.species or UNKNOWN_SPECIES)
+        for row in db.execute(
+            select(GrapheneBatch.id, GrapheneBatch.oven, GrapheneBatch.species).where(GrapheneBatch.id.in_(batch_ids))
+        )
+    }
+    measurements = [
+        ((*batches[result.graphene_batch_id], metric), result, getattr(result, metric))
+        for result in results
+        for metric in SPC_METRICS
+        if getattr(result, metric) is not None and result.graphene_batch_id in batches
+    ]
+    states = _lock_states(db, {key for key, _, _ in measurements})
+
+    alerts = []
+    for key, result, value in measurements:
+        alerts.extend(_score(states[key], result, value))
+    db.add_all(alerts)
+    return alerts
+
+def stream_limits(state: SpcState) -> Dict[str, Optional[float]]:
+    """Centre line, sigma and 3-sigma control limits of a stream (None during the baseline)"""
+    sigma = _sigma(state)
+    if state.count < MIN_BASELINE or sigma is None:
+        return {"center": state.mean if state.count else None, "sigma": sigma, "ucl": None, "lcl": None}
+    return {"center": state.mean, "sigma": sigma, "ucl": state.mean + 3 * sigma, "lcl": state.mean - 3 * sigma}
+
+def rebaseline_stream(state: SpcState):
+    """Discard a stream's statistics so the next MIN_BASELINE measurements form a new baseline"""
+    state.count = 0
+    state.mean = 0.0
+    state.m2 = 0.0
+    state.ewma = None
+    state.ewma_steps = 0
+    state.cusum_high = 0.0
+    state.cusum_low = 0.0
+    state.recent_z = []
+
+def rebuild_spc_states(db: Session) -> int:
+    """Replay all analysis history into fresh stream statistics, keeping existing alerts.
+
+    Results analysed on the same day are replayed in ID order, which may
+    differ from the order they arrived in. Returns the number of streams.
+    """
+    db.execute(delete(SpcState))
+    states: Dict[StreamKey, SpcState] = {}
+    history = db.execute(
+        select(AnalysisResult, GrapheneBatch.oven, GrapheneBatch.species).join(GrapheneBatch).order_by(
+            AnalysisResult.date_analyzed, AnalysisResult.id
+        ).execution_options(yield_per=1000)
+    )
+    for result, oven, species in history:
+        for metric in SPC_METRICS:
+            value = getattr(result, metric)
+            if value is None:
+                continue
+            key = (oven or UNKNOWN_OVEN, species or UNKNOWN_SPECIES, metric)
+            if key not in states:
+                states[key] = _new_state(key)
+            _score(states[key], result, value)
+    db.add_all(states.values())
+    db.commit()
+    return len(states)
+
+def _lock_states(db: Session, keys: set) -> Dict[StreamKey, SpcState]:
+    """Load the streams' states FOR UPDATE, creating missing ones"""
+    if not keys:
+        return {}
+    try:
+        # Create missing streams race-free, then lock them all
+        db.execute(
+            dialect_insert(db)(SpcState).values([
+                {"oven": oven, "species": species, "metric": metric, "count": 0, "mean": 0, "m2": 0,
+                 "ewma_steps": 0, "cusum_high": 0, "cusum_low": 0}
+                for oven, species, metric in keys
+            ]).on_conflict_do_nothing(index_elements=["oven", "species", "metric"])
+        )
+    except ValueError:
+        pass
+
+    key_column = tuple_(SpcState.oven, SpcState.species, SpcState.metric)
+    states = {
+        (state.oven, state.species, state.metric): state
+        for state in db.scalars(select(SpcState).where(key_column.in_(list(keys))).with_for_update())
+    }
+    for key in keys - states.keys():
+        states[key] = _new_state(key)
+        db.add(states[key])
+    return states
+
+def _new_state(key: StreamKey) -> SpcState:
+    oven, species, metric = key
+    return SpcState(
+        oven=oven, species=species, metric=metric, count=0, mean=0.0, m2=0.0,
+        ewma_steps=0, cusum_high=0.0, cusum_low=0.0, recent_z=[]
+    )
+
+def _score(state: SpcState, result: AnalysisResult, value: float) -> List[SpcAlert]:
+    """Check one measurement against the stream, then fold it into the baseline unless it is a 3σ outlier"""
+    alerts = []
+    center = state.mean
+    sigma = _sigma(state)
+
+    if state.count >= MIN_BASELINE and sigma:
+        z = (value - center) / sigma
+        recent = (list(state.recent_z or []) + [round(z, 4)])[-RECENT_POINTS:]
+        state.recent_z = recent
+
+        def alert(rule: str, message: str):
+            alerts.append(SpcAlert(
+                analysis_result_id=result.id,
+                graphene_batch_id=result.graphene_batch_id,
+                oven=state.oven,
+                species=state.species,
+                metric=state.metric,
+                rule=rule,
+                message=message,
+                value=value,
+                center=center,
+                sigma=sigma,
+                date_analyzed=result.date_analyzed
+            ))
+
+        for rule, message in _western_electric(recent):
+            alert(rule, message)
+
+        # EWMA with exact (time-varying) limits
+        state.ewma_steps += 1
+        state.ewma = EWMA_LAMBDA * value + (1 - EWMA_LAMBDA) * (state.ewma if state.ewma is not None else center)
+        ewma_sigma = sigma * math.sqrt(
+            EWMA_LAMBDA / (2 - EWMA_LAMBDA) * (1 - (1 - EWMA_LAMBDA) ** (2 * state.ewma_steps))
+        )
+        if abs(state.ewma - center) > EWMA_LIMIT * ewma_sigma:
+            alert("EWMA", f"EWMA {state.ewma:.4g} outside {center:.4g} ± {EWMA_LIMIT * ewma_sigma:.4g}")
+
+        # Tabular CUSUM, reset after each signal
+        state.cusum_high = max(0.0, state.cusum_high + z - CUSUM_K)
+        state.cusum_low = max(0.0, state.cusum_low - z - CUSUM_K)
+        if state.cusum_high > CUSUM_H:
+            alert("CUSUM_HIGH", f"Sustained upward shift (CUSUM {state.cusum_high:.2f}σ > {CUSUM_H}σ)")
+            state.cusum_high = 0.0
+        if state.cusum_low > CUSUM_H:
+            alert("CUSUM_LOW", f"Sustained downward shift (CUSUM {state.cusum_low:.2f}σ > {CUSUM_H}σ)")
+            state.cusum_low = 0.0
+
+    if any(alert.rule == "WE1" for alert in alerts):
+        return alerts
+
+    # Welford update
+    state.count += 1
+    delta = value - state.mean
+    state.mean += delta / state.count
+    state.m2 += delta * (value - state.mean)
+    return alerts
+
+def _western_electric(recent: List[float]) -> List[Tuple[str, str]]:
+    """Western Electric rules for the newest point, given the latest z-scores (newest last)"""
+    violations = []
+    z = recent[-1]
+    if abs(z) > 3:
+        violations.append(("WE1", f"Point {z:+.2f}σ from the centre line (beyond 3σ)"))
+
+    for rule, window, needed, limit in (("WE2", 3, 2, 2), ("WE3", 5, 4, 1)):
+        points = recent[-window:]
+        side = 1 if z > 0 else -1
+        # The newest point must itself be part of the run
+        if len(points) == window and side * z > limit and sum(side * p > limit for p in points) >= needed:
+            violations.append((rule, f"{needed} of {window} points beyond {limit}σ on the same side"))
+
+    points = recent[-RECENT_POINTS:]
+    if len(points) == RECENT_POINTS and (all(p > 0 for p in points) or all(p < 0 for p in points)):
+        violations.append(("WE4", f"{RECENT_POINTS} consecutive points on the same side of the centre line"))
+    return violations
+
+def _sigma(state: SpcState) -> Optional[float]:
+    return math.sqrt(state.m2 / (state.count - 1)) if state.count > 1 else None
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        count = rebuild_spc_states(db)
+        print(f"✅ Rebuilt SPC statistics for {count} streams")
+    finally:
+        db.close()
@@ -0,0 +1,40 @@
+"""Filters shared by the list and export endpoints.
+
+Each helper returns a list of WHERE conditions, so it works with both
+Query.filter(*conditions) and select().where(*conditions).
+"""
+from app.models import AnalysisResult, BiocharBatch, GrapheneBatch
+from datetime import date
+from typing import Optional
+
+def biochar_filters(oven: Optional[str] = None, operator: Optional[str] = None) -> list:
+    conditions = []
+    if oven:
+        conditions.append(BiocharBatch.oven == oven)
+    if operator:
+        conditions.append(BiocharBatch.operator == operator)
+    return conditions
+
+def graphene_filters(oven: Optional[str] = None, species: Optional[int] = None, shipped_only: bool = False,
+                     oven_c_era: Optional[bool] = None) -> list:
+    conditions = []
+    if oven:
+        conditions.append(GrapheneBatch.oven == oven)
+    if species:
+        conditions.append(GrapheneBatch.species == species)
+    if shipped_only:
+        conditions.append(GrapheneBatch.shipped_to.isnot(None))
+    if oven_c_era is not None:
+        conditions.append(GrapheneBatch.is_oven_c_era == oven_c_era)
+    return conditions
+
+def analysis_filters(graphene_batch_id: Optional[str] = None, date_from: Optional[date] = None,
+                     date_to: Optional[date] = None) -> list:
+    conditions = []
+    if graphene_batch_id:
+        conditions.append(AnalysisResult.graphene_batch_id == graphene_batch_id)
+    if date_from:
+        conditions.append(AnalysisResult.date_analyzed >= date_from)
+    if date_to:
+        conditions.append(AnalysisResult.date_analyzed <= date_to)
+    return conditions
@@ -0,0 +1,79 @@
+"""Conditional GET support for cached JSON responses and immutable files."""
+from fastapi import Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from typing import Any, Iterator, Optional, Tuple
+import os
+import re
+
+# Clients may store the response but must revalidate it with If-None-Match
+CACHE_CONTROL = "private, no-cache"
+
+# For content-addressed files, whose bytes never change for a given URL
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+FILE_CHUNK_BYTES = 256 * 1024
+
+_BYTE_RANGE = re.compile(r"bytes=(\d*)-(\d*)")
+
+def conditional_response(request: Request, response: Response, value: Any, etag: str) -> Any:
+    """Return value with ETag/Cache-Control headers, or an empty 304 if the client's copy is current"""
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag in _parse_etags(request.headers.get("if-none-match", "")):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return value
+
+def file_response(request: Request, path: str, media_type: str, etag: str,
+                  cache_control: str = IMMUTABLE_CACHE_CONTROL) -> Response:
+    """Serve a file with If-None-Match and single byte-range (206) support"""
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Accept-Ranges": "bytes"}
+    if etag in _parse_etags(request.headers.get("if-none-match", "")):
+        return Response(status_code=304, headers=headers)
+
+    size = os.path.getsize(path)
+    range_header = request.headers.get("range")
+    # A range is only honoured against the representation the client already has
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == etag):
+        byte_range = _parse_range(range_header, size)
+        if byte_range is None:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if byte_range != (0, size - 1):
+            start, end = byte_range
+            headers.update({"Content-Range": f"bytes {start}-{end}/{size}", "Content-Length": str(end - start + 1)})
+            return StreamingResponse(
+                _read_range(path, start, end), status_code=206, media_type=media_type, headers=headers
+            )
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """(start, end) of a single byte range; the whole file for forms we don't serve, None if unsatisfiable"""
+    match = _BYTE_RANGE.fullmatch(header.strip())
+    if not match or not any(match.groups()):
+        # Multi-range and other units are answered with the full file, as RFC 9110 allows
+        return (0, size - 1)
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        return (max(size - length, 0), size - 1) if length and size else None
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        return None
+    return (start, end)
+
+def _read_range(path: str, start: int, end: int) -> Iterator[bytes]:
+    with open(path, "rb") as file:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = file.read(min(FILE_CHUNK_BYTES, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+def _parse_etags(header: str) -> set:
+    # Weak validators match too; conditional GETs use the weak comparison
+    return {tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()}
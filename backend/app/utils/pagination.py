@@ -0,0 +1,66 @@
+"""Keyset (cursor) pagination for list endpoints.
+
+Pages are ordered by a whitelisted sort column plus the primary key as a
+tie-breaker, and the next page starts strictly after the last row seen, so
+deep pages cost the same as the first one. NULL sort values always come last.
+The cursor is an opaque URL-safe token encoding the sort, order and the
+last row's (value, id).
+"""
+from sqlalchemy import and_, or_, tuple_
+from datetime import date
+from typing import Any, Callable, Dict, Optional, Tuple
+import base64
+import json
+import uuid
+
+# Response header carrying the cursor of the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# sort key -> (column expression, parser turning a cursor value back into a column value)
+SortKeys = Dict[str, Tuple[Any, Callable[[Any], Any]]]
+
+def parse_date(value: str) -> date:
+    return date.fromisoformat(value)
+
+def encode_cursor(sort: str, order: str, value: Any, row_id: uuid.UUID) -> str:
+    if isinstance(value, date):
+        value = value.isoformat()
+    payload = json.dumps([sort, order, value, str(row_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: str, order: str, sort_keys: SortKeys) -> Tuple[Any, uuid.UUID]:
+    """Return the (value, id) a cursor points after; ValueError if it is malformed or for another ordering"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, cursor_order, value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        parser = sort_keys[cursor_sort][1]
+        value = parser(value) if value is not None else None
+        row_id = uuid.UUID(row_id)
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError("Invalid cursor") from e
+    if (cursor_sort, cursor_order) != (sort, order):
+        raise ValueError("Cursor was issued for a different sort order")
+    return value, row_id
+
+def apply_keyset(query, sort_column, id_column, descending: bool, after: Optional[Tuple[Any, uuid.UUID]] = None):
+    """Order query by (sort_column, id_column) with NULLs last and start after the given position"""
+    if after is not None:
+        value, row_id = after
+        if value is None:
+            # Already inside the trailing NULL block
+            beyond = id_column < row_id if descending else id_column > row_id
+            query = query.filter(and_(sort_column.is_(None), beyond))
+        else:
+            key = tuple_(sort_column, id_column)
+            beyond = key < tuple_(value, row_id) if descending else key > tuple_(value, row_id)
+            # A plain row comparison on NOT NULL columns keeps the index range scan
+            if _is_nullable(sort_column):
+                beyond = or_(beyond, sort_column.is_(None))
+            query = query.filter(beyond)
+
+    if descending:
+        return query.order_by(sort_column.desc().nullslast(), id_column.desc())
+    return query.order_by(sort_column.asc().nullslast(), id_column.asc())
+
+def _is_nullable(column) -> bool:
+    return getattr(getattr(column, "expression", column), "nullable", True)
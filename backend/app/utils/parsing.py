@@ -0,0 +1,125 @@
+"""Column-wise parsing of Curia report cells such as "800°C", "22.7g" or "1.5h-2h".
+
+Whole pandas columns are parsed with vectorised string/regex operations
+instead of cell by cell, so the importers stay fast on large sheets.
+Besides plain numbers and ranges, cells may use thousands separators
+("1,234 g"), exponents ("1e3", "2.5E-2 S/cm") and an approximate marker
+("~800 °C", "ca. 800°C"), which are parsed and flagged as approximate.
+Bounds such as "<10" or "≥500" are not measurements; they are flagged as
+bounds and left invalid so the importer reports them.
+"""
+from __future__ import annotations
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# unit -> (dimension, scale, offset) where base value = value * scale + offset
+# Base units: g, h, °C, S/m, m²/g
+UNITS = {
+    'mg': ('mass', 0.001, 0.0),
+    'g': ('mass', 1.0, 0.0),
+    'kg': ('mass', 1000.0, 0.0),
+    's': ('time', 1 / 3600, 0.0),
+    'sec': ('time', 1 / 3600, 0.0),
+    'min': ('time', 1 / 60, 0.0),
+    'mins': ('time', 1 / 60, 0.0),
+    'h': ('time', 1.0, 0.0),
+    'hr': ('time', 1.0, 0.0),
+    'hrs': ('time', 1.0, 0.0),
+    'hour': ('time', 1.0, 0.0),
+    'hours': ('time', 1.0, 0.0),
+    'd': ('time', 24.0, 0.0),
+    '°c': ('temperature', 1.0, 0.0),
+    'c': ('temperature', 1.0, 0.0),
+    '℃': ('temperature', 1.0, 0.0),
+    'k': ('temperature', 1.0, -273.15),
+    's/m': ('conductivity', 1.0, 0.0),
+    's/cm': ('conductivity', 100.0, 0.0),
+    'ms/cm': ('conductivity', 0.1, 0.0),
+    'm²/g': ('specific_area', 1.0, 0.0),
+    'm^2/g': ('specific_area', 1.0, 0.0),
+    'm2/g': ('specific_area', 1.0, 0.0),
+}
+
+_NUMBER = r'(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?'
+
+# Leading number, optional unit, optional "-"/"to" range end with its own unit
+_QUANTITY_PATTERN = (
+    rf'^\s*(?P<low>[-+]?{_NUMBER})\s*(?P<low_unit>[^\d\s\-–+.][^\d\-–]*?)?\s*'
+    rf'(?:(?:-|–|to)\s*(?P<high>{_NUMBER})\s*(?P<high_unit>[^\d\s.][^\d]*?)?)?\s*$'
+)
+
+# "~800", "≈800", "ca. 800", "approx. 800", "about 800"
+_APPROXIMATE_PATTERN = r'^\s*(?:~|≈|ca\.|ca\s|approx\.|approx\s|approximately\s|about\s)\s*'
+
+# "<10", "> 500", "≤0.1", ">=2"
+_BOUND_PATTERN = r'^\s*(?:<|>|≤|≥)'
+
+# Comma between digits followed by exactly three digits: "1,234" but not the decimal comma in "1,5"
+_THOUSANDS_SEPARATOR = r'(?<=\d),(?=\d{3}(?!\d))'
+
+def parse_quantity(values: pd.Series, target_unit: str, default_unit: Optional[str] = None) -> pd.DataFrame:
+    """Parse a column of quantities and convert them to target_unit.
+
+    Returns a frame aligned with values holding:
+      - value: float in target_unit (NaN when invalid)
+      - unit: the unit found in the cell (or default_unit)
+      - valid: True where a number with a compatible unit was found
+      - approximate: True where the cell was marked approximate ("~800")
+      - bound: True where the cell is an inequality ("<10"); never valid
+
+    Ranges such as "1.5h-2h" resolve to their midpoint. Parenthesised notes,
+    e.g. the heating rate in "800°C (5°C/min)", are ignored. Cells without a
+    unit are read in default_unit, falling back to target_unit.
+    """
+    import pandas as pd
+
+    target = _unit_key(target_unit)
+    if target not in UNITS:
+        raise ValueError(f"Unknown target unit: {target_unit}")
+    default = _unit_key(default_unit) if default_unit else target
+
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        numbers = values.astype(float)
+        units = pd.Series(default, index=values.index, dtype="string").where(numbers.notna())
+        converted = _convert(numbers, units, target)
+        return pd.DataFrame({
+            'value': converted, 'unit': units, 'valid': converted.notna(), 'approximate': False, 'bound': False
+        }, index=values.index)
+
+    text = values.astype("string").str.replace(r'\(.*?\)', '', regex=True)
+    bound = text.str.contains(_BOUND_PATTERN, regex=True).fillna(False).astype(bool)
+    approximate = text.str.contains(_APPROXIMATE_PATTERN, regex=True, case=False).fillna(False).astype(bool)
+    text = text.str.replace(_APPROXIMATE_PATTERN, '', regex=True, case=False)
+    text = text.str.replace(_THOUSANDS_SEPARATOR, '', regex=True)
+    parts = text.str.extract(_QUANTITY_PATTERN).where(~bound)
+
+    low_unit = parts['low_unit'].str.strip().str.lower().str.replace(' ', '', regex=False)
+    high_unit = parts['high_unit'].str.strip().str.lower().str.replace(' ', '', regex=False)
+    low_unit = low_unit.fillna(high_unit).fillna(default).where(parts['low'].notna())
+    high_unit = high_unit.fillna(low_unit)
+
+    low = _convert(pd.to_numeric(parts['low'], errors='coerce'), low_unit, target)
+    high = _convert(pd.to_numeric(parts['high'], errors='coerce'), high_unit, target)
+    has_high = parts['high'].notna()
+    converted = low.where(~has_high, (low + high) / 2)
+
+    return pd.DataFrame({
+        'value': converted,
+        'unit': low_unit,
+        'valid': converted.notna(),
+        'approximate': approximate & converted.notna(),
+        'bound': bound
+    }, index=values.index)
+
+def _convert(numbers: pd.Series, units: pd.Series, target: str) -> pd.Series:
+    """Convert numbers given per-row units into target; incompatible units become NaN"""
+    dimension, target_scale, target_offset = UNITS[target]
+    scale = units.map({u: spec[1] for u, spec in UNITS.items() if spec[0] == dimension}).astype(float)
+    offset = units.map({u: spec[2] for u, spec in UNITS.items() if spec[0] == dimension}).astype(float)
+    base = numbers.astype(float) * scale + offset
+    return (base - target_offset) / target_scale
+
+def _unit_key(unit: str) -> str:
+    return unit.strip().lower().replace(' ', '')
@@ -0,0 +1,83 @@
+"""Chunked readers for CSV, gzip-compressed CSV and Excel uploads.
+
+Files are yielded as DataFrames of at most chunk_rows rows so memory stays
+bounded regardless of file size. Row labels are the data row's position
+in the file (blank rows are dropped but still counted) and continue across
+chunks, so error messages still point at the row in the original file. pandas is
+imported on first use so API workers that never import files skip it.
+"""
+from __future__ import annotations
+from typing import TYPE_CHECKING, BinaryIO, Iterator, Union
+import hashlib
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+SUPPORTED_EXTENSIONS = ('.csv', '.csv.gz', '.xlsx')
+
+# Rows per DataFrame handed to the importers
+DEFAULT_READ_CHUNK_ROWS = 50000
+
+def is_supported_file(filename: str) -> bool:
+    return filename.lower().endswith(SUPPORTED_EXTENSIONS)
+
+def sha256_file(fileobj: BinaryIO, chunk_bytes: int = 1024 * 1024) -> str:
+    """Hash a binary file object in chunks and rewind it"""
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    while chunk := fileobj.read(chunk_bytes):
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+def iter_import_frames(source: Union[str, BinaryIO], filename: str,
+                       chunk_rows: int = DEFAULT_READ_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Yield a CSV/XLSX file (path or binary file object) in DataFrame chunks"""
+    import pandas as pd
+
+    if filename.lower().endswith('.xlsx'):
+        yield from _iter_xlsx_frames(source, chunk_rows)
+        return
+
+    compression = 'gzip' if filename.lower().endswith('.gz') else None
+    # Blank lines are kept while reading so they still advance the row labels
+    with pd.read_csv(source, encoding='utf-8', compression=compression, chunksize=chunk_rows,
+                     skip_blank_lines=False) as reader:
+        for frame in reader:
+            frame = frame.dropna(how='all')
+            if len(frame):
+                yield frame
+
+def _iter_xlsx_frames(source: Union[str, BinaryIO], chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Read the first sheet row by row with openpyxl's read-only mode"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name) if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+
+        buffer = []
+        labels = []
+        for position, row in enumerate(rows):
+            # Blank rows are dropped, as pd.read_excel does for trailing ones, but keep their label
+            if all(cell is None for cell in row):
+                continue
+            buffer.append(row[:len(columns)])
+            labels.append(position)
+            if len(buffer) == chunk_rows:
+                yield _frame(buffer, columns, labels)
+                buffer = []
+                labels = []
+        if buffer:
+            yield _frame(buffer, columns, labels)
+    finally:
+        workbook.close()
+
+def _frame(rows: list, columns: list, labels: list) -> pd.DataFrame:
+    import pandas as pd
+
+    return pd.DataFrame(rows, columns=columns, index=pd.Index(labels))
@@ -0,0 +1,13 @@
+"""Small SQL helpers shared by services that need dialect-specific statements."""
+from sqlalchemy.orm import Session
+
+def dialect_insert(db: Session):
+    """Return the insert() construct supporting ON CONFLICT for the session's database"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise ValueError(f"INSERT ... ON CONFLICT is not supported on {dialect}")
+    return insert
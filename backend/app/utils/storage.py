@@ -0,0 +1,24 @@
+"""Where uploaded and generated files are kept.
+
+Import spools, reports and the image store all live under UPLOAD_DIR. It is
+made absolute at import, so the tree is the same whichever directory the
+API or a CLI command is started from.
+"""
+import os
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+UPLOAD_DIR = os.path.abspath(os.getenv("UPLOAD_DIR", os.path.join(BACKEND_DIR, "uploads")))
+
+# Prefix of the file paths stored by the original image upload route ("uploads/sem_images/...")
+LEGACY_UPLOAD_PREFIX = "uploads/"
+
+def upload_dir(env_var: str, name: str) -> str:
+    """Absolute directory from env_var, defaulting to UPLOAD_DIR/name"""
+    return os.path.abspath(os.getenv(env_var) or os.path.join(UPLOAD_DIR, name))
+
+def legacy_upload_path(reference: str) -> str:
+    """Resolve an "uploads/..." path stored by older versions against UPLOAD_DIR"""
+    if reference.startswith(LEGACY_UPLOAD_PREFIX):
+        return os.path.join(UPLOAD_DIR, reference[len(LEGACY_UPLOAD_PREFIX):])
+    return reference
@@ -0,0 +1,432 @@
+"""Benchmark suite covering every API route and the CSV importer.
+
+Runs each route in-process (ASGI, no network) against a database filled
+by app.data_generator, records latency percentiles and SQL statements per
+request, and writes a JSON report. Saving the report of one commit as a
+baseline and comparing a later run against it flags regressions:
+
+    export DATABASE_URL=sqlite:///bench.db
+    python -m app.data_generator --analyses 100000
+    python benchmarks/api_benchmarks.py --output baseline.json
+    # ... change code ...
+    python benchmarks/api_benchmarks.py --compare baseline.json
+
+A case regresses when its p50 is more than --threshold slower (and at
+least --min-delta-ms) or it issues noticeably more SQL statements per
+request; the exit status is then 1. Timings are noisy on busy or
+single-core machines, so compare runs from the same host with enough
+--iterations. Routes without a case also fail the run, so new
+routes get benchmarked. Write routes add rows, so use a scratch database
+and regenerate it before recording a new baseline.
+"""
+from typing import Any, Callable, Dict, List
+import argparse
+import atexit
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Files written by upload, report and import routes go to a scratch directory unless configured
+_SCRATCH_DIR = tempfile.mkdtemp(prefix="hgraph2-bench-")
+atexit.register(shutil.rmtree, _SCRATCH_DIR, ignore_errors=True)
+for _name, _subdir in (("IMAGE_STORE_DIR", "images"), ("IMAGE_DERIVED_DIR", "image_derivatives"),
+                       ("REPORT_DIR", "reports"), ("IMPORT_SPOOL_DIR", "import_jobs")):
+    os.environ.setdefault(_name, os.path.join(_SCRATCH_DIR, _subdir))
+
+# Request builder: (context, iteration) -> keyword arguments for TestClient.request
+Build = Callable[[Dict[str, Any], int], Dict[str, Any]]
+
+class Case:
+    def __init__(self, name: str, method: str, route: str, build: Build, heavy: bool = False):
+        self.name = name
+        self.method = method
+        self.route = route      # path template, for route coverage
+        self.build = build
+        self.heavy = heavy      # imports, uploads, exports: fewer iterations
+
+def get(path: str) -> Build:
+    return lambda ctx, i: {"url": path.format(**ctx)}
+
+def cases() -> List[Case]:
+    batches = "/api/v1/batches"
+    analysis = "/api/v1/analysis"
+    images = "/api/v1/images"
+    return [
+        Case("root", "GET", "/", get("/")),
+        Case("health", "GET", "/health", get("/health")),
+        Case("metrics", "GET", "/metrics", get("/metrics")),
+
+        Case("biochar.list", "GET", f"{batches}/biochar", get(f"{batches}/biochar")),
+        Case("biochar.list_filtered", "GET", f"{batches}/biochar", get(f"{batches}/biochar?oven=C&sort=yield_percent")),
+        Case("biochar.detail", "GET", f"{batches}/biochar/{{batch_id}}", get(f"{batches}/biochar/{{biochar_id}}")),
+        Case("biochar.create", "POST", f"{batches}/biochar", lambda ctx, i: {
+            "url": f"{batches}/biochar",
+            "json": {"name": f"BENCH-MB{ctx['run']}-{i}", "date_created": "2025-09-30", "oven": "C"}
+        }),
+        Case("graphene.list", "GET", f"{batches}/graphene", get(f"{batches}/graphene")),
+        Case("graphene.list_sorted", "GET", f"{batches}/graphene", get(f"{batches}/graphene?sort=best_bet")),
+        Case("graphene.list_shipped", "GET", f"{batches}/graphene", get(f"{batches}/graphene?shipped_only=true")),
+        Case("graphene.detail", "GET", f"{batches}/graphene/{{batch_id}}", get(f"{batches}/graphene/{{batch_id}}")),
+        Case("graphene.create", "POST", f"{batches}/graphene", lambda ctx, i: {
+            "url": f"{batches}/graphene",
+            "json": {"name": f"BENCH-MRa{ctx['run']}-{i}", "date_created": "2025-09-30", "oven": "C",
+                     "species": 1, "parent_biochar_ids": [ctx["biochar_id"]]}
+        }),
+
+        Case("analysis.create", "POST", f"{analysis}/", lambda ctx, i: {
+            "url": f"{analysis}/",
+            "json": {"graphene_batch_id": ctx["batch_id"], "date_analyzed": "2025-09-30",
+                     "bet_surface_area": 1500 + i, "conductivity": 13.5}
+        }),
+        Case("analysis.batch", "GET", f"{analysis}/batch/{{batch_id}}", get(f"{analysis}/batch/{{batch_id}}")),
+        Case("analysis.upload_images", "POST", f"{analysis}/upload-images/{{analysis_id}}", lambda ctx, i: {
+            "url": f"{analysis}/upload-images/{ctx['analysis_id']}",
+            "files": [("sem_files", (f"bench_{i}.png", _png(ctx, i), "image/png"))]
+        }, heavy=True),
+        Case("analysis.delete_image", "DELETE", f"{analysis}/{{analysis_id}}/images/{{sha256}}", lambda ctx, i: {
+            # Detach the images the upload case added (a 404 once they are used up)
+            "url": f"{analysis}/{ctx['analysis_id']}/images/{ctx['uploaded'].pop() if ctx['uploaded'] else '0' * 64}"
+        }, heavy=True),
+        Case("analysis.correlations", "GET", f"{analysis}/correlations", get(f"{analysis}/correlations")),
+        Case("analysis.correlation_groups", "GET", f"{analysis}/correlations/groups",
+             get(f"{analysis}/correlations/groups")),
+        Case("analysis.correlation_trends", "GET", f"{analysis}/correlations/trends",
+             get(f"{analysis}/correlations/trends")),
+
+        Case("dashboard.summary", "GET", "/api/v1/dashboard/summary", get("/api/v1/dashboard/summary")),
+        Case("dashboard.batch_performance", "GET", "/api/v1/dashboard/batch-performance",
+             get("/api/v1/dashboard/batch-performance")),
+
+        Case("import.csv_graphene", "POST", "/api/v1/import/csv", lambda ctx, i: {
+            "url": "/api/v1/import/csv?data_type=graphene",
+            "files": {"file": (f"bench_graphene_{i}.csv", _graphene_csv(ctx, i), "text/csv")}
+        }, heavy=True),
+        Case("import.csv_analysis", "POST", "/api/v1/import/csv", lambda ctx, i: {
+            "url": "/api/v1/import/csv?data_type=analysis",
+            "files": {"file": (f"bench_analysis_{i}.csv", _analysis_csv(ctx, i), "text/csv")}
+        }, heavy=True),
+        Case("import.job_create", "POST", "/api/v1/import/jobs", lambda ctx, i: {
+            "url": "/api/v1/import/jobs?data_type=graphene",
+            "files": {"file": (f"bench_job_{i}.csv", _graphene_csv(ctx, i, "JOB"), "text/csv")}
+        }, heavy=True),
+        Case("import.job_list", "GET", "/api/v1/import/jobs", get("/api/v1/import/jobs")),
+        Case("import.job_status", "GET", "/api/v1/import/jobs/{job_id}", get("/api/v1/import/jobs/{job_id}")),
+        Case("import.job_events", "GET", "/api/v1/import/jobs/{job_id}/events",
+             get("/api/v1/import/jobs/{job_id}/events")),
+        Case("import.template", "GET", "/api/v1/import/template/{data_type}", get("/api/v1/import/template/graphene")),
+
+        Case("quality.alerts", "GET", "/api/v1/quality/alerts", get("/api/v1/quality/alerts?acknowledged=true")),
+        Case("quality.acknowledge", "POST", "/api/v1/quality/alerts/{alert_id}/acknowledge",
+             get("/api/v1/quality/alerts/{alert_id}/acknowledge")),
+        Case("quality.control_limits", "GET", "/api/v1/quality/control-limits", get("/api/v1/quality/control-limits")),
+
+        Case("isotherms.upload", "POST", "/api/v1/isotherms/upload", lambda ctx, i: {
+            "url": "/api/v1/isotherms/upload",
+            "files": {"file": ("bench_isotherms.csv", _isotherm_csv(ctx), "text/csv")}
+        }, heavy=True),
+        Case("isotherms.refit", "POST", "/api/v1/isotherms/refit", get("/api/v1/isotherms/refit?graphene_batch_id={batch_id}"),
+             heavy=True),
+        Case("isotherms.batch", "GET", "/api/v1/isotherms/batch/{graphene_batch_id}",
+             get("/api/v1/isotherms/batch/{batch_id}")),
+        Case("isotherms.detail", "GET", "/api/v1/isotherms/{isotherm_id}", get("/api/v1/isotherms/{isotherm_id}")),
+
+        Case("lineage.ancestors", "GET", "/api/v1/lineage/{node_ref}/ancestors",
+             get("/api/v1/lineage/{batch_name}/ancestors")),
+        Case("lineage.descendants", "GET", "/api/v1/lineage/{node_ref}/descendants",
+             get("/api/v1/lineage/{biochar_id}/descendants")),
+        Case("lineage.shipments", "GET", "/api/v1/lineage/{node_ref}/shipments",
+             get("/api/v1/lineage/{biochar_id}/shipments")),
+        Case("lineage.rebuild", "POST", "/api/v1/lineage/rebuild", get("/api/v1/lineage/rebuild"), heavy=True),
+
+        Case("export.graphene_csv", "GET", "/api/v1/export/graphene", get("/api/v1/export/graphene?format=csv"),
+             heavy=True),
+        Case("export.biochar_ndjson", "GET", "/api/v1/export/biochar", get("/api/v1/export/biochar?format=ndjson"),
+             heavy=True),
+        Case("export.analysis_csv", "GET", "/api/v1/export/analysis", get("/api/v1/export/analysis?format=csv"),
+             heavy=True),
+
+        Case("reports.customer_summary", "POST", "/api/v1/reports/customer-summary",
+             get("/api/v1/reports/customer-summary?customer={customer}&wait=60")),
+        Case("reports.status", "GET", "/api/v1/reports/{report_id}", get("/api/v1/reports/{report_id}")),
+        Case("reports.pdf", "GET", "/api/v1/reports/{report_id}/pdf", get("/api/v1/reports/{report_id}/pdf")),
+
+        Case("images.original", "GET", f"{images}/{{sha256}}", get(f"{images}/{{sha256}}")),
+        Case("images.thumbnail", "GET", f"{images}/{{sha256}}/thumbnail", get(f"{images}/{{sha256}}/thumbnail")),
+        Case("images.dzi", "GET", f"{images}/{{sha256}}/tiles.dzi", get(f"{images}/{{sha256}}/tiles.dzi")),
+        Case("images.tile", "GET", f"{images}/{{sha256}}/tiles_files/{{level}}/{{column}}_{{row}}.webp",
+             get(f"{images}/{{sha256}}/tiles_files/8/0_0.webp")),
+    ]
+
+def _png(ctx: Dict[str, Any], i: int) -> bytes:
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("L", (640, 480), color=(ctx["run"] * 31 + i) % 256).save(buffer, "PNG")
+    return buffer.getvalue()
+
+def _graphene_csv(ctx: Dict[str, Any], i: int, kind: str = "IMP") -> bytes:
+    rows = ["Experiment,Oven,Species,T (rate),t,Output,Appearance"]
+    rows.extend(
+        f"BENCH-{kind}{ctx['run']}-{i}-{n},C,Species 1,800°C,1h,{10 + n % 50}g,black/grey brittle"
+        for n in range(ctx["import_rows"])
+    )
+    return "\n".join(rows).encode()
+
+def _analysis_csv(ctx: Dict[str, Any], i: int) -> bytes:
+    rows = ["Sample,Multipoint BET Area [m^2/g],Langmuir Surface Area [m^2/g],Conductivity (S/cm)"]
+    names = ctx["batch_names"]
+    rows.extend(
+        f"{names[n % len(names)]},{1000 + (ctx['run'] * 7919 + i * 104729 + n) % 100000 / 97:.3f},1700,0.137"
+        for n in range(ctx["import_rows"])
+    )
+    return "\n".join(rows).encode()
+
+def _isotherm_csv(ctx: Dict[str, Any]) -> bytes:
+    import numpy as np
+
+    pressures = np.linspace(0.01, 0.99, 40)
+    # Type I isotherm (microporous carbon)
+    quantities = 450 * 30 * pressures / (1 + 30 * pressures)
+    rows = ["Sample,P/P0,Quantity Adsorbed"]
+    rows.extend(f"{ctx['batch_name']},{p:.4f},{q:.3f}" for p, q in zip(pressures, quantities))
+    return "\n".join(rows).encode()
+
+def prepare(client, db, args) -> Dict[str, Any]:
+    """IDs and files the cases need, taken from (or added to) the generated data"""
+    from sqlalchemy import func, select
+    from app.models import AnalysisResult, BiocharBatch, GrapheneBatch, LineageEdge
+
+    batch_id, batch_name = db.execute(
+        select(GrapheneBatch.id, GrapheneBatch.name).join(LineageEdge, LineageEdge.child_id == GrapheneBatch.id)
+        .where(GrapheneBatch.shipped_to.isnot(None)).order_by(GrapheneBatch.name).limit(1)
+    ).one()
+    biochar_id = db.scalar(
+        select(LineageEdge.parent_id).where(LineageEdge.child_id == batch_id, LineageEdge.parent_type == "biochar")
+    )
+    customer = db.scalar(
+        select(GrapheneBatch.shipped_to).where(GrapheneBatch.shipped_to.isnot(None))
+        .group_by(GrapheneBatch.shipped_to).order_by(func.count().desc()).limit(1)
+    )
+    ctx: Dict[str, Any] = {
+        "run": int(time.time()),
+        "import_rows": args.import_rows,
+        "batch_id": str(batch_id),
+        "batch_name": batch_name,
+        "biochar_id": str(biochar_id or db.scalar(select(BiocharBatch.id).limit(1))),
+        "analysis_id": str(db.scalar(select(AnalysisResult.id).where(AnalysisResult.graphene_batch_id == batch_id).limit(1))),
+        "batch_names": list(db.scalars(select(GrapheneBatch.name).order_by(GrapheneBatch.name).limit(1000))),
+        "customer": customer,
+        "uploaded": []
+    }
+
+    def checked(response):
+        if response.status_code >= 400:
+            raise RuntimeError(f"Benchmark setup failed: {response.request.method} {response.request.url} "
+                               f"-> {response.status_code} {response.text[:200]}")
+        return response
+
+    # A large image for the image routes, with its derivatives generated up front
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.effect_mandelbrot((2048, 1536), (-2.0, -1.2, 1.0, 1.2), 100).convert("RGB").save(buffer, "PNG")
+    upload = checked(client.post(f"/api/v1/analysis/upload-images/{ctx['analysis_id']}",
+                                 files=[("sem_files", ("bench_mandelbrot.png", buffer.getvalue(), "image/png"))])).json()
+    ctx["sha256"] = upload["images"][0]["sha256"]
+    checked(client.get(f"/api/v1/images/{ctx['sha256']}/tiles.dzi"))
+
+    isotherm = checked(client.post("/api/v1/isotherms/upload",
+                                   files={"file": ("bench_isotherms.csv", _isotherm_csv(ctx), "text/csv")})).json()
+    ctx["isotherm_id"] = isotherm["isotherms"][0]["id"]
+
+    job = checked(client.post("/api/v1/import/jobs?data_type=graphene",
+                              files={"file": ("bench_job.csv", _graphene_csv(ctx, -1, "JOBSETUP"), "text/csv")})).json()
+    ctx["job_id"] = job["id"]
+    for _ in range(600):
+        if checked(client.get(f"/api/v1/import/jobs/{ctx['job_id']}")).json()["status"] not in ("queued", "running"):
+            break
+        time.sleep(0.1)
+
+    # A far outlier raises an SPC alert to acknowledge
+    checked(client.post("/api/v1/analysis/", json={
+        "graphene_batch_id": ctx["batch_id"], "date_analyzed": "2025-09-30", "bet_surface_area": 99999
+    }))
+    alerts = checked(client.get("/api/v1/quality/alerts")).json()
+    ctx["alert_id"] = alerts[0]["id"] if alerts else "00000000-0000-0000-0000-000000000000"
+
+    report = client.post(f"/api/v1/reports/customer-summary?customer={customer}&wait=60").json()
+    ctx["report_id"] = report.get("report_id", "0" * 64)
+    return ctx
+
+def run_case(client, case: Case, ctx: Dict[str, Any], iterations: int) -> Dict[str, Any]:
+    """First (cold) request, then timed iterations"""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    # Counted here rather than read from Server-Timing, which streamed responses send before their queries run
+    executed = [0]
+    def count_statement(*args):
+        executed[0] += 1
+
+    latencies: List[float] = []
+    statements: List[int] = []
+    statuses: Dict[str, int] = {}
+    first_ms = None
+    event.listen(Engine, "after_cursor_execute", count_statement)
+    try:
+        for i in range(iterations + 1):
+            request = case.build(ctx, i)
+            executed[0] = 0
+            started = time.perf_counter()
+            response = client.request(case.method, **request)
+            elapsed = time.perf_counter() - started
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+            if case.name == "analysis.upload_images" and response.status_code == 200:
+                ctx["uploaded"].extend(image["sha256"] for image in response.json()["images"])
+            if i == 0:
+                first_ms = round(elapsed * 1000, 2)
+                continue
+            latencies.append(elapsed)
+            statements.append(executed[0])
+    finally:
+        event.remove(Engine, "after_cursor_execute", count_statement)
+
+    ordered = sorted(latencies)
+    def percentile(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 2)
+    return {
+        "method": case.method,
+        "route": case.route,
+        "iterations": len(ordered),
+        "first_ms": first_ms,
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 2),
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "min_ms": round(ordered[0] * 1000, 2),
+        "statements_per_request": round(statistics.fmean(statements), 1),
+        "statuses": statuses
+    }
+
+def uncovered_routes(app, suite: List[Case]) -> List[str]:
+    from fastapi.routing import APIRoute
+
+    covered = {(case.method, case.route) for case in suite}
+    return sorted(
+        f"{method} {route.path}"
+        for route in app.routes if isinstance(route, APIRoute)
+        for method in route.methods if (method, route.path) not in covered
+    )
+
+def environment(db) -> Dict[str, Any]:
+    from sqlalchemy import func, select
+    from app.models import AnalysisResult, BiocharBatch, GrapheneBatch
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "database": db.get_bind().dialect.name,
+        "rows": {
+            "biochar_batches": db.scalar(select(func.count()).select_from(BiocharBatch)),
+            "graphene_batches": db.scalar(select(func.count()).select_from(GrapheneBatch)),
+            "analysis_results": db.scalar(select(func.count()).select_from(AnalysisResult))
+        }
+    }
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], threshold: float, min_delta_ms: float) -> List[str]:
+    """Print a comparison table and return the names of regressed cases"""
+    regressions = []
+    if baseline["environment"]["rows"] != report["environment"]["rows"]:
+        print(f"⚠️  Row counts differ from the baseline ({baseline['environment']['rows']}); "
+              "regenerate the database with the same --analyses and --seed for a fair comparison")
+    print(f"{'case':36} {'base p50':>10} {'p50':>10} {'change':>8} {'stmts':>12}")
+    for name, result in report["cases"].items():
+        base = baseline["cases"].get(name)
+        if not base:
+            print(f"{name:36} {'-':>10} {result['p50_ms']:>10} {'new':>8}")
+            continue
+        change = (result["p50_ms"] - base["p50_ms"]) / base["p50_ms"] if base["p50_ms"] else 0
+        slower = change > threshold and result["p50_ms"] - base["p50_ms"] >= min_delta_ms
+        added = result["statements_per_request"] - base["statements_per_request"]
+        more_sql = added >= 1 and added > base["statements_per_request"] * 0.1
+        statements = f"{base['statements_per_request']}→{result['statements_per_request']}"
+        flag = " ❌" if slower or more_sql else ""
+        print(f"{name:36} {base['p50_ms']:>10} {result['p50_ms']:>10} {change:>+8.0%} {statements:>12}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20, help="timed requests per case (heavy cases run a fifth)")
+    parser.add_argument("--import-rows", type=int, default=2000, help="rows per CSV import request")
+    parser.add_argument("--case", action="append", help="only run cases whose name starts with this (repeatable)")
+    parser.add_argument("--output", help="write the JSON report here (e.g. as a baseline)")
+    parser.add_argument("--compare", help="baseline JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed p50 slowdown, as a fraction")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="ignore p50 changes smaller than this")
+    args = parser.parse_args(argv)
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import func, select
+    from app.database import SessionLocal
+    from app.main import app
+    from app.models import GrapheneBatch
+
+    suite = cases()
+    missing = uncovered_routes(app, suite)
+    if missing and not args.case:
+        print("❌ Routes without a benchmark case:\n  " + "\n  ".join(missing))
+        return 1
+
+    db = SessionLocal()
+    try:
+        if not db.scalar(select(func.count()).select_from(GrapheneBatch)):
+            print("❌ The database is empty; fill it first with python -m app.data_generator")
+            return 1
+        with TestClient(app) as client:
+            ctx = prepare(client, db, args)
+            results: Dict[str, Any] = {}
+            for case in suite:
+                if args.case and not any(case.name.startswith(prefix) for prefix in args.case):
+                    continue
+                iterations = max(3, args.iterations // 5) if case.heavy else args.iterations
+                results[case.name] = run_case(client, case, ctx, iterations)
+                result = results[case.name]
+                print(f"{case.name:36} p50 {result['p50_ms']:>9} ms  p95 {result['p95_ms']:>9} ms  "
+                      f"{result['statements_per_request']:>6} stmts  "
+                      f"{','.join(f'{code}×{count}' for code, count in result['statuses'].items())}")
+        report = {"environment": environment(db), "import_rows": args.import_rows, "cases": results}
+    finally:
+        db.close()
+
+    if args.output:
+        with open(args.output, "w") as out:
+            json.dump(report, out, indent=2)
+        print(f"✅ Report written to {args.output}")
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(report, json.load(baseline_file), args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"❌ {len(regressions)} regressions: {', '.join(regressions)}")
+            return 1
+        print("✅ No regressions against the baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
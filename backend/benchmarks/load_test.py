@@ -0,0 +1,129 @@
+"""Concurrent load test for the API.
+
+Runs --concurrency clients against a mix of read endpoints for --duration
+seconds while a separate probe requests a trivial endpoint (/health) once
+every --probe-interval seconds. If blocking work runs on the event loop,
+the probe's latency climbs with the load; with the blocking work on the
+thread pool it stays flat. Start the API first, e.g.
+
+    uvicorn app.main:app --port 8000
+    python benchmarks/load_test.py --concurrency 32 --duration 20
+
+To compare two trees, give each server its own copy of the same database
+and alternate runs between them, since back-to-back runs on one tree drift.
+"""
+from typing import Dict, List
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import httpx
+
+DEFAULT_PATHS = [
+    "/api/v1/batches/graphene?limit=500",
+    "/api/v1/batches/biochar?limit=500",
+    "/api/v1/dashboard/summary",
+    "/api/v1/analysis/correlations",
+    "/api/v1/quality/control-limits",
+]
+
+async def client_loop(client: httpx.AsyncClient, paths: List[str], offset: int, deadline: float,
+                      latencies: Dict[str, List[float]], errors: Dict[str, int]):
+    """Cycle through the paths until the deadline, recording each request's latency"""
+    index = offset
+    while time.perf_counter() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        if ok:
+            latencies.setdefault(path, []).append(time.perf_counter() - started)
+        else:
+            errors[path] = errors.get(path, 0) + 1
+
+async def probe_loop(client: httpx.AsyncClient, path: str, interval: float, deadline: float, latencies: List[float]):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            await client.get(path)
+            latencies.append(time.perf_counter() - started)
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(interval)
+
+def summarise(latencies: List[float]) -> Dict[str, float]:
+    if not latencies:
+        return {"count": 0}
+    ordered = sorted(latencies)
+    def percentile(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 1)
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 1),
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "max_ms": round(ordered[-1] * 1000, 1)
+    }
+
+async def run(args) -> Dict[str, object]:
+    paths = args.path or DEFAULT_PATHS
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    probe: List[float] = []
+    limits = httpx.Limits(max_connections=args.concurrency + 1)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        # Warm caches and connections so the measurement covers steady state
+        for path in paths:
+            await client.get(path)
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(
+            probe_loop(client, args.probe_path, args.probe_interval, deadline, probe),
+            *(client_loop(client, paths, i, deadline, latencies, errors) for i in range(args.concurrency))
+        )
+        elapsed = time.perf_counter() - started
+
+    completed = sum(len(values) for values in latencies.values())
+    return {
+        "base_url": args.base_url,
+        "concurrency": args.concurrency,
+        "duration_seconds": round(elapsed, 2),
+        "requests": completed,
+        "errors": sum(errors.values()),
+        "requests_per_second": round(completed / elapsed, 1),
+        "probe": {"path": args.probe_path, **summarise(probe)},
+        "paths": {path: {**summarise(values), "errors": errors.get(path, 0)} for path, values in latencies.items()}
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--path", action="append", help="Endpoint to load (repeatable); defaults to a read mix")
+    parser.add_argument("--probe-path", default="/health")
+    parser.add_argument("--probe-interval", type=float, default=0.1)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    probe = report["probe"]
+    print(f"{report['requests']} requests in {report['duration_seconds']}s at concurrency {report['concurrency']}: "
+          f"{report['requests_per_second']} req/s, {report['errors']} errors")
+    print(f"probe {probe['path']}: p50 {probe.get('p50_ms')} ms, p99 {probe.get('p99_ms')} ms, max {probe.get('max_ms')} ms")
+    for path, stats in report["paths"].items():
+        print(f"  {path}: {stats['count']} ok, p50 {stats['p50_ms']} ms, p95 {stats['p95_ms']} ms, {stats['errors']} errors")
+
+if __name__ == "__main__":
+    main()
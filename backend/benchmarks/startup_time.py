@@ -0,0 +1,86 @@
+"""Cold-start time and memory of an API worker.
+
+Starts --runs fresh interpreters that each import app.main, run the
+lifespan start-up and serve one /health request, then reports the median
+import time, time to first response and peak RSS. Also lists the heavy
+data libraries loaded by then; the exit status is 1 if any were, so an
+eager import creeping back into a route module fails CI. Run from
+backend/ (the database is not touched):
+
+    python benchmarks/startup_time.py --runs 5
+"""
+from typing import Any, Dict, List
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Imported only by the requests that need them
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl", "PIL", "pyarrow", "reportlab")
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter and prints one JSON line
+WORKER = """
+import json, resource, sys, time
+started = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+rss_after_import = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+from fastapi.testclient import TestClient
+ready = time.perf_counter()
+with TestClient(app) as client:
+    status = client.get("/health").status_code
+    first_response = time.perf_counter() - ready
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_response_ms": first_response * 1000,
+    "rss_after_import_mb": rss_after_import / 1024,
+    "status": status,
+    "heavy_modules": sorted(name for name in %r if name in sys.modules)
+}))
+""" % (HEAVY_MODULES,)
+
+def measure_once() -> Dict[str, Any]:
+    result = subprocess.run(
+        [sys.executable, "-c", WORKER], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def summarise(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "runs": len(runs),
+        "import_ms": round(statistics.median(run["import_ms"] for run in runs), 1),
+        "first_response_ms": round(statistics.median(run["first_response_ms"] for run in runs), 1),
+        "rss_after_import_mb": round(statistics.median(run["rss_after_import_mb"] for run in runs), 1),
+        "statuses": sorted({run["status"] for run in runs}),
+        "heavy_modules": sorted({name for run in runs for name in run["heavy_modules"]})
+    }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to start")
+    parser.add_argument("--output", help="write the JSON summary here")
+    args = parser.parse_args(argv)
+
+    # The first start also compiles bytecode, so it is not counted
+    measure_once()
+    summary = summarise([measure_once() for _ in range(args.runs)])
+
+    print(f"import app.main      {summary['import_ms']:>8} ms")
+    print(f"first /health        {summary['first_response_ms']:>8} ms")
+    print(f"peak RSS after import {summary['rss_after_import_mb']:>7} MB")
+    if args.output:
+        with open(args.output, "w") as out:
+            json.dump(summary, out, indent=2)
+
+    if summary["heavy_modules"]:
+        print(f"❌ Loaded at start-up: {', '.join(summary['heavy_modules'])}")
+        return 1
+    print("✅ No heavy data libraries loaded at start-up")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,17 @@
 import { useState } from 'react'
 import { ArrowDownTrayIcon, DocumentTextIcon, TableCellsIcon } from '@heroicons/react/24/outline'
 import { LoadingSpinner } from './LoadingSpinner'
+import { ExportFormat } from '../services/api'
 
 interface ExportControlsProps {
   data: any[]
   filename?: string
   title?: string
+  // Server-side export of the full filtered dataset, streamed rather than built from the fetched page
+  fullExportUrl?: (format: ExportFormat) => string
 }
 
-export function ExportControls({ data, filename = 'hgraph2_export', title = 'Export Data' }: ExportControlsProps) {
+export function ExportControls({ data, filename = 'hgraph2_export', title = 'Export Data', fullExportUrl }: ExportControlsProps) {
   const [isExporting, setIsExporting] = useState(false)
 
   const exportToCSV = async () => {
@@ -106,6 +109,27 @@ export function ExportControls({ data, filename = 'hgraph2_export', title = 'Exp
         <span>JSON</span>
       </button>
 
+      {fullExportUrl && (
+        <>
+          <a
+            href={fullExportUrl('csv')}
+            download
+            className="btn btn-secondary px-3 py-1 text-xs flex items-center space-x-1"
+          >
+            <ArrowDownTrayIcon className="h-3 w-3" />
+            <span>All (CSV)</span>
+          </a>
+          <a
+            href={fullExportUrl('parquet')}
+            download
+            className="btn btn-secondary px-3 py-1 text-xs flex items-center space-x-1"
+          >
+            <ArrowDownTrayIcon className="h-3 w-3" />
+            <span>All (Parquet)</span>
+          </a>
+        </>
+      )}
+
       <div className="text-xs text-gray-400">
         ({data.length} records)
       </div>
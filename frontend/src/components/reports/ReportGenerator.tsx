@@ -1,4 +1,6 @@
 import { useState } from 'react'
+import { useQuery } from '@tanstack/react-query'
+import { reportApi } from '../../services/api'
 import { Badge } from '../Badge'
 import { LoadingSpinner } from '../LoadingSpinner'
 import { DocumentTextIcon, ChartBarIcon, UserGroupIcon } from '@heroicons/react/24/outline'
@@ -13,10 +15,28 @@ export function ReportGenerator({ onGenerateReport }: ReportGeneratorProps) {
     includeCharts: true,
     includeSEMImages: true,
     dateRange: 'last30days',
+    dateFrom: '',
+    dateTo: '',
     batchFilter: 'oven_c_only',
+    customer: '',
     format: 'pdf'
   })
   const [isGenerating, setIsGenerating] = useState(false)
+  const isCustomerSummary = selectedReport === 'customer_summary'
+
+  const { data: customers } = useQuery({
+    queryKey: ['report-customers'],
+    queryFn: () => reportApi.getCustomers().then(res => res.data),
+    enabled: isCustomerSummary,
+  })
+
+  // The customer summary covers one customer's shipments, so only these filters apply to it
+  const batchFilters = [
+    { value: 'all', label: 'All batches', customerSummary: true },
+    { value: 'oven_c_only', label: 'Oven C era only', customerSummary: true },
+    { value: 'shipped_only', label: 'Shipped batches only', customerSummary: false },
+    { value: 'recent_only', label: 'Recent batches only', customerSummary: false },
+  ].filter(filter => !isCustomerSummary || filter.customerSummary)
 
   const reportTypes = [
     {
@@ -57,7 +77,7 @@ export function ReportGenerator({ onGenerateReport }: ReportGeneratorProps) {
   ]
 
   const handleGenerateReport = async () => {
-    if (!selectedReport) return
+    if (!selectedReport || (isCustomerSummary && !reportOptions.customer)) return
     
     setIsGenerating(true)
     try {
@@ -107,6 +127,26 @@ export function ReportGenerator({ onGenerateReport }: ReportGeneratorProps) {
           </div>
           <div className="card-body">
             <div className="grid grid-cols-1 gap-4 md:grid-cols-2">
+              {isCustomerSummary && (
+                <div className="md:col-span-2">
+                  <label className="block text-sm font-medium text-gray-700 mb-2">
+                    Customer
+                  </label>
+                  <select
+                    className="select"
+                    value={reportOptions.customer}
+                    onChange={(e) => setReportOptions({...reportOptions, customer: e.target.value})}
+                  >
+                    <option value="">Select a customer…</option>
+                    {customers?.map((customer) => (
+                      <option key={customer.customer} value={customer.customer}>
+                        {customer.customer} ({customer.shipments} shipments)
+                      </option>
+                    ))}
+                  </select>
+                </div>
+              )}
+
               <div>
                 <label className="block text-sm font-medium text-gray-700 mb-2">
                   Date Range
@@ -122,6 +162,23 @@ export function ReportGenerator({ onGenerateReport }: ReportGeneratorProps) {
                   <option value="all">All time</option>
                   <option value="custom">Custom range</option>
                 </select>
+                {reportOptions.dateRange === 'custom' && (
+                  <div className="mt-2 flex items-center space-x-2">
+                    <input
+                      type="date"
+                      className="input"
+                      value={reportOptions.dateFrom}
+                      onChange={(e) => setReportOptions({...reportOptions, dateFrom: e.target.value})}
+                    />
+                    <span className="text-sm text-gray-500">to</span>
+                    <input
+                      type="date"
+                      className="input"
+                      value={reportOptions.dateTo}
+                      onChange={(e) => setReportOptions({...reportOptions, dateTo: e.target.value})}
+                    />
+                  </div>
+                )}
               </div>
 
               <div>
@@ -133,10 +190,9 @@ export function ReportGenerator({ onGenerateReport }: ReportGeneratorProps) {
                   value={reportOptions.batchFilter}
                   onChange={(e) => setReportOptions({...reportOptions, batchFilter: e.target.value})}
                 >
-                  <option value="all">All batches</option>
-                  <option value="oven_c_only">Oven C era only</option>
-                  <option value="shipped_only">Shipped batches only</option>
-                  <option value="recent_only">Recent batches only</option>
+                  {batchFilters.map((filter) => (
+                    <option key={filter.value} value={filter.value}>{filter.label}</option>
+                  ))}
                 </select>
               </div>
 
@@ -175,7 +231,7 @@ export function ReportGenerator({ onGenerateReport }: ReportGeneratorProps) {
         <button
           className="btn btn-primary px-6 py-2 flex items-center space-x-2"
           onClick={handleGenerateReport}
-          disabled={!selectedReport || isGenerating}
+          disabled={!selectedReport || (isCustomerSummary && !reportOptions.customer) || isGenerating}
         >
           {isGenerating ? (
             <>
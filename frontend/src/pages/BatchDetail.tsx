@@ -13,7 +13,7 @@ import {
 import { Badge } from '../components/Badge'
 import { LoadingSpinner } from '../components/LoadingSpinner'
 import { StatCard } from '../components/StatCard'
-import { batchApi, analysisApi } from '../services/api'
+import { batchApi, analysisApi, imageApi } from '../services/api'
 import { format } from 'date-fns'
 
 export function BatchDetail() {
@@ -32,6 +32,19 @@ export function BatchDetail() {
     enabled: !!batchId
   })
 
+  // One gallery entry per SEM/TEM image reference across the batch's analyses
+  const microscopyImages = (analysisResults ?? []).flatMap(result =>
+    (['SEM', 'TEM'] as const).flatMap(kind =>
+      ((kind === 'SEM' ? result.sem_images : result.tem_images) ?? []).map((reference, index) => ({
+        key: `${result.id}-${kind}-${index}`,
+        kind,
+        reference,
+        sha256: imageApi.getImageHash(reference),
+        dateAnalyzed: result.date_analyzed
+      }))
+    )
+  )
+
   if (batchLoading) {
     return (
       <div className="flex items-center justify-center min-h-96">
@@ -370,16 +383,53 @@ export function BatchDetail() {
               <p className="text-sm text-gray-600">Microscopy images and morphology analysis</p>
             </div>
             <div className="card-body">
-              <div className="text-center py-12">
-                <CameraIcon className="mx-auto h-12 w-12 text-gray-400" />
-                <h3 className="mt-2 text-sm font-medium text-gray-900">No Images Available</h3>
-                <p className="mt-1 text-sm text-gray-500">
-                  SEM and TEM images will be displayed here when uploaded
-                </p>
-                <button className="mt-4 btn btn-primary">
-                  Upload Images
-                </button>
-              </div>
+              {microscopyImages.length > 0 ? (
+                <div className="grid grid-cols-2 gap-4 sm:grid-cols-3 lg:grid-cols-4">
+                  {microscopyImages.map(image => (
+                    <a
+                      key={image.key}
+                      href={image.sha256 ? imageApi.getOriginalUrl(image.sha256) : imageApi.getLegacyUrl(image.reference)}
+                      target="_blank"
+                      rel="noopener noreferrer"
+                      className="group block border border-gray-200 rounded-lg overflow-hidden hover:border-gray-300"
+                    >
+                      {image.sha256 ? (
+                        // Small cached WebP thumbnails instead of the multi-megabyte originals
+                        <img
+                          src={imageApi.getThumbnailUrl(image.sha256)}
+                          alt={`${image.kind} image`}
+                          loading="lazy"
+                          decoding="async"
+                          width={256}
+                          height={256}
+                          className="h-40 w-full object-cover bg-gray-100"
+                        />
+                      ) : (
+                        <div className="h-40 flex items-center justify-center bg-gray-100">
+                          <CameraIcon className="h-10 w-10 text-gray-400" />
+                        </div>
+                      )}
+                      <div className="px-3 py-2 flex items-center justify-between">
+                        <Badge variant={image.kind === 'SEM' ? 'blue' : 'gray'}>{image.kind}</Badge>
+                        <span className="text-xs text-gray-500">
+                          {format(new Date(image.dateAnalyzed), 'MMM dd, yyyy')}
+                        </span>
+                      </div>
+                    </a>
+                  ))}
+                </div>
+              ) : (
+                <div className="text-center py-12">
+                  <CameraIcon className="mx-auto h-12 w-12 text-gray-400" />
+                  <h3 className="mt-2 text-sm font-medium text-gray-900">No Images Available</h3>
+                  <p className="mt-1 text-sm text-gray-500">
+                    SEM and TEM images will be displayed here when uploaded
+                  </p>
+                  <button className="mt-4 btn btn-primary">
+                    Upload Images
+                  </button>
+                </div>
+              )}
             </div>
           </div>
         )}
@@ -6,7 +6,7 @@ import { Table } from '../components/Table'
 import { Badge } from '../components/Badge'
 import { LoadingSpinner } from '../components/LoadingSpinner'
 import { ExportControls } from '../components/ExportControls'
-import { batchApi, GrapheneBatch } from '../services/api'
+import { batchApi, exportApi, GrapheneBatch } from '../services/api'
 import { format } from 'date-fns'
 import { EyeIcon } from '@heroicons/react/24/outline'
 
@@ -259,6 +259,12 @@ export function BatchExplorer() {
            data={exportData} 
            filename="hgraph2_batches"
            title="Export Batches"
+           fullExportUrl={(exportFormat) => exportApi.getExportUrl('graphene', exportFormat, {
+             oven: filters.oven || undefined,
+             species: filters.species ? parseInt(filters.species) : undefined,
+             oven_c_era: filters.oven_c_era || undefined,
+             shipped_only: filters.shipped_only || undefined,
+           })}
          />
        </div>
 
@@ -5,6 +5,20 @@ import { CustomerSummaryReport } from '../components/reports/CustomerSummaryRepo
 import { ReportService } from '../services/reportService'
 import { batchApi, dashboardApi } from '../services/api'
 import { DocumentArrowDownIcon } from '@heroicons/react/24/outline'
+import { format, subDays } from 'date-fns'
+
+const DATE_RANGE_DAYS: Record<string, number> = { last7days: 7, last30days: 30, last90days: 90 }
+
+// Shipment date bounds for the server-rendered customer summary
+function shipmentDateParams(options: any): { date_from?: string; date_to?: string } {
+  if (options.dateRange in DATE_RANGE_DAYS) {
+    return { date_from: format(subDays(new Date(), DATE_RANGE_DAYS[options.dateRange]), 'yyyy-MM-dd') }
+  }
+  if (options.dateRange === 'custom') {
+    return { date_from: options.dateFrom || undefined, date_to: options.dateTo || undefined }
+  }
+  return {}
+}
 
 export function Reports() {
   const [previewReport, setPreviewReport] = useState<string | null>(null)
@@ -29,7 +43,7 @@ export function Reports() {
     }) || []
 
     const reportData = {
-      customerName: 'Albany Materials',
+      customerName: options.customer,
       reportDate: new Date().toISOString(),
       batches: filteredBatches.map(batch => ({
         name: batch.name,
@@ -49,7 +63,11 @@ export function Reports() {
     try {
       switch (reportType) {
         case 'customer_summary':
-          await ReportService.generateCustomerSummaryPDF(reportData)
+          await ReportService.generateCustomerSummaryPDF({
+            customer: options.customer,
+            ...shipmentDateParams(options),
+            oven_c_only: options.batchFilter === 'oven_c_only'
+          })
           break
         case 'executive_dashboard':
           await ReportService.generateExecutiveDashboardPDF(reportData)
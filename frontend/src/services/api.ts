@@ -79,6 +79,9 @@ export interface AnalysisResult {
   comments: string | null
   created_at: string
   energy_storage_grade: string | null
+  // /api/v1/images/<sha256> URLs (older uploads may still be plain paths)
+  sem_images: string[] | null
+  tem_images: string[] | null
 }
 
 // API functions
@@ -102,3 +105,61 @@ export const analysisApi = {
   getBatchAnalysis: (batchId: string) => api.get<AnalysisResult[]>(`/analysis/batch/${batchId}`),
   createAnalysis: (data: Partial<AnalysisResult>) => api.post<AnalysisResult>('/analysis', data),
 }
+
+const SERVER_URL = API_BASE_URL.replace(/\/api\/v1$/, '')
+const IMAGE_URL_PATTERN = /^\/api\/v1\/images\/([0-9a-f]{64})$/
+
+export const imageApi = {
+  // Content hash behind a stored image URL, or null for legacy path references
+  getImageHash: (reference: string) => IMAGE_URL_PATTERN.exec(reference)?.[1] ?? null,
+  getOriginalUrl: (sha256: string) => `${API_BASE_URL}/images/${sha256}`,
+  // WebP thumbnails; the server renders them on first request if needed
+  getThumbnailUrl: (sha256: string, size: 256 | 1024 = 256) => `${API_BASE_URL}/images/${sha256}/thumbnail?size=${size}`,
+  // Deep Zoom descriptor for tiled viewers (e.g. OpenSeadragon)
+  getTileSourceUrl: (sha256: string) => `${API_BASE_URL}/images/${sha256}/tiles.dzi`,
+  getLegacyUrl: (path: string) => `${SERVER_URL}/${path.replace(/^\/+/, '')}`,
+}
+
+export type ExportDataset = 'graphene' | 'biochar' | 'analysis'
+export type ExportFormat = 'csv' | 'ndjson' | 'parquet'
+
+export const exportApi = {
+  // Streamed by the server, so the browser never holds the whole dataset
+  getExportUrl: (dataset: ExportDataset, format: ExportFormat, params: Record<string, string | number | boolean | undefined> = {}) => {
+    const query = new URLSearchParams({ format })
+    Object.entries(params).forEach(([key, value]) => {
+      if (value !== undefined && value !== '') query.append(key, String(value))
+    })
+    return `${API_BASE_URL}/export/${dataset}?${query.toString()}`
+  },
+}
+
+export interface ReportStatus {
+  report_id: string
+  status: 'ready' | 'rendering' | 'failed' | 'unknown'
+  error: string | null
+  download_url?: string
+}
+
+export interface ReportCustomer {
+  customer: string
+  shipments: number
+  last_shipped: string | null
+}
+
+export interface CustomerSummaryParams {
+  customer: string
+  date_from?: string
+  date_to?: string
+  oven_c_only?: boolean
+}
+
+export const reportApi = {
+  getCustomers: () => api.get<ReportCustomer[]>('/reports/customers'),
+  // wait: seconds the server may block until the render finishes
+  requestCustomerSummary: (params: CustomerSummaryParams & { wait?: number }) =>
+    api.post<ReportStatus>('/reports/customer-summary', null, { params }),
+  getReportStatus: (reportId: string, wait = 10) =>
+    api.get<ReportStatus>(`/reports/${reportId}`, { params: { wait } }),
+  getDownloadUrl: (downloadPath: string) => `${SERVER_URL}${downloadPath}`,
+}
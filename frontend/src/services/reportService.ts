@@ -1,6 +1,7 @@
 import jsPDF from 'jspdf'
 import html2canvas from 'html2canvas'
 import { format } from 'date-fns'
+import { reportApi, CustomerSummaryParams } from './api'
 
 export interface ReportData {
   customerName?: string
@@ -15,104 +16,23 @@ export interface ReportData {
 }
 
 export class ReportService {
-  static async generateCustomerSummaryPDF(data: ReportData): Promise<void> {
-    const pdf = new jsPDF('p', 'mm', 'a4')
-    
-    // Header
-    pdf.setFontSize(24)
-    pdf.setTextColor(31, 41, 55) // gray-900
-    pdf.text('HGraph2 Material Report', 20, 30)
-    
-    pdf.setFontSize(14)
-    pdf.setTextColor(107, 114, 128) // gray-500
-    pdf.text('Hemp-Derived Graphene Analysis', 20, 40)
-    
-    // Report date
-    pdf.setFontSize(10)
-    pdf.text(`Report Generated: ${format(new Date(data.reportDate), 'MMMM dd, yyyy')}`, 20, 50)
-    
-    // Customer info
-    pdf.setFontSize(16)
-    pdf.setTextColor(31, 41, 55)
-    pdf.text('Customer Information', 20, 70)
-    
-    pdf.setFontSize(12)
-    pdf.text(data.customerName || 'Customer Name', 20, 80)
-    
-    // Executive Summary
-    pdf.setFontSize(16)
-    pdf.text('Executive Summary', 20, 100)
-    
-    pdf.setFontSize(12)
-    pdf.text(`Total Batches: ${data.summary.totalBatches}`, 20, 115)
-    pdf.text(`Average BET: ${data.summary.averageBET.toLocaleString()} m²/g`, 20, 125)
-    pdf.text(`Peak BET: ${data.summary.peakBET.toLocaleString()} m²/g`, 20, 135)
-    pdf.text(`Total Weight: ${data.summary.totalWeight}g`, 20, 145)
-    
-    // Batch Details Table
-    pdf.setFontSize(16)
-    pdf.text('Batch Analysis', 20, 165)
-    
-    // Table headers
-    pdf.setFontSize(10)
-    pdf.text('Batch ID', 20, 180)
-    pdf.text('Date', 60, 180)
-    pdf.text('BET (m²/g)', 100, 180)
-    pdf.text('Weight (g)', 140, 180)
-    pdf.text('Grade', 180, 180)
-    
-    // Table data
-    let yPosition = 190
-    data.batches.forEach((batch, index) => {
-      if (yPosition > 270) {
-        pdf.addPage()
-        yPosition = 20
-      }
-      
-      pdf.text(batch.name, 20, yPosition)
-      pdf.text(format(new Date(batch.date), 'MMM dd'), 60, yPosition)
-      pdf.text(batch.bet?.toLocaleString() || 'N/A', 100, yPosition)
-      pdf.text(batch.weight?.toString() || 'N/A', 140, yPosition)
-      
-      const grade = batch.bet >= 1800 ? 'Excellent' : batch.bet >= 1500 ? 'Good' : 'Standard'
-      pdf.text(grade, 180, yPosition)
-      
-      yPosition += 10
-    })
-    
-    // Technical Notes
-    if (yPosition > 220) {
-      pdf.addPage()
-      yPosition = 20
-    } else {
-      yPosition += 20
+  // Rendered and cached by the backend, so large customers do not build the PDF in the browser
+  static async generateCustomerSummaryPDF(params: CustomerSummaryParams): Promise<void> {
+    let { data: report } = await reportApi.requestCustomerSummary({ ...params, wait: 10 })
+    while (report.status === 'rendering') {
+      report = (await reportApi.getReportStatus(report.report_id)).data
+    }
+    if (report.status !== 'ready' || !report.download_url) {
+      throw new Error(report.error || 'Report rendering failed')
     }
     
-    pdf.setFontSize(16)
-    pdf.text('Technical Notes', 20, yPosition)
-    
-    pdf.setFontSize(10)
-    yPosition += 15
-    const notes = [
-      '• BET surface area analysis performed according to ASTM D3663/D6556 standards',
-      '• All batches processed using our proprietary Oven C technology',
-      '• Material optimized for energy storage applications',
-      '• Quality assurance testing completed on all shipped batches'
-    ]
-    
-    notes.forEach(note => {
-      pdf.text(note, 20, yPosition)
-      yPosition += 8
-    })
-    
-    // Footer
-    pdf.setFontSize(8)
-    pdf.setTextColor(107, 114, 128)
-    pdf.text('This report is confidential and proprietary. For questions, please contact our technical team.', 20, 280)
-    pdf.text('HGraph2 Analytics Platform • Hemp Graphene Research & Development', 20, 290)
-    
-    // Save the PDF
-    pdf.save(`HGraph2_Customer_Report_${format(new Date(), 'yyyy-MM-dd')}.pdf`)
+    const link = document.createElement('a')
+    link.setAttribute('href', reportApi.getDownloadUrl(report.download_url))
+    link.setAttribute('download', `HGraph2_Customer_Report_${format(new Date(), 'yyyy-MM-dd')}.pdf`)
+    link.style.visibility = 'hidden'
+    document.body.appendChild(link)
+    link.click()
+    document.body.removeChild(link)
   }
   
   static async generateExecutiveDashboardPDF(data: ReportData): Promise<void> {